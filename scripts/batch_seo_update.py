@@ -1,21 +1,35 @@
+import argparse
 import json
 import re
 from pathlib import Path
-from typing import Dict, List
-
-ROOT_URL = "https://ospreyexterior.com"
-PAGES_DIR = Path(__file__).resolve().parents[1] / "pages"
-LOCATIONS_PATH = PAGES_DIR / "locations.json"
+from typing import List, NamedTuple
 
+import url_policy
+from build_profile import add_profile_arguments, profiled, profiling
+from geo_index import GeoIndex
+from html_rewrite import HtmlRewriter, find_ld_json_blocks, has_linked_graph, ld_json_nodes, remove_spans
+from lastmod_store import LastmodStore
+from location_registry import LOCATIONS, Location, LocationDataError
+from site_output import OutputStats, write_bytes_if_changed
 
-def load_locations() -> Dict[str, dict]:
-    if not LOCATIONS_PATH.exists():
-        raise SystemExit("locations.json not found in pages directory")
-    data = json.loads(LOCATIONS_PATH.read_text(encoding="utf-8"))
-    return {entry["slug"]: entry for entry in data}
+PAGES_DIR = Path(__file__).resolve().parents[1] / "pages"
 
+GEO_META_PATTERN = re.compile(
+    r"\s*<meta name=\"(?:geo\.region|geo\.placename|geo\.position|ICBM)\"[^>]*>\s*",
+    re.IGNORECASE,
+)
+# "Nearby Service Areas" links: closest cities within NEARBY_MAX_KM, topped up
+# to NEARBY_MIN_COUNT with the next closest when a city is isolated.
+NEARBY_MAX_COUNT = 5
+NEARBY_MIN_COUNT = 3
+NEARBY_MAX_KM = 8.0
 
-LOCATIONS = load_locations()
+# ld+json types whose blocks this script generates and may replace. It no
+# longer writes FAQPage (it had no questions to list) but still removes the
+# empty ones earlier runs left behind.
+OWNED_SCHEMA_TYPES = ("LocalBusiness", "Service", "FAQPage")
+SCHEMA_BLOCKS = 2
+NEARBY_SECTION_PATTERN = re.compile(r"\n?\s*<section id=\"nearby-links\">.*?</section>\s*", re.DOTALL)
 
 
 def slug_to_title(slug: str) -> str:
@@ -25,8 +39,8 @@ def slug_to_title(slug: str) -> str:
 
 def build_canonical(city_slug: str, service_slug: str) -> str:
     if service_slug:
-        return f"{ROOT_URL}/pages/{city_slug}/{service_slug}/"
-    return f"{ROOT_URL}/pages/{city_slug}/"
+        return url_policy.canonical_url(f"/pages/{city_slug}/{service_slug}")
+    return url_policy.canonical_url(f"/pages/{city_slug}")
 
 
 def determine_service_slug(parts: List[str]) -> str:
@@ -47,11 +61,11 @@ def insert_before_tag(content: str, tag: str, insertion: str) -> str:
     return content[:idx] + insertion + content[idx:]
 
 
-def build_geo_tags(location: dict) -> str:
-    city = location.get("city", "")
-    state = location.get("state", "")
-    latitude = location.get("latitude")
-    longitude = location.get("longitude")
+def build_geo_tags(location: Location) -> str:
+    city = location.city
+    state = location.state
+    latitude = location.latitude
+    longitude = location.longitude
     parts = [
         f'  <meta name="geo.region" content="US-{state}">',
         f'  <meta name="geo.placename" content="{city}">',
@@ -61,22 +75,21 @@ def build_geo_tags(location: dict) -> str:
     return "\n".join(parts) + "\n"
 
 
-def ensure_geo_tags(content: str, location: dict) -> tuple[str, bool]:
+def ensure_geo_tags(content: str, location: Location) -> tuple[str, bool]:
     block = build_geo_tags(location)
     if block.strip() in content:
         return content, False
-    cleaned = re.sub(
-        r"\s*<meta name=\"(?:geo\.region|geo\.placename|geo\.position|ICBM)\"[^>]*>\s*",
-        "",
-        content,
-        flags=re.IGNORECASE,
-    )
+    cleaned = GEO_META_PATTERN.sub("", content)
     new_content = insert_before_tag(cleaned, "head", block)
     return new_content, True
 
 
+def build_canonical_tag(canonical_url: str) -> str:
+    return f'<link rel="canonical" href="{canonical_url}">'  # exact format we will enforce
+
+
 def update_canonical(content: str, canonical_url: str) -> tuple[str, bool]:
-    canonical_tag = f'<link rel="canonical" href="{canonical_url}">'  # exact format we will enforce
+    canonical_tag = build_canonical_tag(canonical_url)
     if canonical_tag in content:
         return content, False
     pattern = re.compile(r"<link\s+rel=['\"]canonical['\"][^>]*>", re.IGNORECASE)
@@ -88,11 +101,24 @@ def update_canonical(content: str, canonical_url: str) -> tuple[str, bool]:
     return new_content, True
 
 
-def build_schema_block(city_slug: str, service_slug: str, location: dict) -> str:
-    city_name = location.get("city") or slug_to_title(city_slug) or city_slug
-    state = location.get("state", "WA")
-    latitude = location.get("latitude")
-    longitude = location.get("longitude")
+@profiled("json")
+def ld_json_script(obj: dict) -> str:
+    return (
+        "  <script type=\"application/ld+json\">\n"
+        + json.dumps(obj, ensure_ascii=False, indent=2)
+        + "\n  </script>\n"
+    )
+
+
+def is_empty_faq(nodes: list) -> bool:
+    return all(node.get("@type") == "FAQPage" and not node.get("mainEntity") for node in nodes)
+
+
+def build_schema(city_slug: str, service_slug: str, location: Location) -> tuple[dict, dict]:
+    city_name = location.city
+    state = location.state
+    latitude = location.latitude
+    longitude = location.longitude
     canonical_url = build_canonical(city_slug, service_slug)
     service_slug_for_display = service_slug or "services"
     service_name = slug_to_title(service_slug_for_display) or service_slug_for_display
@@ -121,62 +147,49 @@ def build_schema_block(city_slug: str, service_slug: str, location: dict) -> str
         "@context": "https://schema.org",
         "@type": "Service",
         "serviceType": f"{service_name} in {city_name}",
-        "provider": {"@id": f"{ROOT_URL}/#organization"},
+        "provider": {"@id": f"{url_policy.SITE_URL}/#organization"},
         "areaServed": {"@type": "City", "name": city_name},
         "serviceArea": {"@type": "AdministrativeArea", "name": f"{city_name}, {state}"},
         "url": canonical_url,
     }
 
-    faq_schema = {
-        "@context": "https://schema.org",
-        "@type": "FAQPage",
-        "mainEntity": [],
-    }
+    return local_business, service_schema
 
-    scripts = []
-    for obj in (local_business, service_schema, faq_schema):
-        scripts.append(
-            "  <script type=\"application/ld+json\">\n"
-            + json.dumps(obj, ensure_ascii=False, indent=2)
-            + "\n  </script>\n"
-        )
-    return "".join(scripts)
+
+def build_schema_block(city_slug: str, service_slug: str, location: Location) -> str:
+    return "".join(ld_json_script(obj) for obj in build_schema(city_slug, service_slug, location))
 
 
-def ensure_schema(content: str, city_slug: str, service_slug: str, location: dict) -> tuple[str, int, bool]:
+def ensure_schema(content: str, city_slug: str, service_slug: str, location: Location) -> tuple[str, int, bool]:
+    """Replace this script's schema blocks; pages carrying a generator's linked @graph keep theirs."""
     schema_block = build_schema_block(city_slug, service_slug, location)
-    if schema_block.strip() in content:
-        return content, 0, False
-    cleaned = re.sub(
-        r"\s*<script type=\"application/ld\+json\">.*?@type\":\s*\"(?:LocalBusiness|Service|FAQPage)\".*?</script>\s*",
-        "",
-        content,
-        flags=re.IGNORECASE | re.DOTALL,
-    )
+    if has_linked_graph(content) or schema_block.strip() in content:
+        empty_faqs = find_ld_json_blocks(content, ("FAQPage",), where=is_empty_faq)
+        return remove_spans(content, empty_faqs), 0, bool(empty_faqs)
+    cleaned = remove_spans(content, find_ld_json_blocks(content, OWNED_SCHEMA_TYPES))
     new_content = insert_before_tag(cleaned, "head", schema_block)
-    return new_content, 3, True
+    return new_content, SCHEMA_BLOCKS, True
+
+
+def build_city_index(city_slugs: List[str]) -> GeoIndex:
+    points = {}
+    for slug in city_slugs:
+        location = LOCATIONS.get(slug)
+        if location:
+            points[slug] = (location.latitude, location.longitude)
+    return GeoIndex(points)
 
 
-def get_adjacent_cities(city_slug: str, city_slugs: List[str]) -> List[str]:
-    if city_slug not in city_slugs:
+def get_adjacent_cities(city_slug: str, city_index: GeoIndex) -> List[str]:
+    if city_slug not in city_index:
         return []
-    idx = city_slugs.index(city_slug)
-    max_count = 5
-    min_count = 3
-    ordered_indices = [i for i in range(len(city_slugs)) if i != idx]
-    ordered_indices.sort(key=lambda i: (abs(i - idx), i))
-    selected_indices = ordered_indices[:max_count]
-    if len(selected_indices) < min_count:
-        selected_indices = ordered_indices
-    selected_indices.sort()
-    return [city_slugs[i] for i in selected_indices]
+    nearby = city_index.nearest_to(city_slug, NEARBY_MAX_COUNT, max_km=NEARBY_MAX_KM)
+    if len(nearby) < NEARBY_MIN_COUNT:
+        nearby = city_index.nearest_to(city_slug, NEARBY_MIN_COUNT)
+    return [slug for _, slug in nearby]
 
 
-def ensure_nearby_links(
-    content: str, city_slug: str, service_slug: str, neighbors: List[str]
-) -> tuple[str, bool]:
-    if not neighbors:
-        return content, False
+def build_nearby_block(service_slug: str, neighbors: List[str]) -> str:
     lines = ["  <section id=\"nearby-links\">", "    <h2>Nearby Service Areas</h2>", "    <ul>"]
     service_title = slug_to_title(service_slug) or service_slug.replace("-", " ").title()
 
@@ -186,79 +199,211 @@ def ensure_nearby_links(
         href = build_canonical(neighbor_slug, service_slug)
         lines.append(f"      <li><a href=\"{href}\">{service_title} in {neighbor_name}</a></li>")
     lines.extend(["    </ul>", "  </section>\n"])
-    block = "\n" + "\n".join(lines)
+    return "\n" + "\n".join(lines)
 
-    pattern = re.compile(r"\n?\s*<section id=\"nearby-links\">.*?</section>\s*", re.DOTALL)
-    if pattern.search(content):
-        new_content, count = pattern.subn(block, content, count=1)
+
+def ensure_nearby_links(
+    content: str, city_slug: str, service_slug: str, neighbors: List[str]
+) -> tuple[str, bool]:
+    if not neighbors:
+        return content, False
+    block = build_nearby_block(service_slug, neighbors)
+
+    if NEARBY_SECTION_PATTERN.search(content):
+        new_content, count = NEARBY_SECTION_PATTERN.subn(block, content, count=1)
         return new_content, count > 0
 
     new_content = insert_before_tag(content, "body", block)
     return new_content, True
 
 
-def main() -> None:
-    if not PAGES_DIR.exists():
-        raise SystemExit("pages directory not found")
+class PageBlocks(NamedTuple):
+    geo: str
+    geo_tags: tuple[str, ...]
+    canonical_tag: str
+    schema: str
+    schema_payloads: tuple[dict, ...]
+    nearby: str
+
+
+@profiled("render")
+def build_page_blocks(
+    city_slug: str,
+    service_slug: str,
+    location: Location,
+    neighbors: List[str],
+    geo: str | None = None,
+) -> PageBlocks:
+    if geo is None:
+        geo = build_geo_tags(location)
+    schema = build_schema(city_slug, service_slug, location)
+    return PageBlocks(
+        geo=geo,
+        geo_tags=tuple(line.strip() for line in geo.splitlines()),
+        canonical_tag=build_canonical_tag(build_canonical(city_slug, service_slug)),
+        schema="".join(ld_json_script(obj) for obj in schema),
+        schema_payloads=schema,
+        nearby=build_nearby_block(service_slug, neighbors) if neighbors else "",
+    )
 
-    city_slugs = sorted([p.name for p in PAGES_DIR.iterdir() if p.is_dir()])
 
-    pages_modified = 0
+class BlockCache:
+    """Memoizes the parts of the SEO blocks that depend only on the city.
+
+    The geo tags and neighbor list are shared by all of a city's pages; the
+    rest is built per page, as each page is rewritten once per run.
+    """
+
+    def __init__(self, city_index: GeoIndex) -> None:
+        self.city_index = city_index
+        self._cities: dict[str, tuple[str, List[str]]] = {}
+        self.city_hits = 0
+        self.city_misses = 0
+
+    def _city(self, city_slug: str, location: Location) -> tuple[str, List[str]]:
+        cached = self._cities.get(city_slug)
+        if cached is not None:
+            self.city_hits += 1
+            return cached
+        self.city_misses += 1
+        cached = (build_geo_tags(location), get_adjacent_cities(city_slug, self.city_index))
+        self._cities[city_slug] = cached
+        return cached
+
+    def get(self, city_slug: str, service_slug: str, location: Location) -> PageBlocks:
+        geo, neighbors = self._city(city_slug, location)
+        return build_page_blocks(city_slug, service_slug, location, neighbors, geo)
+
+    def stats(self) -> dict:
+        total = self.city_hits + self.city_misses
+        return {
+            "city_hits": self.city_hits,
+            "city_misses": self.city_misses,
+            "city_hit_rate": round(self.city_hits / total, 3) if total else 0.0,
+        }
+
+
+@profiled("regex")
+def rewrite_page(content: str, blocks: PageBlocks) -> tuple[str, bool, int]:
+    """Apply the geo, canonical, schema and nearby-link edits in one pass.
+
+    Same edits as chaining ensure_geo_tags, update_canonical, ensure_schema
+    and ensure_nearby_links, but every check reads the tokens and ld+json
+    payloads from a single HtmlRewriter scan and the output is joined once.
+    Inserted blocks take the indentation of the closing tag they precede.
+    """
+    rewriter = HtmlRewriter(content)
     schema_blocks = 0
-    processed_cities: set[str] = set()
-
-    for html_file in PAGES_DIR.rglob("*.html"):
-        relative_parts = html_file.relative_to(PAGES_DIR).parts
-        if len(relative_parts) < 2:
-            continue
-        city_slug = relative_parts[0]
-        if city_slug not in city_slugs:
-            continue
-        location = LOCATIONS.get(city_slug)
-        if not location:
-            continue
-        processed_cities.add(city_slug)
-        service_slug = determine_service_slug(list(relative_parts))
-
-        original = html_file.read_text(encoding="utf-8")
-        updated = original
-        file_changed = False
-
-        updated, geo_changed = ensure_geo_tags(updated, location)
-        if geo_changed:
-            file_changed = True
-
-        updated, changed = update_canonical(updated, build_canonical(city_slug, service_slug))
-        if changed:
-            file_changed = True
-
-        updated, inserted, schema_changed = ensure_schema(updated, city_slug, service_slug, location)
-        if schema_changed:
-            schema_blocks += inserted
-            file_changed = True
-
-        neighbors = get_adjacent_cities(city_slug, city_slugs)
-        updated, nearby_changed = ensure_nearby_links(
-            updated, city_slug, service_slug, neighbors
-        )
-        if nearby_changed:
-            file_changed = True
-
-        if file_changed:
-            html_file.write_text(updated, encoding="utf-8")
-            pages_modified += 1
-
-    print(
-        json.dumps(
-            {
-                "cities_processed": len(processed_cities),
-                "pages_modified": pages_modified,
-                "schema_blocks_injected": schema_blocks,
-            }
-        )
-    )
+
+    geo_tokens = rewriter.all("geo")
+    if tuple(rewriter.text(token).strip() for token in geo_tokens) != blocks.geo_tags:
+        for token in geo_tokens:
+            rewriter.remove(token.start, token.end)
+        rewriter.insert_before_close("head", blocks.geo)
+
+    canonicals = rewriter.all("canonical")
+    if not any(rewriter.text(token) == blocks.canonical_tag for token in canonicals):
+        if canonicals:
+            rewriter.replace(canonicals[0].start, canonicals[0].end, blocks.canonical_tag)
+        else:
+            rewriter.insert_before_close("head", "  " + blocks.canonical_tag + "\n")
+
+    # Generated pages carry their own LocalBusiness/Service @graph; only the
+    # hand-maintained pages get this script's blocks.
+    owned = rewriter.ld_json_blocks(OWNED_SCHEMA_TYPES)
+    empty_faqs = [token for token, payload in owned if is_empty_faq(ld_json_nodes(payload))]
+    current = tuple(payload for token, payload in owned if token not in empty_faqs)
+    if rewriter.has_linked_graph() or current == blocks.schema_payloads:
+        for token in empty_faqs:
+            rewriter.remove(token.start, token.end)
+    else:
+        for token, _payload in owned:
+            rewriter.remove(token.start, token.end)
+        rewriter.insert_before_close("head", blocks.schema)
+        schema_blocks = SCHEMA_BLOCKS
+
+    if blocks.nearby:
+        existing = rewriter.first("nearby")
+        if existing:
+            rewriter.replace_block(existing, "body", blocks.nearby)
+        else:
+            rewriter.insert_before_close("body", blocks.nearby)
+
+    return rewriter.render(), rewriter.changed, schema_blocks
+
+
+def page_context(html_file: Path) -> tuple[str, str, Location] | None:
+    """Return (city_slug, service_slug, location) for a city page, else None."""
+    relative_parts = html_file.relative_to(PAGES_DIR).parts
+    if len(relative_parts) < 2:
+        return None
+    city_slug = relative_parts[0]
+    # The registry only holds locations that have a pages/<slug>/ directory.
+    location = LOCATIONS.get(city_slug)
+    if not location:
+        return None
+    return city_slug, determine_service_slug(list(relative_parts)), location
+
+
+@profiled("discovery")
+def city_slugs_on_disk() -> list[str]:
+    return sorted(p.name for p in PAGES_DIR.iterdir() if p.is_dir())
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Add geo tags, canonicals, schema and nearby links to city pages.")
+    add_profile_arguments(parser)
+    return parser.parse_args()
 
 
+def main() -> None:
+    args = parse_args()
+    with profiling(args, "batch_seo_update"):
+        if not PAGES_DIR.exists():
+            raise SystemExit("pages directory not found")
+
+        city_slugs = city_slugs_on_disk()
+        try:
+            LOCATIONS.load()
+        except LocationDataError as exc:
+            raise SystemExit(str(exc)) from exc
+        block_cache = BlockCache(build_city_index(city_slugs))
+
+        pages_modified = 0
+        schema_blocks = 0
+        stats = OutputStats()
+        processed_cities: set[str] = set()
+
+        with LastmodStore.open() as lastmod:
+            for html_file in PAGES_DIR.rglob("*.html"):
+                context = page_context(html_file)
+                if context is None:
+                    continue
+                city_slug, service_slug, location = context
+                processed_cities.add(city_slug)
+
+                original = html_file.read_text(encoding="utf-8")
+                blocks = block_cache.get(city_slug, service_slug, location)
+                updated, file_changed, inserted = rewrite_page(original, blocks)
+                schema_blocks += inserted
+
+                if file_changed:
+                    data = updated.encode("utf-8")
+                    lastmod.observe(html_file, data, write_bytes_if_changed(html_file, data, stats))
+                    pages_modified += 1
+
+        print(
+            json.dumps(
+                {
+                    "cities_processed": len(processed_cities),
+                    "locations_skipped": LOCATIONS.skipped,
+                    "pages_modified": pages_modified,
+                    "schema_blocks_injected": schema_blocks,
+                    **stats.summary(),
+                    "block_cache": block_cache.stats(),
+                }
+            )
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,81 @@
+"""
+Benchmark compiled page templates against render-time dedent.
+
+Renders the same set of city service pages twice in memory (nothing is
+written): once through the compiled templates, and once with every template
+interpolated and dedented per page the way the old f-string helpers did.
+Pages cycle through the real cities and services, with numbered copies of
+the city names once those run out.
+
+    python scripts/bench_city_templates.py --pages 1000 --repeat 3
+"""
+import argparse
+import json
+import time
+
+import generate_city_service_pages as generator
+from page_templates import Template
+
+
+def build_tasks(count: int) -> list[tuple[str, str, str]]:
+    cities, _ = generator.discover_cities()
+    services = list(generator.SERVICE_CONFIGS)
+    tasks = []
+    round_number = 0
+    while len(tasks) < count:
+        for city_slug, city_name in cities:
+            if round_number:
+                city_slug = f"{city_slug}-{round_number}"
+                city_name = f"{city_name} {round_number}"
+            for service_slug in services:
+                tasks.append((city_slug, city_name, service_slug))
+        round_number += 1
+    return tasks[:count]
+
+
+def render_all(tasks: list[tuple[str, str, str]], repeat: int) -> tuple[float, list[str]]:
+    best = float("inf")
+    pages: list[str] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        pages = [generator.render_city_service_page(*task) for task in tasks]
+        best = min(best, time.perf_counter() - started)
+    return best, pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=1000, help="Number of pages to render per run.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per mode; the best is reported.")
+    args = parser.parse_args()
+
+    tasks = build_tasks(args.pages)
+    compiled_seconds, compiled_pages = render_all(tasks, args.repeat)
+
+    compiled_render = Template.render
+    Template.render = Template.interpret
+    try:
+        dedent_seconds, dedent_pages = render_all(tasks, args.repeat)
+    finally:
+        Template.render = compiled_render
+
+    pages = len(tasks)
+    print(
+        json.dumps(
+            {
+                "pages": pages,
+                "bytes": sum(len(page) for page in compiled_pages),
+                "dedent_seconds": round(dedent_seconds, 4),
+                "compiled_seconds": round(compiled_seconds, 4),
+                "dedent_ms_per_page": round(dedent_seconds * 1000 / max(pages, 1), 4),
+                "compiled_ms_per_page": round(compiled_seconds * 1000 / max(pages, 1), 4),
+                "speedup": round(dedent_seconds / compiled_seconds, 2) if compiled_seconds else None,
+                "outputs_different": sum(old != new for old, new in zip(dedent_pages, compiled_pages)),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Micro-benchmark for the ld+json block locator used by ensure_schema.
+
+Builds synthetic pages with a growing number of <script> tags and times the
+old lazy DOTALL cleanup regex against html_rewrite.find_ld_json_blocks. The
+regex retries from every ld+json tag to the end of the document when no owned
+block follows, so its cost grows quadratically; the scanner stays linear.
+
+    python scripts/bench_ld_json_scan.py --sizes 100 200 400 800
+"""
+import argparse
+import json
+import re
+import time
+
+from batch_seo_update import OWNED_SCHEMA_TYPES
+from html_rewrite import find_ld_json_blocks
+
+LEGACY_CLEANUP_PATTERN = re.compile(
+    r"\s*<script type=\"application/ld\+json\">.*?@type\":\s*\"(?:LocalBusiness|Service|FAQPage)\".*?</script>\s*",
+    re.IGNORECASE | re.DOTALL,
+)
+
+FOREIGN_BLOCK = (
+    '  <script type="application/ld+json">{"@context":"https://schema.org","@type":"BreadcrumbList",'
+    '"itemListElement":[{"@type":"ListItem","position":%d,"name":"Item %d"}]}</script>\n'
+)
+PLAIN_SCRIPT = "  <script>window.dataLayer = window.dataLayer || []; dataLayer.push({step: %d});</script>\n"
+OWNED_BLOCK = (
+    '  <script type="application/ld+json">{"@context":"https://schema.org","@type":"LocalBusiness",'
+    '"name":"Osprey Exterior"}</script>\n'
+)
+
+
+def build_page(script_count: int, with_owned: bool) -> str:
+    parts = ["<!DOCTYPE html>\n<html>\n<head>\n"]
+    for index in range(script_count):
+        parts.append(FOREIGN_BLOCK % (index, index) if index % 2 else PLAIN_SCRIPT % index)
+    if with_owned:
+        parts.append(OWNED_BLOCK)
+    parts.append("</head>\n<body>\n<main><p>Body copy.</p></main>\n</body>\n</html>\n")
+    return "".join(parts)
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 200, 400, 800])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        for with_owned in (False, True):
+            page = build_page(size, with_owned)
+            legacy_spans = [m.span() for m in LEGACY_CLEANUP_PATTERN.finditer(page)]
+            scanner_spans = find_ld_json_blocks(page, OWNED_SCHEMA_TYPES)
+            legacy = best_of(lambda: LEGACY_CLEANUP_PATTERN.sub("", page), args.repeat)
+            scanner = best_of(lambda: find_ld_json_blocks(page, OWNED_SCHEMA_TYPES), args.repeat)
+            kib = len(page) / 1024
+            rows.append(
+                {
+                    "scripts": size,
+                    "owned_block": with_owned,
+                    "kib": round(kib, 1),
+                    "legacy_ms": round(legacy * 1000, 3),
+                    "scanner_ms": round(scanner * 1000, 3),
+                    "legacy_us_per_kib": round(legacy * 1e6 / kib, 2),
+                    "scanner_us_per_kib": round(scanner * 1e6 / kib, 2),
+                    # The lazy regex swallows every script before the owned one.
+                    "legacy_chars_removed": sum(end - start for start, end in legacy_spans),
+                    "scanner_chars_removed": sum(end - start for start, end in scanner_spans),
+                }
+            )
+    print(json.dumps(rows, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark the single-pass SEO rewrite against the legacy function chain.
+
+Runs both implementations over every city page under pages/ in memory (nothing
+is written) and reports timings plus how many outputs differ.
+
+    python scripts/bench_seo_rewrite.py --repeat 5
+"""
+import argparse
+import json
+import re
+import time
+
+import batch_seo_update as seo
+
+
+def load_corpus() -> list[tuple[str, str, str, seo.Location, list[str]]]:
+    city_slugs = sorted(p.name for p in seo.PAGES_DIR.iterdir() if p.is_dir())
+    city_index = seo.build_city_index(city_slugs)
+    corpus = []
+    for html_file in sorted(seo.PAGES_DIR.rglob("*.html")):
+        parts = html_file.relative_to(seo.PAGES_DIR).parts
+        if len(parts) < 2 or parts[0] not in city_slugs:
+            continue
+        location = seo.LOCATIONS.get(parts[0])
+        if not location:
+            continue
+        service_slug = seo.determine_service_slug(list(parts))
+        neighbors = seo.get_adjacent_cities(parts[0], city_index)
+        corpus.append((html_file.read_text(encoding="utf-8"), parts[0], service_slug, location, neighbors))
+    return corpus
+
+
+def run_chain(content: str, city_slug: str, service_slug: str, location: seo.Location, neighbors: list[str]) -> str:
+    content, _ = seo.ensure_geo_tags(content, location)
+    content, _ = seo.update_canonical(content, seo.build_canonical(city_slug, service_slug))
+    content, _, _ = seo.ensure_schema(content, city_slug, service_slug, location)
+    content, _ = seo.ensure_nearby_links(content, city_slug, service_slug, neighbors)
+    return content
+
+
+def run_single_pass(content: str, city_slug: str, service_slug: str, location: seo.Location, neighbors: list[str]) -> str:
+    blocks = seo.build_page_blocks(city_slug, service_slug, location, neighbors)
+    return seo.rewrite_page(content, blocks)[0]
+
+
+def time_runs(fn, corpus, repeat: int) -> tuple[float, list[str]]:
+    best = float("inf")
+    outputs: list[str] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        outputs = [fn(*entry) for entry in corpus]
+        best = min(best, time.perf_counter() - started)
+    return best, outputs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per implementation; the best is reported.")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    chain_seconds, chain_out = time_runs(run_chain, corpus, args.repeat)
+    single_seconds, single_out = time_runs(run_single_pass, corpus, args.repeat)
+
+    identical = whitespace_only = different = 0
+    for old, new in zip(chain_out, single_out):
+        if old == new:
+            identical += 1
+        elif re.sub(r"\s+", "", old) == re.sub(r"\s+", "", new):
+            whitespace_only += 1
+        else:
+            different += 1
+
+    pages = len(corpus)
+    print(
+        json.dumps(
+            {
+                "pages": pages,
+                "bytes": sum(len(entry[0]) for entry in corpus),
+                "chain_seconds": round(chain_seconds, 4),
+                "single_pass_seconds": round(single_seconds, 4),
+                "chain_ms_per_page": round(chain_seconds * 1000 / max(pages, 1), 3),
+                "single_pass_ms_per_page": round(single_seconds * 1000 / max(pages, 1), 3),
+                "speedup": round(chain_seconds / single_seconds, 2) if single_seconds else None,
+                "outputs_identical": identical,
+                "outputs_whitespace_only": whitespace_only,
+                "outputs_different": different,
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Persistent build manifest shared by the page generators.
+
+Each generated page is recorded with a hash of everything that went into it
+and a hash of the file written. On the next run a generator can compare
+hashes and skip rendering/writing pages whose inputs did not change and whose
+file on disk is still the one it wrote; a page restored or edited since (a
+fresh checkout under a cached .build/, say) is rendered again.
+"""
+import hashlib
+import json
+from pathlib import Path
+
+from build_profile import profiled
+from site_output import write_text_if_changed
+
+ROOT = Path(__file__).resolve().parents[1]
+BUILD_DIR = ROOT / ".build"
+MANIFEST_FORMAT = 2
+
+
+@profiled("hash")
+def hash_inputs(*parts: object) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            data = part
+        else:
+            data = json.dumps(part, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        # Length-prefix every part so ("ab", "c") and ("a", "bc") hash differently.
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def source_version(path: str | Path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()[:16]
+
+
+def output_version(path: Path) -> str | None:
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+class BuildManifest:
+    def __init__(self, path: Path, entries: dict[str, dict[str, str]] | None = None) -> None:
+        self.path = path
+        # key -> {"inputs": input hash, "output": hash of the file written}
+        self.entries: dict[str, dict[str, str]] = entries or {}
+        self.seen: set[str] = set()
+        self.built = 0
+        self.skipped = 0
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildManifest":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("format") != MANIFEST_FORMAT:
+            return cls(path)
+        return cls(path, dict(data.get("pages", {})))
+
+    def is_fresh(self, key: str, digest: str, output: Path) -> bool:
+        self.seen.add(key)
+        entry = self.entries.get(key)
+        if entry is not None and entry.get("inputs") == digest and entry.get("output") == output_version(output):
+            self.skipped += 1
+            return True
+        return False
+
+    def record(self, key: str, digest: str, output: Path) -> None:
+        """Record a page once its file is written."""
+        self.seen.add(key)
+        version = output_version(output)
+        if version is None:
+            self.entries.pop(key, None)
+        else:
+            self.entries[key] = {"inputs": digest, "output": version}
+        self.built += 1
+
+    def refresh(self, key: str, output: Path) -> None:
+        """Re-hash a recorded page that a later pass rewrote, so it still counts as fresh."""
+        entry = self.entries.get(key)
+        version = output_version(output)
+        if entry is not None and version is not None:
+            entry["output"] = version
+
+    def save(self) -> None:
+        # Drop pages that were not part of this run so deleted cities do not linger.
+        pages = {key: self.entries[key] for key in sorted(self.seen) if key in self.entries}
+        payload = json.dumps({"format": MANIFEST_FORMAT, "pages": pages}, indent=2) + "\n"
+        write_text_if_changed(self.path, payload)
@@ -0,0 +1,202 @@
+"""
+Opt-in timing instrumentation for the site scripts.
+
+Functions that do the expensive kinds of work are tagged with @profiled and a
+category (discovery, read, regex, render, json, hash, write). While profiling
+is off the wrappers only check a flag. With --profile, every tagged call is
+timed, and times are totalled per function and per category; build stages
+are timed with PROFILER.stage(). Function times are inclusive. A category
+total counts only its outermost calls, so a flush that calls the page writer
+is not counted twice under "write", but a render that serializes JSON still
+counts toward both categories. Generator functions are timed only while they
+run, not while their consumer holds the loop.
+
+The report is JSON (stdout stays free for each script's own summary), written
+to .build/profile/<script>.json unless a path is given. --cprofile PATH also
+saves a cProfile dump of the whole run for snakeviz or pstats.
+
+    python scripts/build_site.py --profile [REPORT.json] [--cprofile run.prof]
+"""
+import argparse
+import cProfile
+import functools
+import inspect
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+
+
+class Timing:
+    __slots__ = ("calls", "seconds")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+
+    def add(self, seconds: float, calls: int = 1) -> None:
+        self.calls += calls
+        self.seconds += seconds
+
+    def as_dict(self) -> dict:
+        return {"calls": self.calls, "seconds": round(self.seconds, 4)}
+
+
+class Profiler:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.started = 0.0
+        self.stages: dict[str, Timing] = {}
+        self.functions: dict[tuple[str, str], Timing] = {}
+        self.categories: dict[str, Timing] = {}
+        self.counters: dict[str, int] = {}
+        # Calls in progress per category, to keep nested calls out of category totals.
+        self._active: dict[str, int] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+        self.started = time.perf_counter()
+
+    def enter(self, category: str) -> bool:
+        """Mark a call in category as started; returns True if it is the outermost one."""
+        depth = self._active.get(category, 0)
+        self._active[category] = depth + 1
+        return depth == 0
+
+    def exit(self, category: str, name: str, seconds: float, outermost: bool) -> None:
+        self._active[category] -= 1
+        self.record(category, name, seconds, calls=0)
+        if outermost:
+            self.categories.setdefault(category, Timing()).add(seconds, calls=0)
+
+    def record(self, category: str, name: str, seconds: float, calls: int = 1) -> None:
+        timing = self.functions.get((category, name))
+        if timing is None:
+            timing = self.functions[(category, name)] = Timing()
+        timing.add(seconds, calls)
+
+    def called(self, category: str, name: str) -> None:
+        self.record(category, name, 0.0)
+        self.categories.setdefault(category, Timing()).add(0.0)
+
+    def count(self, name: str, amount: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.setdefault(name, Timing()).add(time.perf_counter() - started)
+
+    def report(self, script: str) -> dict:
+        by_time = sorted(self.functions.items(), key=lambda item: item[1].seconds, reverse=True)
+        return {
+            "script": script,
+            "wall_seconds": round(time.perf_counter() - self.started, 4),
+            "stages": {name: timing.as_dict() for name, timing in self.stages.items()},
+            "categories": {
+                name: timing.as_dict()
+                for name, timing in sorted(self.categories.items(), key=lambda item: item[1].seconds, reverse=True)
+            },
+            "functions": [{"category": category, "function": name, **timing.as_dict()} for (category, name), timing in by_time],
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+
+PROFILER = Profiler()
+
+
+def profiled(category: str) -> Callable[[Callable], Callable]:
+    """Time every call of the decorated function under category while profiling is on."""
+
+    def decorate(func: Callable) -> Callable:
+        name = f"{func.__module__}.{func.__qualname__}"
+
+        if inspect.isgeneratorfunction(func):
+
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                if not PROFILER.enabled:
+                    return (yield from func(*args, **kwargs))
+                PROFILER.called(category, name)
+                iterator = func(*args, **kwargs)
+                while True:
+                    outermost = PROFILER.enter(category)
+                    started = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration as stop:
+                        return stop.value
+                    finally:
+                        PROFILER.exit(category, name, time.perf_counter() - started, outermost)
+                    yield item
+
+            return generator_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return func(*args, **kwargs)
+            PROFILER.called(category, name)
+            outermost = PROFILER.enter(category)
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                PROFILER.exit(category, name, time.perf_counter() - started, outermost)
+
+        return wrapper
+
+    return decorate
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="REPORT",
+        help="Write a JSON timing report (default .build/profile/<script>.json).",
+    )
+    parser.add_argument(
+        "--cprofile",
+        type=Path,
+        metavar="PATH",
+        help="Also save a cProfile dump of the run to PATH.",
+    )
+
+
+@contextmanager
+def profiling(args: argparse.Namespace, script: str) -> Iterator[None]:
+    """Profile the enclosed block if --profile or --cprofile was given."""
+    report_arg = getattr(args, "profile", None)
+    cprofile_path = getattr(args, "cprofile", None)
+    if report_arg is None and cprofile_path is None:
+        yield
+        return
+    PROFILER.enable()
+    profile = cProfile.Profile() if cprofile_path is not None else None
+    if profile is not None:
+        profile.enable()
+    try:
+        yield
+    finally:
+        if profile is not None:
+            profile.disable()
+            cprofile_path.parent.mkdir(parents=True, exist_ok=True)
+            profile.dump_stats(cprofile_path)
+        # Imported here: site_output uses this module, and build_manifest imports site_output.
+        from build_manifest import BUILD_DIR
+
+        report_path = Path(report_arg) if report_arg else BUILD_DIR / "profile" / f"{script}.json"
+        report_path.parent.mkdir(parents=True, exist_ok=True)
+        report_path.write_text(json.dumps(PROFILER.report(script), indent=2) + "\n", encoding="utf-8")
+        print(f"Profile written to {report_path}", file=sys.stderr)
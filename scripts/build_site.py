@@ -0,0 +1,512 @@
+"""
+Single entry point for the site build.
+
+Every script the workflow used to run on its own is a stage here. A stage
+declares its inputs (sources and data files; changing any of them reprocesses
+all of its pages) and its outputs (the pages it may edit). Stages run in
+dependency order in one process and share one DocumentStore, so each file is
+read at most once per build and edits accumulate in memory. A page
+generated by city-pages or problem-cluster gets its SEO blocks (city pages),
+favicon links and critical CSS before it is written, and no page is written
+more than once per build. Each stage keeps a file index, so it only
+processes pages that an upstream stage changed in this build or that changed
+on disk since the stage last ran.
+
+Every page written is recorded in the LastmodStore. Stages marked
+after_flush (the sitemaps, the redirect table, the link check, the tag
+report) run once pages are on disk and dated.
+
+    python scripts/build_site.py [--force] [--jobs N] [--fail-on-broken-links] [--profile [REPORT]]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from graphlib import TopologicalSorter
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+import batch_seo_update as seo
+import check_links as links
+import compile_redirects as redirects
+import critical_css
+import generate_city_service_pages as city_pages
+import generate_problem_cluster as problem_cluster
+import third_party_tags as tags
+import update_favicon as favicon
+import update_sitemaps as sitemaps
+from build_manifest import BuildManifest, hash_inputs, source_version
+from build_profile import PROFILER, add_profile_arguments, profiling
+from document_store import DocumentStore
+from file_index import ROOT, FileIndex
+from lastmod_store import LastmodStore
+from location_registry import LOCATIONS, LOCATIONS_PATH, LocationDataError
+from site_output import OutputStats
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+class BuildContext:
+    """State shared by every stage of one build; documents are written once at the end."""
+
+    def __init__(self, lastmod: LastmodStore, force: bool = False, jobs: int = 1) -> None:
+        self.lastmod = lastmod
+        self.force = force
+        self.jobs = jobs
+        self.broken_links = 0
+        self.documents = DocumentStore()
+        self.stats = OutputStats()
+        self.failed: set[Path] = set()
+
+    def flush(self) -> None:
+        self.failed = self.documents.flush(self.stats, self.lastmod.observe)
+
+
+class StageRun:
+    """Per-build bookkeeping for one stage: which pages it handled, and what to save after the flush."""
+
+    def __init__(self, stage: "Stage", context: BuildContext) -> None:
+        self.stage = stage
+        self.context = context
+        self.index: FileIndex | None = None
+        self.processed: list[Path] = []
+        self.considered = 0
+        self.errors: dict[Path, str] = {}
+        self._deferred: list[Callable[[], None]] = []
+
+    def pending(self, pages: Iterable[Path]) -> Iterator[Path]:
+        """Yield the pages this stage has to look at in this build."""
+        if self.index is None:
+            version = hash_inputs(*(source_version(path) for path in self.stage.inputs))
+            self.index = FileIndex.load(f"stage-{self.stage.name}", version=version)
+        for path in pages:
+            self.considered += 1
+            if self.context.force or self.context.documents.is_dirty(path) or not self.index.is_current(path):
+                self.processed.append(path)
+                yield path
+
+    def fail(self, path: Path, error: Exception) -> None:
+        """Log a page that could not be processed and leave it to the next build."""
+        print(f"Error processing {path}: {error}", file=sys.stderr)
+        self.errors[path] = str(error)
+        if path in self.processed:
+            self.processed.remove(path)
+
+    def defer(self, callback: Callable[[], None]) -> None:
+        """Run callback once documents are on disk."""
+        self._deferred.append(callback)
+
+    def commit(self) -> None:
+        for callback in self._deferred:
+            callback()
+        if self.index is not None:
+            for path in self.processed:
+                if path not in self.context.failed:
+                    self.index.record(path)
+            self.index.save()
+
+
+class Stage(NamedTuple):
+    name: str
+    run: Callable[[BuildContext, StageRun], dict]
+    # Files that change every page the stage produces; their contents version its file index.
+    inputs: tuple[Path, ...]
+    # Pages the stage may write, for the build report.
+    outputs: str
+    depends_on: tuple[str, ...] = ()
+    # Run after documents are written, for stages that read the finished pages from disk.
+    after_flush: bool = False
+
+
+def record_manifest(
+    context: BuildContext,
+    manifest: BuildManifest,
+    written: list[tuple[Path, str, str]],
+    pages: Iterable[tuple[str, Path]],
+) -> Callable[[], None]:
+    """A callback recording the pages a generator stage wrote, for run.defer().
+
+    written is (path, key, input hash) per rendered page, pages is (key, path)
+    for every page the stage considered. Later stages may have rewritten
+    pages that were skipped as fresh; their output hash is refreshed so the
+    manifest matches the files as this build left them.
+    """
+
+    def record() -> None:
+        for path, key, input_hash in written:
+            if path not in context.failed:
+                manifest.record(key, input_hash, path)
+        generated = {key for _path, key, _hash in written}
+        for key, path in pages:
+            if key not in generated and path not in context.failed:
+                manifest.refresh(key, path)
+        manifest.save()
+
+    return record
+
+
+def run_city_pages(context: BuildContext, run: StageRun) -> dict:
+    manifest_path = city_pages.MANIFEST_PATH
+    manifest = BuildManifest(manifest_path) if context.force else BuildManifest.load(manifest_path)
+    cities, dropped = city_pages.discover_cities()
+    tasks, task_hashes = city_pages.plan_pages(cities, manifest)
+    rendered = city_pages.render_pages(tasks, context.jobs)
+
+    run.considered = len(cities) * len(city_pages.SERVICE_CONFIGS)
+    written: list[tuple[Path, str, str]] = []
+    for (city_slug, _city_name, service_slug), input_hash, html_output in zip(tasks, task_hashes, rendered):
+        path = city_pages.page_path(city_slug, service_slug)
+        context.documents.put(path, html_output)
+        run.processed.append(path)
+        written.append((path, f"{city_slug}/{service_slug}", input_hash))
+
+    pages = [
+        (f"{city_slug}/{service_slug}", city_pages.page_path(city_slug, service_slug))
+        for city_slug, _city_name in cities
+        for service_slug in city_pages.SERVICE_CONFIGS
+    ]
+    run.defer(record_manifest(context, manifest, written, pages))
+    return {
+        "pages_generated": len(tasks),
+        "pages_skipped": manifest.skipped,
+        "cities": len(cities),
+        "cities_dropped": dropped,
+    }
+
+
+def run_problem_cluster(context: BuildContext, run: StageRun) -> dict:
+    manifest_path = problem_cluster.MANIFEST_PATH
+    manifest = BuildManifest(manifest_path) if context.force else BuildManifest.load(manifest_path)
+    links: dict[str, list[tuple[str, str]]] = defaultdict(list)
+    pages: list[tuple[str, Path]] = []
+    written: list[tuple[Path, str, str]] = []
+
+    def render(key: str, path: Path, input_hash: str, html: Callable[[], str]) -> None:
+        pages.append((key, path))
+        if manifest.is_fresh(key, input_hash, path):
+            return
+        context.documents.put(path, html())
+        run.processed.append(path)
+        written.append((path, key, input_hash))
+
+    try:
+        for page in problem_cluster.iter_catalog():
+            links[page["cluster"]].append((page["slug"], page["title"]))
+            render(
+                page["slug"],
+                problem_cluster.intent_page_path(page),
+                problem_cluster.intent_input_hash(page),
+                lambda: problem_cluster.render_intent_page(page, problem_cluster.ASSETS_INTENT),
+            )
+    except (OSError, problem_cluster.CatalogError) as exc:
+        raise SystemExit(f"Problem catalog error: {exc}") from exc
+    total = len(pages)
+    render(
+        "index",
+        problem_cluster.PILLAR_PATH,
+        problem_cluster.pillar_input_hash(links, total),
+        lambda: problem_cluster.render_pillar(links, total),
+    )
+
+    run.considered = len(pages)
+    run.defer(record_manifest(context, manifest, written, pages))
+    return {"pages_generated": len(written), "pages_skipped": manifest.skipped}
+
+
+def run_seo(context: BuildContext, run: StageRun) -> dict:
+    block_cache = seo.BlockCache(seo.build_city_index(seo.city_slugs_on_disk()))
+    pages_modified = 0
+    schema_blocks = 0
+    for path in run.pending(context.documents.pages(seo.PAGES_DIR, (".html",))):
+        page = seo.page_context(path)
+        if page is None:
+            continue
+        blocks = block_cache.get(*page)
+        try:
+            document = context.documents.get(path)
+            text = document.text
+        except (OSError, ValueError) as exc:
+            run.fail(path, exc)
+            continue
+        updated, changed, inserted = seo.rewrite_page(text, blocks)
+        schema_blocks += inserted
+        if changed and document.set_text(updated):
+            pages_modified += 1
+    return {
+        "pages_modified": pages_modified,
+        "schema_blocks_injected": schema_blocks,
+        "pages_failed": len(run.errors),
+        "block_cache": block_cache.stats(),
+    }
+
+
+def run_favicon(context: BuildContext, run: StageRun) -> dict:
+    pages_modified = 0
+    for path in run.pending(context.documents.pages(ROOT)):
+        # Skip files containing unusual characters that are likely temporary backups
+        if "：" in str(path):
+            continue
+        # Favicon links live in <head>; the body is never decoded here.
+        try:
+            document = context.documents.get(path)
+        except (OSError, ValueError) as exc:
+            # One unreadable or non-UTF-8 file must not stop the build.
+            run.fail(path, exc)
+            continue
+        updated = favicon.rewrite_favicons(document.head)
+        if updated is not None and document.set_head(updated):
+            pages_modified += 1
+    return {"pages_modified": pages_modified, "pages_failed": len(run.errors)}
+
+
+def run_sitemaps(context: BuildContext, run: StageRun) -> dict:
+    try:
+        return sitemaps.build_sitemaps(context.lastmod)
+    except problem_cluster.CatalogError as exc:
+        raise SystemExit(f"Problem catalog error: {exc}") from exc
+
+
+def run_redirects(context: BuildContext, run: StageRun) -> dict:
+    summary = redirects.build_redirects()
+    return {**summary, "report": str(redirects.REPORT_PATH.relative_to(ROOT))}
+
+
+def city_service_pages() -> list[Path]:
+    cities, _dropped = city_pages.discover_cities()
+    return [city_pages.page_path(city_slug, service) for city_slug, _ in cities for service in city_pages.SERVICE_CONFIGS]
+
+
+def problem_pages(documents: DocumentStore) -> list[Path]:
+    """The problem intent and matrix pages, including ones not yet written; the pillar is PILLAR_PATH."""
+    problems_dir = problem_cluster.PROBLEMS_DIR
+    return [
+        path
+        for path in documents.pages(problems_dir, (".html",))
+        if path.name == "index.html" and len(path.relative_to(problems_dir).parts) in (2, 3)
+    ]
+
+
+def run_critical_css(context: BuildContext, run: StageRun) -> dict:
+    extractor = critical_css.CriticalCss() if context.force else critical_css.CriticalCss.load()
+    generated = [*city_service_pages(), problem_cluster.PILLAR_PATH, *problem_pages(context.documents)]
+    pages_modified = 0
+    for path in run.pending(path for path in generated if path.is_file() or context.documents.is_dirty(path)):
+        try:
+            document = context.documents.get(path)
+            text = document.text
+        except (OSError, ValueError) as exc:
+            run.fail(path, exc)
+            continue
+        if document.set_text(extractor.inline(text, path)):
+            pages_modified += 1
+    # Templates no page uses any more are dropped only when every page was looked at.
+    run.defer(lambda: extractor.save(prune=len(run.processed) == run.considered and not run.errors))
+    return {"pages_modified": pages_modified, "pages_failed": len(run.errors), **extractor.summary()}
+
+
+def run_tags(context: BuildContext, run: StageRun) -> dict:
+    families = [
+        (city_service_pages(), city_pages.THIRD_PARTY_TAGS, ""),
+        ([problem_cluster.PILLAR_PATH], problem_cluster.PILLAR_TAGS, problem_cluster.TAG_INDENT),
+        (problem_pages(context.documents), problem_cluster.INTENT_TAGS, problem_cluster.TAG_INDENT),
+    ]
+    summary = tags.write_report(families)
+    run.considered = summary["pages"]
+    return {**summary, "report": str(tags.REPORT_PATH.relative_to(ROOT))}
+
+
+def run_links(context: BuildContext, run: StageRun) -> dict:
+    summary, broken = links.check_site(context.jobs)
+    links.write_report(broken)
+    run.considered = summary["pages_checked"]
+    context.broken_links = summary["broken_links"]
+    return {**summary, "report": str(links.REPORT_PATH.relative_to(ROOT))}
+
+
+STAGES = (
+    Stage(
+        "city-pages",
+        run_city_pages,
+        inputs=(
+            SCRIPTS_DIR / "generate_city_service_pages.py",
+            SCRIPTS_DIR / "page_templates.py",
+            SCRIPTS_DIR / "url_policy.py",
+            LOCATIONS_PATH,
+        ),
+        outputs="pages/<city>/<service>/index.html",
+    ),
+    Stage(
+        "problem-cluster",
+        run_problem_cluster,
+        inputs=(
+            SCRIPTS_DIR / "generate_problem_cluster.py",
+            SCRIPTS_DIR / "third_party_tags.py",
+            SCRIPTS_DIR / "url_policy.py",
+            problem_cluster.CATALOG_PATH,
+        ),
+        outputs="problems/gutters/index.html, problems/gutters/<problem>/index.html",
+    ),
+    Stage(
+        "seo",
+        run_seo,
+        inputs=(
+            SCRIPTS_DIR / "batch_seo_update.py",
+            SCRIPTS_DIR / "html_rewrite.py",
+            SCRIPTS_DIR / "geo_index.py",
+            SCRIPTS_DIR / "url_policy.py",
+            LOCATIONS_PATH,
+        ),
+        outputs="pages/<city>/**/*.html",
+        depends_on=("city-pages",),
+    ),
+    Stage(
+        "favicon",
+        run_favicon,
+        inputs=(SCRIPTS_DIR / "update_favicon.py",),
+        outputs="**/*.html",
+        depends_on=("seo", "problem-cluster"),
+    ),
+    Stage(
+        "critical-css",
+        run_critical_css,
+        inputs=(
+            SCRIPTS_DIR / "critical_css.py",
+            ROOT / "assets" / "css" / "styles.css",
+            ROOT / "assets" / "css" / "landing.css",
+        ),
+        outputs="pages/<city>/<service>/index.html, problems/**/index.html",
+        depends_on=("favicon",),
+    ),
+    Stage(
+        "sitemaps",
+        run_sitemaps,
+        inputs=(
+            SCRIPTS_DIR / "update_sitemaps.py",
+            SCRIPTS_DIR / "url_policy.py",
+            problem_cluster.CATALOG_PATH,
+        ),
+        outputs="sitemap.xml, sitemap-<set>[-N].xml",
+        depends_on=("city-pages", "favicon"),
+        after_flush=True,
+    ),
+    Stage(
+        "redirects",
+        run_redirects,
+        inputs=(SCRIPTS_DIR / "compile_redirects.py", SCRIPTS_DIR / "url_policy.py", redirects.VERCEL_CONFIG_PATH),
+        outputs="vercel.json",
+        after_flush=True,
+    ),
+    Stage(
+        "tags",
+        run_tags,
+        inputs=(SCRIPTS_DIR / "third_party_tags.py",),
+        outputs=".build/tag-report.json",
+        depends_on=("city-pages", "critical-css"),
+        after_flush=True,
+    ),
+    Stage(
+        "links",
+        run_links,
+        inputs=(SCRIPTS_DIR / "check_links.py", SCRIPTS_DIR / "url_policy.py", links.VERCEL_CONFIG_PATH),
+        outputs=".build/link-report.json",
+        depends_on=("sitemaps", "redirects"),
+        after_flush=True,
+    ),
+)
+
+
+def stage_order(stages: Iterable[Stage]) -> list[Stage]:
+    by_name = {stage.name: stage for stage in stages}
+    graph = {stage.name: set(stage.depends_on) for stage in by_name.values()}
+    return [by_name[name] for name in TopologicalSorter(graph).static_order()]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build the site: generate pages, apply SEO and favicon passes, then refresh sitemaps, compile redirects and check links.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore manifests and file indexes and process every page.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Render generated pages and check links across N worker processes (0 = one per CPU).",
+    )
+    parser.add_argument(
+        "--fail-on-broken-links",
+        action="store_true",
+        help="Exit with status 1 if any internal link or asset reference is broken.",
+    )
+    add_profile_arguments(parser)
+    return parser.parse_args()
+
+
+def run_stage(stage: Stage, context: BuildContext) -> tuple[StageRun, dict]:
+    run = StageRun(stage, context)
+    started = time.perf_counter()
+    with PROFILER.stage(stage.name):
+        summary = stage.run(context, run)
+    return run, {
+        "outputs": stage.outputs,
+        "pages_considered": run.considered,
+        "pages_processed": len(run.processed),
+        **summary,
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    with profiling(args, "build_site"), LastmodStore.open() as lastmod:
+        try:
+            LOCATIONS.load()
+        except LocationDataError as exc:
+            raise SystemExit(str(exc)) from exc
+
+        context = BuildContext(lastmod, force=args.force, jobs=jobs)
+        stages = stage_order(STAGES)
+        report: dict[str, dict] = {}
+        runs: list[StageRun] = []
+        for stage in stages:
+            if not stage.after_flush:
+                run, report[stage.name] = run_stage(stage, context)
+                runs.append(run)
+
+        started = time.perf_counter()
+        with PROFILER.stage("flush"):
+            context.flush()
+            for run in runs:
+                run.commit()
+        flush_seconds = time.perf_counter() - started
+
+        for stage in stages:
+            if stage.after_flush:
+                run, report[stage.name] = run_stage(stage, context)
+                run.commit()
+
+    print(
+        json.dumps(
+            {
+                "stages": report,
+                "locations_skipped": LOCATIONS.skipped,
+                "documents_opened": context.documents.opened,
+                "bytes_read": context.documents.bytes_read,
+                **context.stats.summary(),
+                "flush_seconds": round(flush_seconds, 4),
+                "lastmod": {"pages_hashed": lastmod.hashed, "pages_changed": lastmod.changed},
+            },
+            indent=2,
+        )
+    )
+    if args.fail_on_broken_links and context.broken_links:
+        raise SystemExit(f"{context.broken_links} broken links; see {links.REPORT_PATH.relative_to(ROOT)}")
+
+
+if __name__ == "__main__":
+    main()
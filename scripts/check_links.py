@@ -0,0 +1,338 @@
+"""
+Check every internal link and asset reference in the built site.
+
+The set of servable paths is built once from the files on disk, applying the
+vercel.json rules the host uses (see url_policy): cleanUrls (/about.html is
+served as /about), trailingSlash: false (/path/ redirects to /path),
+directory index.html files and the redirect table, in the order Vercel
+applies them. Each HTML page is then scanned with a single regex pass over
+its tags (comments and script/style bodies are skipped) for href, src,
+srcset and poster references and for absolute URLs in <meta content>
+(og:url, og:image). Relative references are resolved against the URL the
+page is actually served at, which differs from its file path for index
+pages. The <loc> entries of the root sitemaps are checked the same way.
+Pages are checked across a process pool.
+
+A reference is broken if it ends nowhere or in a redirect loop, and
+redirecting if it reaches a page only through one or more redirects, each an
+extra round trip for crawlers and visitors. Both are reported per source page
+and per target in .build/link-report.json; stdout gets a JSON summary.
+--fail-on-broken and --fail-on-redirects exit non-zero, so the check can gate
+a build.
+
+    python scripts/check_links.py [--jobs N] [--report PATH] [--fail-on-broken] [--fail-on-redirects]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, NamedTuple
+from urllib.parse import unquote, urljoin, urlsplit
+
+from build_manifest import BUILD_DIR
+from build_profile import add_profile_arguments, profiled, profiling
+from file_index import ROOT, iter_files
+from site_output import write_text_if_changed
+from url_policy import (
+    QUERY_OR_FRAGMENT,
+    SITE_HOST,
+    SITE_URL,
+    VERCEL_CONFIG_PATH,
+    ServingRules,
+    load_serving_rules,
+    site_path,
+)
+
+REPORT_PATH = BUILD_DIR / "link-report.json"
+SITE_HOSTS = frozenset({SITE_HOST, "www." + SITE_HOST})
+# Only these are never served; everything else in the repo is deployed as-is.
+UNSERVED_DIRS = frozenset({"node_modules"})
+# Vercel serves serverless functions in api/ without their extension.
+FUNCTION_DIR = "api"
+FUNCTION_SUFFIXES = (".js", ".ts", ".mjs", ".py")
+SITEMAP_GLOB = "sitemap*.xml"
+SKIPPED_SCHEMES = ("mailto:", "tel:", "sms:", "javascript:", "data:", "blob:")
+MAX_REDIRECTS = 10
+
+# One scan per page: comments, or a start tag with its attribute text. Quoted
+# attribute values may contain ">". The possessive quantifiers keep a stray
+# quote in malformed markup from backtracking exponentially.
+TAG_PATTERN = re.compile(
+    r"<!--.*?-->|<(?P<name>[a-zA-Z][a-zA-Z0-9-]*)(?P<attrs>(?:[^>\"']++|\"[^\"]*+\"|'[^']*+')*+)>",
+    re.DOTALL,
+)
+RAW_TEXT_CLOSE = {
+    "script": re.compile(r"</script\s*>", re.IGNORECASE),
+    "style": re.compile(r"</style\s*>", re.IGNORECASE),
+}
+REFERENCE_ATTR_PATTERN = re.compile(
+    r"(?:^|\s)(?P<attr>href|src|srcset|poster|content)\s*=\s*(?:\"(?P<dq>[^\"]*)\"|'(?P<sq>[^']*)'|(?P<bare>[^\s\"'>]+))",
+    re.IGNORECASE,
+)
+LOC_PATTERN = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>")
+# Placeholders left for client-side templating (${...}, {{...}}) are not links.
+TEMPLATE_PATTERN = re.compile(r"\$\{|\{\{|%7B%7B", re.IGNORECASE)
+
+
+class BrokenLink(NamedTuple):
+    reference: str
+    target: str
+    reason: str
+
+
+class RedirectingLink(NamedTuple):
+    reference: str
+    target: str
+    # Where the redirects end: a site path, or an absolute URL for off-site redirects.
+    served: str
+    hops: int
+
+
+class Resolution(NamedTuple):
+    # Final site path (or off-site URL) the request ends at; None if nothing is served.
+    served: str | None
+    hops: int
+    loop: bool = False
+
+
+class PageResult(NamedTuple):
+    page: str
+    checked: int
+    broken: list[BrokenLink]
+    redirecting: list[RedirectingLink]
+
+
+class SiteIndex:
+    """Every URL path the host would answer, built once from the files on disk."""
+
+    def __init__(self, files: Iterable[str], rules: ServingRules) -> None:
+        self.files = frozenset(files)
+        self.rules = rules
+        # Most targets (nav, logo, stylesheets) repeat on every page.
+        self._resolved: dict[str, Resolution] = {}
+
+    @classmethod
+    @profiled("discovery")
+    def build(cls, root: Path = ROOT, rules: ServingRules | None = None) -> "SiteIndex":
+        files = {"/" + path.relative_to(root).as_posix() for path in iter_files([root], ("",), UNSERVED_DIRS, root)}
+        for path in list(files):
+            if path.startswith(f"/{FUNCTION_DIR}/") and path.endswith(FUNCTION_SUFFIXES):
+                files.add(path.rsplit(".", 1)[0])
+        return cls(files, rules or load_serving_rules(root / VERCEL_CONFIG_PATH.name))
+
+    def serves(self, path: str) -> bool:
+        """True if the host answers path (already in served form) with a file."""
+        if path in self.files:
+            return True
+        stem = path.rstrip("/")
+        if stem + "/index.html" in self.files:
+            return True
+        return self.rules.clean_urls and stem != "" and stem + ".html" in self.files
+
+    def resolve(self, path: str) -> Resolution:
+        """Follow redirects from path to whatever answers it."""
+        resolution = self._resolved.get(path)
+        if resolution is None:
+            resolution = self._resolved[path] = self._resolve(path)
+        return resolution
+
+    def _resolve(self, path: str) -> Resolution:
+        visited = {path}
+        while len(visited) <= MAX_REDIRECTS:
+            destination = self.rules.next_hop(path)
+            if destination is None:
+                return Resolution(path if self.serves(path) else None, len(visited) - 1)
+            parts = urlsplit(destination)
+            if parts.netloc and parts.netloc.lower() not in SITE_HOSTS:
+                # Off-site; whatever answers there is not ours to check.
+                return Resolution(destination, len(visited))
+            path = unquote(parts.path) or "/"
+            if path in visited:
+                return Resolution(None, len(visited), loop=True)
+            visited.add(path)
+        return Resolution(None, len(visited) - 1, loop=True)
+
+
+def iter_references(content: str) -> Iterable[str]:
+    """Yield raw href/src/srcset/poster values and absolute <meta content> URLs, in document order."""
+    position = 0
+    while True:
+        match = TAG_PATTERN.search(content, position)
+        if not match:
+            return
+        position = match.end()
+        name = match.group("name")
+        if name is None:
+            continue
+        name = name.lower()
+        for attr in REFERENCE_ATTR_PATTERN.finditer(match.group("attrs")):
+            value = attr.group("dq")
+            if value is None:
+                value = attr.group("sq") if attr.group("sq") is not None else attr.group("bare")
+            kind = attr.group("attr").lower()
+            if kind == "content":
+                if name == "meta" and value.startswith(("https://", "http://")):
+                    yield value
+            elif kind == "srcset":
+                for candidate in value.split(","):
+                    candidate = candidate.strip().split(" ")[0]
+                    if candidate:
+                        yield candidate
+            else:
+                yield value
+        close = RAW_TEXT_CLOSE.get(name)
+        if close is not None:
+            end = close.search(content, position)
+            position = end.end() if end else len(content)
+
+
+def internal_target(reference: str, base_url: str) -> str | None:
+    """The site path a reference points at, or None for external and non-HTTP references."""
+    reference = reference.strip()
+    if not reference or reference.startswith("#") or reference.lower().startswith(SKIPPED_SCHEMES):
+        return None
+    if TEMPLATE_PATTERN.search(reference):
+        return None
+    if reference.startswith("/") and not reference.startswith("//") and "/." not in reference:
+        # Root-relative and already normalized: no need to join against the page URL.
+        return unquote(QUERY_OR_FRAGMENT.split(reference, 1)[0]) or "/"
+    parts = urlsplit(urljoin(SITE_URL + base_url, reference))
+    if parts.scheme not in ("http", "https") or parts.netloc.lower() not in SITE_HOSTS:
+        return None
+    return unquote(parts.path) or "/"
+
+
+_worker_index: SiteIndex | None = None
+
+
+def _init_worker(index: SiteIndex) -> None:
+    global _worker_index
+    _worker_index = index
+
+
+@profiled("regex")
+def check_page(path: Path, index: SiteIndex | None = None, root: Path = ROOT) -> PageResult:
+    """Check the references in one HTML page or sitemap."""
+    index = index or _worker_index
+    page = "/" + path.relative_to(root).as_posix()
+    content = path.read_text(encoding="utf-8", errors="replace")
+    references = LOC_PATTERN.findall(content) if path.suffix == ".xml" else iter_references(content)
+    base_url = site_path(page, index.rules)
+    result = PageResult(page, 0, [], [])
+    seen: set[str] = set()
+    for reference in references:
+        target = internal_target(reference, base_url)
+        if target is None or target in seen:
+            continue
+        seen.add(target)
+        resolution = index.resolve(target)
+        if resolution.served is None:
+            result.broken.append(BrokenLink(reference, target, "redirect loop" if resolution.loop else "not found"))
+        elif resolution.hops:
+            result.redirecting.append(RedirectingLink(reference, target, resolution.served, resolution.hops))
+    return result._replace(checked=len(seen))
+
+
+def _check_task(path: Path) -> PageResult:
+    return check_page(path)
+
+
+def check_site(jobs: int = 1, root: Path = ROOT) -> tuple[dict, list[PageResult]]:
+    """Check every HTML page and root sitemap under root; returns (summary, pages with findings)."""
+    started = time.perf_counter()
+    index = SiteIndex.build(root)
+    pages = [*iter_files([root], base=root), *sorted(root.glob(SITEMAP_GLOB))]
+    if jobs <= 1 or len(pages) <= 1:
+        results = [check_page(path, index, root) for path in pages]
+    else:
+        # map() yields in submission order, so the report stays deterministic.
+        chunksize = max(1, len(pages) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(index,)) as pool:
+            results = list(pool.map(_check_task, pages, chunksize=chunksize))
+
+    findings = [result for result in results if result.broken or result.redirecting]
+    summary = {
+        "servable_files": len(index.files),
+        "pages_checked": len(pages),
+        "references_checked": sum(result.checked for result in results),
+        "pages_with_broken_links": sum(1 for result in findings if result.broken),
+        "broken_links": sum(len(result.broken) for result in findings),
+        "broken_targets": len({link.target for result in findings for link in result.broken}),
+        "pages_with_redirects": sum(1 for result in findings if result.redirecting),
+        "redirecting_links": sum(len(result.redirecting) for result in findings),
+        "redirecting_targets": len({link.target for result in findings for link in result.redirecting}),
+        "seconds": round(time.perf_counter() - started, 4),
+    }
+    return summary, findings
+
+
+def _by_target(results: list[PageResult], field: str) -> dict[str, dict]:
+    # One bad template link shows up once, with every page that carries it.
+    sources: dict[str, list[str]] = {}
+    details: dict[str, dict] = {}
+    for result in results:
+        for link in getattr(result, field):
+            sources.setdefault(link.target, []).append(result.page)
+            if isinstance(link, RedirectingLink):
+                details[link.target] = {"served": link.served, "hops": link.hops}
+            else:
+                details[link.target] = {"reason": link.reason}
+    return {
+        target: {"count": len(pages), **details.get(target, {}), "pages": pages}
+        for target, pages in sorted(sources.items(), key=lambda item: (-len(item[1]), item[0]))
+    }
+
+
+def write_report(results: list[PageResult], path: Path = REPORT_PATH) -> None:
+    report = {
+        "broken": {
+            "pages": {result.page: [link._asdict() for link in result.broken] for result in results if result.broken},
+            "targets": _by_target(results, "broken"),
+        },
+        "redirects": {
+            "pages": {
+                result.page: [link._asdict() for link in result.redirecting] for result in results if result.redirecting
+            },
+            "targets": _by_target(results, "redirecting"),
+        },
+    }
+    write_text_if_changed(path, json.dumps(report, indent=2) + "\n")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Report broken and redirecting internal links and asset references.")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Check pages across N worker processes (0 = one per CPU).",
+    )
+    parser.add_argument("--report", type=Path, default=REPORT_PATH, help="Where to write the per-page report.")
+    parser.add_argument("--fail-on-broken", action="store_true", help="Exit with status 1 if any link is broken.")
+    parser.add_argument(
+        "--fail-on-redirects",
+        action="store_true",
+        help="Exit with status 1 if any link reaches its page through a redirect.",
+    )
+    add_profile_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    with profiling(args, "check_links"):
+        summary, findings = check_site(jobs)
+        write_report(findings, args.report)
+    print(json.dumps({**summary, "jobs": jobs, "report": str(args.report)}))
+    if (args.fail_on_broken and summary["broken_links"]) or (args.fail_on_redirects and summary["redirecting_links"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Compile the redirect table in vercel.json.
+
+Rules are added by hand, one per indexing fix, and a new rule often points at
+a URL that redirects again: an ".html" destination that cleanUrls sends on, a
+trailing slash that trailingSlash strips, or the source of another rule. This
+replays the table the way Vercel matches it (url_policy.ServingRules.next_hop:
+cleanUrls and trailingSlash first, then the first matching rule) and rewrites
+it so that every rule reaches its final URL in one hop:
+
+- destinations on this site are written in their served form, the same form
+  the generators use for canonicals and links;
+- a destination that redirects again is replaced by where the chain ends;
+- rules that can never fire are dropped: sources Vercel normalizes before the
+  table is consulted ("/about/", "/about.html"), repeats of an earlier
+  source, and literal sources that an earlier pattern already matches;
+- rules whose chain comes back to their own source are dropped, as they only
+  send the request round in a loop.
+
+Conditional (has/missing) rules are kept as written. Destinations with
+placeholders ($1, :name) are only put in served form. Destinations that no
+file serves are reported, not changed. vercel.json is rewritten only when the
+table changes, one rule per line as before; every change is listed in
+.build/redirect-report.json. --check leaves vercel.json alone and exits
+non-zero if it would change.
+
+    python scripts/compile_redirects.py [--check] [--profile [REPORT]]
+"""
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+from build_manifest import BUILD_DIR
+from build_profile import add_profile_arguments, profiled, profiling
+from check_links import MAX_REDIRECTS, SiteIndex
+from site_output import write_text_if_changed
+from url_policy import (
+    PATTERN_SOURCE,
+    SITE_HOST,
+    VERCEL_CONFIG_PATH,
+    ServingRules,
+    compile_source,
+    normalize_url,
+    serving_rules,
+)
+
+REPORT_PATH = BUILD_DIR / "redirect-report.json"
+# Why a rule was dropped.
+NORMALIZED_FIRST = "source is redirected by cleanUrls/trailingSlash first"
+DUPLICATE = "duplicate of an earlier rule"
+SHADOWED = "shadowed by an earlier pattern"
+LOOP = "redirect loop"
+
+
+class Change(NamedTuple):
+    source: str
+    destination: str
+    # The collapsed destination, or None if the rule was dropped.
+    compiled: str | None
+    reason: str
+    hops_removed: int = 0
+
+
+class Chain(NamedTuple):
+    destination: str
+    hops: int
+    # True if the chain came back to a URL it had already passed through.
+    loop: bool
+    # True if the loop passed through the rule's own source.
+    returns: bool
+
+
+def _is_conditional(rule: dict) -> bool:
+    return bool(rule.get("has") or rule.get("missing"))
+
+
+def _has_placeholders(destination: str) -> bool:
+    return "$" in destination or PATTERN_SOURCE.search(urlsplit(destination).path) is not None
+
+
+def follow(source: str, destination: str, rules: ServingRules) -> Chain:
+    """Follow destination through the serving rules to the URL that answers it."""
+    visited = {source}
+    hops = 0
+    while hops <= MAX_REDIRECTS:
+        parts = urlsplit(destination)
+        if parts.netloc and parts.netloc.lower() != SITE_HOST:
+            return Chain(destination, hops, False, False)
+        path = parts.path or "/"
+        if path in visited:
+            return Chain(destination, hops, True, path == source)
+        visited.add(path)
+        next_hop = rules.next_hop(path)
+        if next_hop is None:
+            return Chain(destination, hops, False, False)
+        next_parts = urlsplit(next_hop)
+        if not next_parts.query and not next_parts.fragment:
+            # Vercel carries the query string over to the redirect target.
+            next_hop = next_parts._replace(query=parts.query, fragment=parts.fragment).geturl()
+        destination = next_hop
+        hops += 1
+    return Chain(destination, hops, True, False)
+
+
+def reachable_rules(rules: list[dict], config: dict) -> tuple[list[dict], list[Change]]:
+    """Drop the rules that no request can reach, in Vercel's matching order."""
+    builtin = serving_rules({**config, "redirects": []})
+    kept: list[dict] = []
+    dropped: list[Change] = []
+    sources: set[str] = set()
+    patterns: list[tuple[str, re.Pattern]] = []
+    for rule in rules:
+        source = rule["source"]
+        if _is_conditional(rule):
+            kept.append(rule)
+            continue
+        reason = None
+        if source in sources:
+            reason = DUPLICATE
+        elif PATTERN_SOURCE.search(source):
+            patterns.append((source, compile_source(source)))
+        elif builtin.next_hop(source) is not None:
+            reason = NORMALIZED_FIRST
+        else:
+            shadow = next((earlier for earlier, pattern in patterns if pattern.match(source)), None)
+            if shadow is not None:
+                reason = f"{SHADOWED} {shadow}"
+        sources.add(source)
+        if reason is None:
+            kept.append(rule)
+        else:
+            dropped.append(Change(source, rule["destination"], None, reason))
+    return kept, dropped
+
+
+@profiled("render")
+def compile_redirects(config: dict) -> tuple[list[dict], list[Change]]:
+    """The compiled redirect table for a parsed vercel.json, and what changed."""
+    rules, changes = reachable_rules(list(config.get("redirects", [])), config)
+    # Dropping a looping rule can open up chains through it, so repeat until none is left.
+    while True:
+        table = serving_rules({**config, "redirects": rules})
+        looping = {
+            index
+            for index, rule in enumerate(rules)
+            if not _is_conditional(rule) and follow(rule["source"], rule["destination"], table).returns
+        }
+        if not looping:
+            break
+        for index in sorted(looping):
+            rule = rules[index]
+            changes.append(Change(rule["source"], rule["destination"], None, LOOP))
+        rules = [rule for index, rule in enumerate(rules) if index not in looping]
+
+    compiled: list[dict] = []
+    for rule in rules:
+        if _is_conditional(rule):
+            compiled.append(rule)
+            continue
+        if _has_placeholders(rule["destination"]):
+            compiled.append({**rule, "destination": normalize_url(rule["destination"])})
+            continue
+        chain = follow(rule["source"], rule["destination"], table)
+        if chain.hops and not chain.loop:
+            changes.append(Change(rule["source"], rule["destination"], chain.destination, "chain collapsed", chain.hops))
+            rule = {**rule, "destination": chain.destination}
+        compiled.append(rule)
+    return compiled, changes
+
+
+def missing_destinations(rules: list[dict], index: SiteIndex) -> list[dict]:
+    """Rules whose destination on this site is not served by any file."""
+    missing = []
+    for rule in rules:
+        destination = rule["destination"]
+        parts = urlsplit(destination)
+        if (parts.netloc and parts.netloc.lower() != SITE_HOST) or _has_placeholders(destination):
+            continue
+        resolution = index.resolve(parts.path or "/")
+        if resolution.served is None:
+            missing.append({"source": rule["source"], "destination": destination})
+    return missing
+
+
+def render_config(config: dict) -> str:
+    """vercel.json text: two-space indentation, with one redirect rule per line."""
+    entries = []
+    for key, value in config.items():
+        if key == "redirects" and value:
+            rules = ",\n".join(f"    {json.dumps(rule, ensure_ascii=False)}" for rule in value)
+            text = f"[\n{rules}\n  ]"
+        else:
+            text = json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+        entries.append(f"  {json.dumps(key)}: {text}")
+    return "{\n" + ",\n".join(entries) + "\n}\n"
+
+
+def _summarize(changes: list[Change], before: int, after: int) -> dict:
+    dropped: dict[str, int] = {}
+    for change in changes:
+        if change.compiled is None:
+            reason = SHADOWED if change.reason.startswith(SHADOWED) else change.reason
+            dropped[reason] = dropped.get(reason, 0) + 1
+    return {
+        "rules": before,
+        "rules_compiled": after,
+        "chains_collapsed": sum(1 for change in changes if change.compiled is not None),
+        "hops_removed": sum(change.hops_removed for change in changes),
+        "dropped": dropped,
+    }
+
+
+def build_redirects(
+    path: Path = VERCEL_CONFIG_PATH, check: bool = False, report_path: Path = REPORT_PATH
+) -> dict:
+    """Compile the redirect table in path, rewriting it unless check is set."""
+    original = path.read_text(encoding="utf-8")
+    config = json.loads(original)
+    rules, changes = compile_redirects(config)
+    config = {**config, "redirects": rules} if "redirects" in config else config
+    compiled = render_config(config)
+    changed = json.loads(compiled) != json.loads(original)
+    missing = missing_destinations(rules, SiteIndex.build(path.parent, serving_rules(config)))
+    if changed and not check:
+        write_text_if_changed(path, compiled)
+    report = {
+        "changes": [change._asdict() for change in changes],
+        "missing_destinations": missing,
+    }
+    write_text_if_changed(report_path, json.dumps(report, indent=2) + "\n")
+    return {
+        **_summarize(changes, len(json.loads(original).get("redirects", [])), len(rules)),
+        "missing_destinations": len(missing),
+        "changed": changed,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Collapse redirect chains and drop dead rules in vercel.json.")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Do not rewrite vercel.json; exit with status 1 if the table is not compiled.",
+    )
+    parser.add_argument("--report", type=Path, default=REPORT_PATH, help="Where to write the list of changes.")
+    add_profile_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with profiling(args, "compile_redirects"):
+        summary = build_redirects(check=args.check, report_path=args.report)
+    print(json.dumps({**summary, "report": str(args.report)}))
+    if args.check and summary["changed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
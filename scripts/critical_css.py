@@ -0,0 +1,379 @@
+"""
+Inline the above-the-fold CSS of generated pages and load the full stylesheet
+without blocking render.
+
+The fold is the page's <body> up to its second <section> (header, hero and
+whatever sits between them), capped at FOLD_CHARS. Its tag names, classes and
+ids make up the page's fold signature; every page rendered from the same
+template shares one, whatever city or problem it covers. For each signature
+and stylesheet, the rules that can match something in the fold are extracted
+once: selectors are matched against the signature without their combinators,
+pseudo-classes and attribute tests, so the match errs towards keeping a rule.
+@media and @supports blocks keep only their matching rules; @font-face and
+@keyframes are kept when a kept rule uses them. Extractions are cached in
+.build/critical-css.json by signature and stylesheet contents, so a template
+is extracted once, not once per city.
+
+Each local <link rel="stylesheet"> in <head> becomes
+<style data-critical="HREF">, followed by a preload that switches to a
+stylesheet once loaded, with a <noscript> fallback. Running the pass again
+refreshes the inlined CSS in place.
+"""
+import hashlib
+import json
+import re
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+from build_manifest import BUILD_DIR, hash_inputs, source_version
+from build_profile import profiled
+from site_output import write_text_if_changed
+from url_policy import ROOT
+
+CACHE_PATH = BUILD_DIR / "critical-css.json"
+# Bump when the extraction changes, so cached CSS is recomputed.
+CACHE_FORMAT = 1
+FOLD_CHARS = 24 * 1024
+# Group at-rules whose children are rules; their prelude is kept as written.
+GROUP_AT_RULES = ("@media", "@supports", "@layer", "@container")
+
+HEAD_END_PATTERN = re.compile(r"</head\s*>", re.IGNORECASE)
+BODY_PATTERN = re.compile(r"<body\b", re.IGNORECASE)
+SECTION_PATTERN = re.compile(r"<section\b", re.IGNORECASE)
+START_TAG_PATTERN = re.compile(r"<([a-zA-Z][a-zA-Z0-9-]*)((?:[^>\"']++|\"[^\"]*+\"|'[^']*+')*+)>")
+CLASS_ATTR_PATTERN = re.compile(r"""\sclass\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+ID_ATTR_PATTERN = re.compile(r"""\sid\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+STYLESHEET_LINK_PATTERN = re.compile(
+    r"""<link\b(?=[^>]*\srel\s*=\s*["']?stylesheet["']?)[^>]*\bhref\s*=\s*["']([^"']+)["'][^>]*>""",
+    re.IGNORECASE,
+)
+NOSCRIPT_PATTERN = re.compile(r"<noscript\b.*?</noscript\s*>", re.IGNORECASE | re.DOTALL)
+CRITICAL_BLOCK_PATTERN = re.compile(r'<style data-critical="([^"]*)">.*?</style>', re.DOTALL)
+INDENTATION_PATTERN = re.compile(r"[ \t]*")
+COMMENT_PATTERN = re.compile(r"/\*.*?\*/", re.DOTALL)
+# Parts of a selector that do not narrow which elements it can match.
+PSEUDO_PATTERN = re.compile(r"::?[a-zA-Z-]+(?:\((?:[^()]|\([^()]*\))*\))?")
+ATTRIBUTE_PATTERN = re.compile(r"\[[^\]]*\]")
+COMBINATOR_PATTERN = re.compile(r"\s*[>+~]\s*|\s+")
+SIMPLE_PATTERN = re.compile(r"([.#]?)((?:\\.|[\w-])+|\*)")
+FONT_FAMILY_PATTERN = re.compile(r"font-family\s*:\s*([^;}]+)", re.IGNORECASE)
+ANIMATION_PATTERN = re.compile(r"animation(?:-name)?\s*:\s*([^;}]+)", re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+PUNCTUATION_SPACE_PATTERN = re.compile(r"\s*([{};:,])\s*")
+STRING_PATTERN = re.compile(r"(\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')")
+URL_PATTERN = re.compile(r"""url\(\s*(["']?)([^"')]+)\1\s*\)""")
+
+
+class Rule(NamedTuple):
+    # A style rule (prelude is its selector list), an at-rule with a
+    # declaration block (body), or a group at-rule (children).
+    prelude: str
+    body: str | None = None
+    children: tuple["Rule", ...] | None = None
+
+
+class FoldSignature(NamedTuple):
+    tags: frozenset[str]
+    classes: frozenset[str]
+    ids: frozenset[str]
+
+    def digest(self) -> str:
+        return hash_inputs(sorted(self.tags), sorted(self.classes), sorted(self.ids))
+
+
+def _skip_string(text: str, position: int) -> int:
+    quote = text[position]
+    position += 1
+    while position < len(text) and text[position] != quote:
+        position += 2 if text[position] == "\\" else 1
+    return position + 1
+
+
+def _scan(text: str, position: int, stops: str) -> int:
+    """Index of the first character in stops at nesting depth 0, skipping strings and (...)."""
+    depth = 0
+    while position < len(text):
+        char = text[position]
+        if char in "\"'":
+            position = _skip_string(text, position)
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(0, depth - 1)
+        elif depth == 0 and char in stops:
+            return position
+        position += 1
+    return position
+
+
+def _block_end(text: str, position: int) -> int:
+    """Index of the "}" closing the block whose "{" is just before position."""
+    depth = 1
+    while position < len(text):
+        char = text[position]
+        if char in "\"'":
+            position = _skip_string(text, position)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return position
+        position += 1
+    return position
+
+
+def _parse(text: str, position: int = 0, end: int | None = None) -> list[Rule]:
+    end = len(text) if end is None else end
+    rules: list[Rule] = []
+    while position < end:
+        stop = min(_scan(text, position, "{;}"), end)
+        prelude = text[position:stop].strip()
+        if stop >= end or text[stop] == "}":
+            # Stray closing brace or trailing text; nothing to keep.
+            position = stop + 1
+            continue
+        if text[stop] == ";":
+            if prelude:
+                rules.append(Rule(prelude))
+            position = stop + 1
+            continue
+        close = _block_end(text, stop + 1)
+        if prelude.lower().startswith(GROUP_AT_RULES):
+            rules.append(Rule(prelude, children=tuple(_parse(text, stop + 1, close))))
+        elif prelude:
+            rules.append(Rule(prelude, body=text[stop + 1 : close]))
+        position = close + 1
+    return rules
+
+
+@profiled("regex")
+def parse_stylesheet(text: str) -> list[Rule]:
+    return _parse(COMMENT_PATTERN.sub("", text))
+
+
+def fold_markup(content: str) -> str:
+    """The above-the-fold part of a page's body."""
+    head_end = HEAD_END_PATTERN.search(content)
+    body = BODY_PATTERN.search(content, head_end.end() if head_end else 0)
+    start = body.start() if body else (head_end.end() if head_end else 0)
+    end = min(len(content), start + FOLD_CHARS)
+    sections = SECTION_PATTERN.finditer(content, start, end)
+    next(sections, None)
+    second = next(sections, None)
+    return content[start : second.start() if second else end]
+
+
+@profiled("regex")
+def fold_signature(content: str) -> FoldSignature:
+    tags = {"html", "body"}
+    classes: set[str] = set()
+    ids: set[str] = set()
+    for match in START_TAG_PATTERN.finditer(fold_markup(content)):
+        tags.add(match.group(1).lower())
+        attrs = match.group(2)
+        for attr in CLASS_ATTR_PATTERN.finditer(attrs):
+            classes.update((attr.group(1) or attr.group(2) or "").split())
+        for attr in ID_ATTR_PATTERN.finditer(attrs):
+            ids.add((attr.group(1) or attr.group(2) or "").strip())
+    return FoldSignature(frozenset(tags), frozenset(classes), frozenset(ids))
+
+
+def selector_matches(selector: str, signature: FoldSignature) -> bool:
+    """True if selector could match an element of the fold."""
+    selector = ATTRIBUTE_PATTERN.sub("", PSEUDO_PATTERN.sub("", selector))
+    for compound in COMBINATOR_PATTERN.split(selector.strip()):
+        for prefix, name in SIMPLE_PATTERN.findall(compound):
+            name = name.replace("\\", "")
+            if prefix == ".":
+                if name not in signature.classes:
+                    return False
+            elif prefix == "#":
+                if name not in signature.ids:
+                    return False
+            elif name != "*" and name.lower() not in signature.tags:
+                return False
+    return True
+
+
+def _minify(text: str, declarations: bool = True) -> str:
+    """Collapse whitespace outside strings; in declarations, also around punctuation."""
+    parts = STRING_PATTERN.split(text)
+    for index in range(0, len(parts), 2):
+        part = WHITESPACE_PATTERN.sub(" ", parts[index])
+        parts[index] = PUNCTUATION_SPACE_PATTERN.sub(r"\1", part) if declarations else part
+    return "".join(parts).strip()
+
+
+def _split_selectors(prelude: str) -> list[str]:
+    selectors = []
+    position = 0
+    while position < len(prelude):
+        stop = _scan(prelude, position, ",")
+        selectors.append(prelude[position:stop].strip())
+        position = stop + 1
+    return [selector for selector in selectors if selector]
+
+
+def _select(rules: Iterable[Rule], signature: FoldSignature) -> list[str]:
+    kept: list[str] = []
+    for rule in rules:
+        if rule.children is not None:
+            inner = _select(rule.children, signature)
+            if inner:
+                kept.append(f"{_minify(rule.prelude, declarations=False)}{{{''.join(inner)}}}")
+        elif rule.prelude.startswith("@"):
+            continue
+        elif rule.body is not None:
+            selectors = [selector for selector in _split_selectors(rule.prelude) if selector_matches(selector, signature)]
+            if selectors:
+                kept.append(f"{','.join(_minify(selector, declarations=False) for selector in selectors)}{{{_minify(rule.body)}}}")
+    return kept
+
+
+def _names(pattern: re.Pattern, css: str) -> set[str]:
+    names = set()
+    for match in pattern.finditer(css):
+        names.update(part.strip().strip("\"'").lower() for part in re.split(r"[,\s]+", match.group(1)) if part.strip())
+    return names
+
+
+@profiled("render")
+def extract_critical(rules: list[Rule], signature: FoldSignature) -> str:
+    """The rules of a parsed stylesheet that the fold can use, minified."""
+    selected = "".join(_select(rules, signature))
+    fonts = _names(FONT_FAMILY_PATTERN, selected)
+    animations = _names(ANIMATION_PATTERN, selected)
+    extras = []
+    for rule in rules:
+        name = rule.prelude.lower()
+        if rule.body is None or not name.startswith("@"):
+            continue
+        if name.startswith("@font-face") and _names(FONT_FAMILY_PATTERN, rule.body) & fonts:
+            extras.append(f"@font-face{{{_minify(rule.body)}}}")
+        elif name.startswith(("@keyframes", "@-webkit-keyframes")) and name.split()[-1] in animations:
+            extras.append(f"{_minify(rule.prelude, declarations=False)}{{{_minify(rule.body)}}}")
+    return "".join(extras) + selected
+
+
+def rebase_urls(css: str, stylesheet: Path) -> str:
+    """Rewrite url() references relative to the stylesheet as root-relative paths, for use inline."""
+
+    def rebase(match: re.Match) -> str:
+        url = match.group(2).strip()
+        if url.startswith(("/", "#", "data:")) or "://" in url:
+            return match.group(0)
+        path = (stylesheet.parent / url).resolve()
+        try:
+            return f"url('/{path.relative_to(ROOT).as_posix()}')"
+        except ValueError:
+            return match.group(0)
+
+    return URL_PATTERN.sub(rebase, css)
+
+
+def _local_stylesheet(href: str, page: Path) -> Path | None:
+    if "://" in href or href.startswith("//"):
+        return None
+    href = href.split("?", 1)[0].split("#", 1)[0]
+    path = ROOT / href.lstrip("/") if href.startswith("/") else page.parent / href
+    return path if path.is_file() else None
+
+
+def _line_indentation(text: str, position: int) -> str:
+    return INDENTATION_PATTERN.match(text, text.rfind("\n", 0, position) + 1).group(0)
+
+
+def _async_stylesheet(href: str, critical: str, indentation: str = "") -> str:
+    return (
+        f'<style data-critical="{href}">{critical}</style>\n{indentation}'
+        f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">\n{indentation}'
+        f'<noscript><link rel="stylesheet" href="{href}"></noscript>'
+    )
+
+
+class CriticalCss:
+    """Critical CSS per (fold signature, stylesheet), kept across builds in .build/critical-css.json."""
+
+    def __init__(self, path: Path = CACHE_PATH, entries: dict[str, str] | None = None) -> None:
+        self.path = path
+        self.entries = entries or {}
+        self.hits = 0
+        self.extracted = 0
+        self._used: set[str] = set()
+        self._stylesheets: dict[Path, tuple[str, list[Rule]]] = {}
+
+    @classmethod
+    def load(cls, path: Path = CACHE_PATH) -> "CriticalCss":
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            data = {}
+        if data.get("format") != CACHE_FORMAT:
+            data = {}
+        return cls(path, data.get("entries"))
+
+    def _stylesheet(self, path: Path) -> tuple[str, list[Rule]]:
+        cached = self._stylesheets.get(path)
+        if cached is None:
+            text = path.read_text(encoding="utf-8")
+            version = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            cached = self._stylesheets[path] = (version, parse_stylesheet(text))
+        return cached
+
+    def critical(self, signature: FoldSignature, stylesheet: Path) -> str:
+        version, rules = self._stylesheet(stylesheet)
+        relative = stylesheet.resolve().relative_to(ROOT).as_posix()
+        key = hash_inputs(CACHE_FORMAT, source_version(__file__), signature.digest(), relative, version)
+        self._used.add(key)
+        css = self.entries.get(key)
+        if css is None:
+            css = self.entries[key] = rebase_urls(extract_critical(rules, signature), stylesheet)
+            self.extracted += 1
+        else:
+            self.hits += 1
+        return css
+
+    @profiled("render")
+    def inline(self, content: str, page: Path) -> str:
+        """content with each local stylesheet in <head> inlined as critical CSS and loaded asynchronously."""
+        head_end = HEAD_END_PATTERN.search(content)
+        if head_end is None:
+            return content
+        head = content[: head_end.start()]
+        signature = fold_signature(content)
+
+        def refresh(match: re.Match) -> str:
+            stylesheet = _local_stylesheet(match.group(1), page)
+            if stylesheet is None:
+                return match.group(0)
+            return f'<style data-critical="{match.group(1)}">{self.critical(signature, stylesheet)}</style>'
+
+        head = CRITICAL_BLOCK_PATTERN.sub(refresh, head)
+        # Stylesheet links inside <noscript> are the fallbacks of an earlier pass.
+        fallbacks = [noscript.span() for noscript in NOSCRIPT_PATTERN.finditer(head)]
+        pieces = []
+        position = 0
+        for link in STYLESHEET_LINK_PATTERN.finditer(head):
+            if any(start <= link.start() < end for start, end in fallbacks):
+                continue
+            stylesheet = _local_stylesheet(link.group(1), page)
+            if stylesheet is None:
+                continue
+            # The preload and fallback go on lines of their own, indented like the link's line.
+            critical = self.critical(signature, stylesheet)
+            pieces.append(head[position : link.start()])
+            pieces.append(_async_stylesheet(link.group(1), critical, _line_indentation(head, link.start())))
+            position = link.end()
+        pieces.append(head[position:])
+        return "".join(pieces) + content[head_end.start() :]
+
+    def summary(self) -> dict:
+        return {"templates": len(self._used), "extracted": self.extracted, "cache_hits": self.hits}
+
+    def save(self, prune: bool = False) -> None:
+        """Write the cache; with prune, keep only the entries used since load (after a pass over every page)."""
+        entries = {key: css for key, css in self.entries.items() if key in self._used} if prune else self.entries
+        write_text_if_changed(self.path, json.dumps({"format": CACHE_FORMAT, "entries": entries}, indent=1) + "\n")
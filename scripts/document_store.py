@@ -0,0 +1,213 @@
+"""
+HTML documents loaded once per build and edited in memory.
+
+A Document is split into its head (everything up to and including the first
+</head>) and its body (the rest). Opening one reads only the head, in small
+chunks; the body is read on first use and stays undecoded bytes unless a
+caller asks for text. A stage that only edits <head> therefore never decodes
+the body, and writing the document back splices the original body bytes in
+unchanged. The DocumentStore hands every stage the same Document objects and
+writes the ones that changed once, at the end of the build.
+"""
+import re
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterator
+
+from build_profile import PROFILER, profiled
+from file_index import HTML_SUFFIXES, iter_files
+from site_output import FAILED, OutputStats, write_bytes_if_changed
+
+HEAD_END = b"</head>"
+HEAD_CHUNK_SIZE = 4 * 1024
+# Heads on this site end within 16 KB; longer ones are found with a full read.
+HEAD_READ_LIMIT = 64 * 1024
+HEAD_END_PATTERN = re.compile(r"</head>", re.IGNORECASE)
+
+
+def read_head(f: BinaryIO) -> tuple[bytes, int, bool]:
+    """Read f in chunks until the first </head> or HEAD_READ_LIMIT bytes.
+
+    Returns (buffer, head_end, eof): head_end is the offset just past
+    </head> in buffer, or -1 if it was not found.
+    """
+    buffer = b""
+    lowered = b""
+    while len(buffer) < HEAD_READ_LIMIT:
+        chunk = f.read(HEAD_CHUNK_SIZE)
+        if not chunk:
+            return buffer, -1, True
+        # Re-check the tail of the previous chunk in case the tag straddles two reads.
+        search_from = max(0, len(buffer) - len(HEAD_END) + 1)
+        buffer += chunk
+        lowered += chunk.lower()
+        position = lowered.find(HEAD_END, search_from)
+        if position >= 0:
+            return buffer, position + len(HEAD_END), False
+    return buffer, -1, False
+
+
+def split_head(text: str) -> tuple[str, str]:
+    """Split text just after the first </head>; a page without one is all body."""
+    match = HEAD_END_PATTERN.search(text)
+    if not match:
+        return "", text
+    return text[:match.end()], text[match.end():]
+
+
+class Document:
+    def __init__(self, path: Path, head: str, body: str | None = None) -> None:
+        self.path = path
+        self.head = head
+        self.dirty = False
+        self.bytes_read = 0
+        self._body = body
+        # Undecoded body: bytes already read past the head, then the rest of the file.
+        self._body_prefix = b""
+        self._body_offset: int | None = None
+        self._body_bytes: bytes | None = None
+
+    @classmethod
+    @profiled("read")
+    def open(cls, path: Path) -> "Document":
+        with path.open("rb") as f:
+            buffer, head_end, eof = read_head(f)
+            if head_end < 0 and not eof:
+                buffer += f.read()
+                head_end = buffer.lower().find(HEAD_END)
+                head_end = head_end + len(HEAD_END) if head_end >= 0 else -1
+                eof = True
+        if head_end < 0:
+            head_end = 0
+        document = cls(path, buffer[:head_end].decode("utf-8"))
+        document.bytes_read = len(buffer)
+        PROFILER.count("bytes_read", len(buffer))
+        if eof:
+            document._body_bytes = buffer[head_end:]
+        else:
+            document._body_prefix = buffer[head_end:]
+            document._body_offset = len(buffer)
+        return document
+
+    @classmethod
+    def from_text(cls, path: Path, text: str) -> "Document":
+        document = cls(path, *split_head(text))
+        document.dirty = True
+        return document
+
+    @property
+    def has_head(self) -> bool:
+        return bool(self.head)
+
+    @profiled("read")
+    def body_bytes(self) -> bytes:
+        if self._body_bytes is None:
+            if self._body is not None:
+                return self._body.encode("utf-8")
+            with self.path.open("rb") as f:
+                f.seek(self._body_offset or 0)
+                rest = f.read()
+            self.bytes_read += len(rest)
+            PROFILER.count("bytes_read", len(rest))
+            self._body_bytes = self._body_prefix + rest
+            self._body_prefix = b""
+        return self._body_bytes
+
+    @property
+    def body(self) -> str:
+        if self._body is None:
+            self._body = self.body_bytes().decode("utf-8")
+        return self._body
+
+    @property
+    def text(self) -> str:
+        return self.head + self.body
+
+    def set_head(self, head: str) -> bool:
+        """Replace the head, leaving the body untouched; returns True if it changed."""
+        if head == self.head:
+            return False
+        self.head = head
+        self.dirty = True
+        return True
+
+    def set_text(self, text: str) -> bool:
+        """Replace the whole document; returns True if it changed."""
+        if text == self.text:
+            return False
+        self.head, self._body = split_head(text)
+        self._body_bytes = None
+        self.dirty = True
+        return True
+
+    def to_bytes(self) -> bytes:
+        if self._body is not None:
+            return (self.head + self._body).encode("utf-8")
+        return self.head.encode("utf-8") + self.body_bytes()
+
+
+class DocumentStore:
+    def __init__(self) -> None:
+        self._documents: dict[Path, Document] = {}
+        self.opened = 0
+
+    def get(self, path: Path) -> Document:
+        document = self._documents.get(path)
+        if document is None:
+            document = Document.open(path)
+            self._documents[path] = document
+            self.opened += 1
+        return document
+
+    def put(self, path: Path, text: str) -> Document:
+        """Set a document's full text, creating it in memory if it is not loaded."""
+        document = self._documents.get(path)
+        if document is None:
+            document = Document.from_text(path, text)
+            self._documents[path] = document
+        else:
+            document.set_text(text)
+        return document
+
+    def is_dirty(self, path: Path) -> bool:
+        document = self._documents.get(path)
+        return document is not None and document.dirty
+
+    def dirty(self) -> Iterator[Document]:
+        return (document for document in self._documents.values() if document.dirty)
+
+    @profiled("discovery")
+    def pages(self, root: Path, suffixes: tuple[str, ...] = HTML_SUFFIXES) -> list[Path]:
+        """Pages on disk under root plus any created in memory and not yet written."""
+        found = set(iter_files([root], suffixes))
+        found.update(
+            document.path
+            for document in self.dirty()
+            if document.path.is_relative_to(root) and document.path.name.endswith(suffixes)
+        )
+        return sorted(found)
+
+    @property
+    def bytes_read(self) -> int:
+        return sum(document.bytes_read for document in self._documents.values())
+
+    @profiled("write")
+    def flush(
+        self,
+        stats: OutputStats | None = None,
+        on_write: Callable[[Path, bytes, str], object] | None = None,
+    ) -> set[Path]:
+        """Write every dirty document; returns the paths that failed.
+
+        on_write, if given, is called with (path, bytes, status) for each one.
+        """
+        failed: set[Path] = set()
+        for document in sorted(self.dirty(), key=lambda document: document.path):
+            data = document.to_bytes()
+            status = write_bytes_if_changed(document.path, data, stats)
+            if on_write is not None:
+                on_write(document.path, data, status)
+            if status == FAILED:
+                failed.add(document.path)
+            else:
+                document.dirty = False
+        return failed
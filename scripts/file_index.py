@@ -0,0 +1,135 @@
+"""
+File discovery shared by the site scripts.
+
+iter_files() walks only the roots it is given and prunes heavy or irrelevant
+directories (images, photo drops, node_modules, hidden dirs) before descending
+into them. FileIndex remembers the (mtime, size) of every file a script has
+already processed so later runs only open new or changed files.
+"""
+import json
+import os
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from build_manifest import BUILD_DIR
+from build_profile import profiled
+from site_output import write_text_if_changed
+
+ROOT = Path(__file__).resolve().parents[1]
+HTML_SUFFIXES = (".html", ".htm")
+# Directory names (at any depth) or root-relative paths that never hold pages.
+PRUNED_DIRS = frozenset({"assets", "incoming-photos", "jobs", "node_modules", "supabase"})
+INDEX_FORMAT = 1
+
+
+@profiled("discovery")
+def iter_files(
+    roots: Iterable[str | Path] = (ROOT,),
+    suffixes: tuple[str, ...] = HTML_SUFFIXES,
+    exclude: Iterable[str] = PRUNED_DIRS,
+    base: Path = ROOT,
+) -> Iterator[Path]:
+    """Yield files under roots whose name ends with one of suffixes, in sorted order.
+
+    Hidden directories are always skipped. Entries in exclude match either a
+    directory name anywhere in the tree or a path relative to base.
+    """
+    excluded = set(exclude)
+    for root in roots:
+        root = Path(root)
+        if not root.is_absolute():
+            root = base / root
+        if root.is_file():
+            if root.name.endswith(suffixes):
+                yield root
+            continue
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name.startswith(".") or entry.name in excluded:
+                        continue
+                    if Path(entry.path).relative_to(base).as_posix() in excluded:
+                        continue
+                    subdirs.append(Path(entry.path))
+                elif entry.name.endswith(suffixes):
+                    yield Path(entry.path)
+            # Reversed so the stack pops subdirectories in sorted order.
+            stack.extend(reversed(subdirs))
+
+
+class FileIndex:
+    """(mtime_ns, size) of files as they were after a script last handled them."""
+
+    def __init__(
+        self,
+        path: Path,
+        entries: dict[str, list[int]] | None = None,
+        base: Path = ROOT,
+        version: str = "",
+    ) -> None:
+        self.path = path
+        self.base = base
+        self.version = version
+        self.entries: dict[str, list[int]] = entries or {}
+        self.seen: set[str] = set()
+        self.current = 0
+        self.changed = 0
+
+    @classmethod
+    def load(cls, name: str, base: Path = ROOT, version: str = "") -> "FileIndex":
+        """Load the index saved under name; a different version starts it empty."""
+        path = BUILD_DIR / f"{name}-file-index.json"
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return cls(path, base=base, version=version)
+        if data.get("format") != INDEX_FORMAT or data.get("version", "") != version:
+            return cls(path, base=base, version=version)
+        return cls(path, dict(data.get("files", {})), base=base, version=version)
+
+    def _key(self, path: Path) -> str:
+        return path.relative_to(self.base).as_posix()
+
+    @staticmethod
+    def _signature(path: Path) -> list[int] | None:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def is_current(self, path: Path) -> bool:
+        """True if path is unchanged since it was last recorded."""
+        key = self._key(path)
+        self.seen.add(key)
+        signature = self.entries.get(key)
+        if signature is not None and signature == self._signature(path):
+            self.current += 1
+            return True
+        self.changed += 1
+        return False
+
+    def record(self, path: Path) -> None:
+        key = self._key(path)
+        self.seen.add(key)
+        signature = self._signature(path)
+        if signature is None:
+            self.entries.pop(key, None)
+        else:
+            self.entries[key] = signature
+
+    def save(self) -> None:
+        # Forget files that were not seen this run so deleted pages do not linger.
+        files = {key: self.entries[key] for key in sorted(self.seen) if key in self.entries}
+        payload = json.dumps(
+            {"format": INDEX_FORMAT, "version": self.version, "files": files},
+            separators=(",", ":"),
+        ) + "\n"
+        write_text_if_changed(self.path, payload)
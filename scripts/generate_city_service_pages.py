@@ -1,11 +1,39 @@
+import argparse
 import html
 import json
+import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from textwrap import dedent
 
+from build_manifest import BUILD_DIR, BuildManifest, hash_inputs, source_version
+from build_profile import add_profile_arguments, profiled, profiling
+from lastmod_store import LastmodStore
+from location_registry import LOCATIONS, LocationDataError
+import page_templates
+import third_party_tags
+import url_policy
+from page_templates import Template
+from site_output import FAILED, OutputStats, write_bytes_if_changed
+
 ROOT = Path(__file__).resolve().parents[1]
 PAGES_DIR = ROOT / "pages"
+MANIFEST_PATH = BUILD_DIR / "city-service-manifest.json"
+# Any edit to this file (templates, section copy, configs), to the template
+# compiler, the tag loading policy or the URL policy invalidates every page.
+GENERATOR_VERSION = hash_inputs(
+    source_version(__file__),
+    source_version(page_templates.__file__),
+    source_version(third_party_tags.__file__),
+    source_version(url_policy.__file__),
+    url_policy.URL_FORM,
+)
+# Cities missing from locations.json fall back to the <h1> of their index page,
+# which sits in the first ~7 KB; never read more than this.
+FALLBACK_READ_BYTES = 16 * 1024
+CITY_HEADING_PATTERN = re.compile(r"<h1>Gutter Cleaning (.*?)</h1>")
 
 HEADER_HTML = dedent(
     """
@@ -45,17 +73,17 @@ FOOTER_HTML = dedent(
             <div>
               <h3>Services</h3>
               <ul>
-                <li><a href=\"/gutters.html\">Gutter installations</a></li>
-                <li><a href=\"/compliance.html\">Drainage Compliance</a></li>
-                <li><a href=\"/service-areas/bellevue.html\">Bellevue service area</a></li>
+                <li><a href=\"/gutters\">Gutter installations</a></li>
+                <li><a href=\"/compliance\">Drainage Compliance</a></li>
+                <li><a href=\"/service-areas/bellevue\">Bellevue service area</a></li>
               </ul>
             </div>
             <div class=\"footer-resources\">
               <h3>Resources</h3>
               <ul>
-                <li><a href=\"/blog.html\">Read our maintenance guides</a></li>
-                <li><a href=\"/contact.html\">Schedule a consultation</a></li>
-                <li><a href=\"/portfolio.html\">View project portfolio</a></li>
+                <li><a href=\"/blog\">Read our maintenance guides</a></li>
+                <li><a href=\"/contact\">Schedule a consultation</a></li>
+                <li><a href=\"/portfolio\">View project portfolio</a></li>
               </ul>
             </div>
           </div>
@@ -95,41 +123,8 @@ LOCAL_BUSINESS_SCHEMA = {
     ],
 }
 
-GA_SNIPPET = dedent(
-    """
-      <!-- Google tag (gtag.js) -->
-      <script async src=\"https://www.googletagmanager.com/gtag/js?id=G-P1VX9FY873\"></script>
-      <script>
-        window.dataLayer = window.dataLayer || [];
-        function gtag(){dataLayer.push(arguments);}
-        gtag('js', new Date());
-        gtag('config', 'AW-11395982028');
-        gtag('config', 'G-P1VX9FY873');
-      </script>
-    """
-).strip()
-
-META_PIXEL = dedent(
-    """
-      <!-- Meta Pixel Code -->
-      <script>
-      !function(f,b,e,v,n,t,s)
-      {if(f.fbq)return;n=f.fbq=function(){n.callMethod?
-      n.callMethod.apply(n,arguments):n.queue.push(arguments)};
-      if(!f._fbq)f._fbq=n;n.push=n;n.loaded=!0;n.version='2.0';
-      n.queue=[];t=b.createElement(e);t.async=!0;
-      t.src=v;s=b.getElementsByTagName(e)[0];
-      s.parentNode.insertBefore(t,s)}(window, document,'script',
-      'https://connect.facebook.net/en_US/fbevents.js');
-      fbq('init', '841512635074584');
-      fbq('track', 'PageView');
-      </script>
-      <noscript><img height=\"1\" width=\"1\" style=\"display:none\"
-      src=\"https://www.facebook.com/tr?id=841512635074584&ev=PageView&noscript=1\"
-      /></noscript>
-      <!-- End Meta Pixel Code -->
-    """
-).strip()
+# Third-party tags in every page's <head>; when each one loads is set in third_party_tags.POLICY.
+THIRD_PARTY_TAGS = ("gtag", "meta-pixel")
 
 FONTS = dedent(
     """
@@ -148,123 +143,100 @@ FONTS = dedent(
 SERVICE_CONFIGS = {}
 
 
-def _base_head(city_slug: str, city_name: str, service_slug: str, service_name: str, title: str, description: str) -> str:
-    canonical = f"https://ospreyexterior.com/pages/{city_slug}/{service_slug}/"
-    og_image = "https://ospreyexterior.com/assets/images/gutter-full-of-leaves-after.webp"
-    ld_json = {
-        "@context": "https://schema.org",
-        "@graph": [
-            LOCAL_BUSINESS_SCHEMA,
-            {
-                "@type": "Service",
-                "@id": f"{canonical}#service",
-                "serviceType": service_name,
-                "name": f"{service_name} {city_name}",
-                "provider": {"@id": "https://ospreyexterior.com/#localbusiness"},
-                "areaServed": [{"@type": "City", "name": city_name}],
-                "description": description,
-                "image": og_image,
-            },
-        ],
-    }
-    head = f"""
+OG_IMAGE = "https://ospreyexterior.com/assets/images/gutter-full-of-leaves-after.webp"
+
+HEAD_TEMPLATE = Template(
+    """
     <head>
       <meta charset=\"utf-8\">
       <meta http-equiv=\"x-ua-compatible\" content=\"ie=edge\">
       <meta name=\"viewport\" content=\"width=device-width, initial-scale=1\">
-      <title>{html.escape(title)}</title>
-      <meta name=\"description\" content=\"{html.escape(description)}\">
+      <title>{title}</title>
+      <meta name=\"description\" content=\"{description}\">
       {FONTS}
       <link rel=\"canonical\" href=\"{canonical}\">
       <meta property=\"og:locale\" content=\"en_US\">
       <meta property=\"og:type\" content=\"website\">
       <meta property=\"og:site_name\" content=\"Osprey Exterior\">
-      <meta property=\"og:title\" content=\"{html.escape(title)}\">
-      <meta property=\"og:description\" content=\"{html.escape(description)}\">
+      <meta property=\"og:title\" content=\"{title}\">
+      <meta property=\"og:description\" content=\"{description}\">
       <meta property=\"og:url\" content=\"{canonical}\">
-      <meta property=\"og:image\" content=\"{og_image}\">
-      <meta property=\"og:image:alt\" content=\"Freshly serviced gutters in {html.escape(city_name)}\">
+      <meta property=\"og:image\" content=\"{OG_IMAGE}\">
+      <meta property=\"og:image:alt\" content=\"Freshly serviced gutters in {city_html}\">
       <meta property=\"og:image:width\" content=\"1600\">
       <meta property=\"og:image:height\" content=\"1067\">
       <meta name=\"twitter:card\" content=\"summary_large_image\">
       <meta name=\"twitter:site\" content=\"@ospreyexterior\">
       <meta name=\"twitter:creator\" content=\"@ospreyexterior\">
-      <meta name=\"twitter:title\" content=\"{html.escape(title)}\">
-      <meta name=\"twitter:description\" content=\"{html.escape(description)}\">
-      <meta name=\"twitter:image\" content=\"{og_image}\">
-      {GA_SNIPPET}
-      {META_PIXEL}
-      <script type=\"application/ld+json\">{json.dumps(ld_json, separators=(",", ":"))}</script>
+      <meta name=\"twitter:title\" content=\"{title}\">
+      <meta name=\"twitter:description\" content=\"{description}\">
+      <meta name=\"twitter:image\" content=\"{OG_IMAGE}\">
+      {TAGS}
+      <script type=\"application/ld+json\">{ld_json}</script>
     </head>
-    """
-    return dedent(head)
+    """,
+    constants={"FONTS": FONTS, "TAGS": third_party_tags.render_tags(THIRD_PARTY_TAGS), "OG_IMAGE": OG_IMAGE},
+    strip=False,
+)
 
+FORM_TEMPLATE = Template(
+    """
+    <form class=\"form-card\" id=\"quote\" data-supabase data-event=\"generate_lead\">
+      <h2>Request {service_lower} details</h2>
+      <p>Share your project scope in {city_html}. We confirm pricing, scheduling, and next steps within one business day.</p>
+      <div class=\"form-grid\">
+        <div>
+          <label for=\"{slug_dash}-name\">Name</label>
+          <input id=\"{slug_dash}-name\" name=\"name\" required>
+        </div>
+        <div>
+          <label for=\"{slug_dash}-phone\">Phone</label>
+          <input id=\"{slug_dash}-phone\" name=\"phone\" type=\"tel\" required>
+        </div>
+        <div>
+          <label for=\"{slug_dash}-email\">Email</label>
+          <input id=\"{slug_dash}-email\" name=\"email\" type=\"email\" required>
+        </div>
+        <div class=\"form-full\">
+          <label for=\"{slug_dash}-details\">Project details</label>
+          <textarea id=\"{slug_dash}-details\" name=\"details\" rows=\"4\" placeholder=\"Share roof type, stories, access notes, and ideal timing\"></textarea>
+        </div>
+      </div>
+      <input type=\"hidden\" name=\"service_type\" value=\"{service_name}\">
+      <input type=\"hidden\" name=\"geo\" value=\"{city_html}\">
+      <button type=\"submit\" class=\"btn btn-primary\" data-track=\"{track_prefix}_form_submit\" data-service-type=\"{service_name}\">Submit</button>
+      <p class=\"form-note\">You’ll land on our <a href=\"/thank-you\">thank-you page</a>. We never share your information.</p>
+    </form>
+    """
+)
 
-def _form_block(service_slug: str, service_name: str, city_name: str, track_prefix: str) -> str:
-    city_html = html.escape(city_name)
-    slug_dash = service_slug.replace("-", "_")
-    return dedent(
-        f"""
-        <form class=\"form-card\" id=\"quote\" data-supabase data-event=\"generate_lead\">
-          <h2>Request {service_name.lower()} details</h2>
-          <p>Share your project scope in {city_html}. We confirm pricing, scheduling, and next steps within one business day.</p>
-          <div class=\"form-grid\">
-            <div>
-              <label for=\"{slug_dash}-name\">Name</label>
-              <input id=\"{slug_dash}-name\" name=\"name\" required>
-            </div>
-            <div>
-              <label for=\"{slug_dash}-phone\">Phone</label>
-              <input id=\"{slug_dash}-phone\" name=\"phone\" type=\"tel\" required>
-            </div>
-            <div>
-              <label for=\"{slug_dash}-email\">Email</label>
-              <input id=\"{slug_dash}-email\" name=\"email\" type=\"email\" required>
-            </div>
-            <div class=\"form-full\">
-              <label for=\"{slug_dash}-details\">Project details</label>
-              <textarea id=\"{slug_dash}-details\" name=\"details\" rows=\"4\" placeholder=\"Share roof type, stories, access notes, and ideal timing\"></textarea>
-            </div>
-          </div>
-          <input type=\"hidden\" name=\"service_type\" value=\"{service_name}\">
-          <input type=\"hidden\" name=\"geo\" value=\"{city_html}\">
-          <button type=\"submit\" class=\"btn btn-primary\" data-track=\"{track_prefix}_form_submit\" data-service-type=\"{service_name}\">Submit</button>
-          <p class=\"form-note\">You’ll land on our <a href=\"/thank-you.html\">thank-you page</a>. We never share your information.</p>
-        </form>
+# The body templates interpolate flush-left blocks, so dedent never removed
+# their source indentation; it is part of the rendered markup.
+BODY_TOP_TEMPLATE = Template(
         """
-    ).strip()
-
-
-def _base_body_top(hero_html: str) -> str:
-    return dedent(
-        f"""
         <body>
         {HEADER_HTML}
         <main>
         {hero_html}
-        """
-    ).strip()
+        """,
+    constants={"HEADER_HTML": HEADER_HTML},
+    blocks=["hero_html"],
+)
 
-
-def _base_body_bottom(service_slug: str, service_name: str, city_name: str) -> str:
-    safe_service = service_name.lower()
-    city_html = html.escape(city_name)
-    return dedent(
-        f"""
+BODY_BOTTOM_TEMPLATE = Template(
+        """
         </main>
         {FOOTER_HTML}
-        <a class=\"btn btn-primary sticky-cta\" href=\"#quote\" data-track=\"{service_slug}_sticky_cta\" aria-label=\"Request {safe_service} in {city_html}\" data-service-type=\"{service_name}\">Request {service_name.lower()}</a>
+        <a class=\"btn btn-primary sticky-cta\" href=\"#quote\" data-track=\"{service_slug}_sticky_cta\" aria-label=\"Request {service_lower} in {city_html}\" data-service-type=\"{service_name}\">Request {service_lower}</a>
         </body>
         </html>
-        """
-    ).strip() + "\n"
-
+        """,
+    constants={"FOOTER_HTML": FOOTER_HTML},
+    suffix="\n",
+)
 
-def _hero_block(service_slug: str, service_name: str, city_name: str, intro: str, highlights: list[str]) -> str:
-    city_html = html.escape(city_name)
-    list_items = "\n".join(f"            <li>{item}</li>" for item in highlights)
-    return dedent(
-        f"""
+HERO_TEMPLATE = Template(
+        """
         <section class=\"hero\" style=\"background-image: linear-gradient(120deg, rgba(16,32,41,0.92), rgba(26,76,96,0.8)), url('/assets/images/new-downspout-installation.webp');\">
           <div class=\"hero-inner\">
             <div class=\"hero-copy\">
@@ -275,17 +247,80 @@ def _hero_block(service_slug: str, service_name: str, city_name: str, intro: str
 {list_items}
               </ul>
               <div class=\"hero-ctas\">
-                <a class=\"btn btn-primary\" href=\"#quote\" data-track=\"{service_slug}_book_top\" data-service-type=\"{service_name}\">Book {service_name.lower()}</a>
+                <a class=\"btn btn-primary\" href=\"#quote\" data-track=\"{service_slug}_book_top\" data-service-type=\"{service_name}\">Book {service_lower}</a>
                 <a class=\"btn btn-outline\" href=\"tel:+14255501727\" data-track=\"{service_slug}_call_top\">Call (425) 550-1727</a>
               </div>
             </div>
             <div class=\"hero-form\">
-              {_form_block(service_slug, service_name, city_name, service_slug)}
+              {form_html}
             </div>
           </div>
         </section>
-        """
-    ).strip()
+        """,
+    blocks=["form_html"],
+)
+
+
+def _base_head(city_slug: str, city_name: str, service_slug: str, service_name: str, title: str, description: str) -> str:
+    canonical = url_policy.canonical_url(f"/pages/{city_slug}/{service_slug}")
+    ld_json = {
+        "@context": "https://schema.org",
+        "@graph": [
+            LOCAL_BUSINESS_SCHEMA,
+            {
+                "@type": "Service",
+                "@id": f"{canonical}#service",
+                "serviceType": service_name,
+                "name": f"{service_name} {city_name}",
+                "provider": {"@id": "https://ospreyexterior.com/#localbusiness"},
+                "areaServed": [{"@type": "City", "name": city_name}],
+                "description": description,
+                "image": OG_IMAGE,
+            },
+        ],
+    }
+    return HEAD_TEMPLATE.render(
+        title=html.escape(title),
+        description=html.escape(description),
+        canonical=canonical,
+        city_html=html.escape(city_name),
+        ld_json=json.dumps(ld_json, separators=(",", ":")),
+    )
+
+
+def _form_block(service_slug: str, service_name: str, city_name: str, track_prefix: str) -> str:
+    return FORM_TEMPLATE.render(
+        service_name=service_name,
+        service_lower=service_name.lower(),
+        city_html=html.escape(city_name),
+        slug_dash=service_slug.replace("-", "_"),
+        track_prefix=track_prefix,
+    )
+
+
+def _base_body_top(hero_html: str) -> str:
+    return BODY_TOP_TEMPLATE.render(hero_html=hero_html)
+
+
+def _base_body_bottom(service_slug: str, service_name: str, city_name: str) -> str:
+    return BODY_BOTTOM_TEMPLATE.render(
+        service_slug=service_slug,
+        service_name=service_name,
+        service_lower=service_name.lower(),
+        city_html=html.escape(city_name),
+    )
+
+
+def _hero_block(service_slug: str, service_name: str, city_name: str, intro: str, highlights: list[str]) -> str:
+    return HERO_TEMPLATE.render(
+        service_slug=service_slug,
+        service_name=service_name,
+        service_lower=service_name.lower(),
+        city_html=html.escape(city_name),
+        intro=intro,
+        list_items="\n".join(f"            <li>{item}</li>" for item in highlights),
+        form_html=_form_block(service_slug, service_name, city_name, service_slug),
+    )
 
 
 def _wrap_page(head: str, body_top: str, sections: list[str], body_bottom: str) -> str:
@@ -299,11 +334,13 @@ def _city_target_phrase(service_slug: str, city_name: str) -> str:
 
 # Section generators --------------------------------------------------------
 
-def _gutter_cleaning_sections(city_name: str) -> list[str]:
-    city_html = html.escape(city_name)
-    target_phrase = _city_target_phrase("gutter cleaning", city_name)
-    before_after = dedent(
-        f"""
+def _render_sections(templates: list[Template], **slots: str) -> list[str]:
+    return [template.render(**slots) for template in templates]
+
+
+GUTTER_CLEANING_SECTIONS = [
+    Template(
+        """
         <section class=\"section\" id=\"before-after\">
           <div class=\"container\">
             <div class=\"section-header\">
@@ -328,10 +365,9 @@ def _gutter_cleaning_sections(city_name: str) -> list[str]:
           </div>
         </section>
         """
-    ).strip()
-
-    debris_prevention = dedent(
-        f"""
+    ),
+    Template(
+        """
         <section class=\"section section-light\" id=\"debris-prevention\">
           <div class=\"container\">
             <div class=\"section-header\">
@@ -356,30 +392,35 @@ def _gutter_cleaning_sections(city_name: str) -> list[str]:
           </div>
         </section>
         """
-    ).strip()
-
-    cta = dedent(
-        f"""
+    ),
+    Template(
+        """
         <section class=\"feature-band\" id=\"cta\">
           <div class=\"container\">
             <h2>Book your next gutter cleaning</h2>
             <p>Reserve a crew before the next rainfall alert. We send route ETAs, photo proof, and maintenance notes for your records.</p>
             <div class=\"hero-ctas\">
               <a class=\"btn btn-primary\" href=\"#quote\" data-track=\"gutter-cleaning_cta_book\">Get on the schedule</a>
-              <a class=\"btn btn-outline\" href=\"/before-after.html\" data-track=\"gutter-cleaning_cta_gallery\">Browse more results</a>
+              <a class=\"btn btn-outline\" href=\"/portfolio.html#projects\" data-track=\"gutter-cleaning_cta_gallery\">Browse more results</a>
             </div>
           </div>
         </section>
         """
-    ).strip()
+    ),
+]
 
-    return [before_after, debris_prevention, cta]
 
+def _gutter_cleaning_sections(city_name: str) -> list[str]:
+    return _render_sections(
+        GUTTER_CLEANING_SECTIONS,
+        city_html=html.escape(city_name),
+        target_phrase=_city_target_phrase("gutter cleaning", city_name),
+    )
 
-def _gutter_installation_sections(city_name: str) -> list[str]:
-    city_html = html.escape(city_name)
-    product_types = dedent(
-        f"""
+
+GUTTER_INSTALLATION_SECTIONS = [
+    Template(
+        """
         <section class=\"section\" id=\"product-types\">
           <div class=\"container\">
             <div class=\"section-header\">
@@ -404,10 +445,9 @@ def _gutter_installation_sections(city_name: str) -> list[str]:
           </div>
         </section>
         """
-    ).strip()
-
-    colors = dedent(
-        f"""
+    ),
+    Template(
+        """
         <section class=\"section section-light\" id=\"color-options\">
           <div class=\"container\">
             <div class=\"section-header\">
@@ -424,9 +464,8 @@ def _gutter_installation_sections(city_name: str) -> list[str]:
           </div>
         </section>
         """
-    ).strip()
-
-    warranty = dedent(
+    ),
+    Template(
         """
         <section class=\"section\" id=\"warranty\">
           <div class=\"container\">
@@ -452,30 +491,31 @@ def _gutter_installation_sections(city_name: str) -> list[str]:
           </div>
         </section>
         """
-    ).strip()
-
-    financing = dedent(
-        f"""
+    ),
+    Template(
+        """
         <section class=\"feature-band\" id=\"financing\">
           <div class=\"container\">
             <h2>Flexible Financing & Drainage Solutions</h2>
             <p>We help integrate your seamless gutter installation with existing or new stormwater management systems, along with flexible monthly payments starting under $75.</p>
             <div class=\"hero-ctas\">
               <a class=\"btn btn-primary\" href=\"#quote\" data-track=\"gutter-installation_financing_apply\">Review financing options</a>
-              <a class=\"btn btn-outline\" href=\"/compliance.html\" data-track=\"gutter-installation_financing_drainage\">See Drainage Compliance Options</a>
+              <a class=\"btn btn-outline\" href=\"/compliance\" data-track=\"gutter-installation_financing_drainage\">See Drainage Compliance Options</a>
             </div>
           </div>
         </section>
         """
-    ).strip()
-    
-    return [product_types, colors, warranty, financing]
+    ),
+]
 
 
-def _gutter_repair_sections(city_name: str) -> list[str]:
-    city_html = html.escape(city_name)
-    problems = dedent(
-        f"""
+def _gutter_installation_sections(city_name: str) -> list[str]:
+    return _render_sections(GUTTER_INSTALLATION_SECTIONS, city_html=html.escape(city_name))
+
+
+GUTTER_REPAIR_SECTIONS = [
+    Template(
+        """
         <section class=\"section\" id=\"common-problems\">
           <div class=\"container\">
             <div class=\"section-header\">
@@ -500,9 +540,8 @@ def _gutter_repair_sections(city_name: str) -> list[str]:
           </div>
         </section>
         """
-    ).strip()
-
-    checklist = dedent(
+    ),
+    Template(
         """
         <section class=\"section section-light\" id=\"diagnostic-checklist\">
           <div class=\"container\">
@@ -521,29 +560,30 @@ def _gutter_repair_sections(city_name: str) -> list[str]:
           </div>
         </section>
         """
-    ).strip()
-
-    form_cta = dedent(
-        f"""
+    ),
+    Template(
+        """
         <section class=\"feature-band\" id=\"repair-cta\">
           <div class=\"container\">
             <h2>Schedule gutter repair</h2>
             <p>Submit photos or a quick summary. We prioritize active leaks in {city_html} within 24 hours.</p>
             <div class=\"hero-ctas\">
               <a class=\"btn btn-primary\" href=\"#quote\" data-track=\"gutter-repair_cta_book\">Request repair visit</a>
-              <a class=\"btn btn-outline\" href=\"/portfolio.html#projects\" data-track=\"gutter-repair_cta_portfolio\">See repair highlights</a>
+              <a class=\"btn btn-outline\" href=\"/portfolio#projects\" data-track=\"gutter-repair_cta_portfolio\">See repair highlights</a>
             </div>
           </div>
         </section>
         """
-    ).strip()
+    ),
+]
 
-    return [problems, checklist, form_cta]
 
+def _gutter_repair_sections(city_name: str) -> list[str]:
+    return _render_sections(GUTTER_REPAIR_SECTIONS, city_html=html.escape(city_name))
 
-def _gutter_guard_sections(city_name: str) -> list[str]:
-    city_html = html.escape(city_name)
-    pros_cons = dedent(
+
+GUTTER_GUARD_SECTIONS = [
+    Template(
         """
         <section class=\"section\" id=\"pros-cons\">
           <div class=\"container\">
@@ -573,10 +613,9 @@ def _gutter_guard_sections(city_name: str) -> list[str]:
           </div>
         </section>
         """
-    ).strip()
-
-    comparison = dedent(
-        f"""
+    ),
+    Template(
+        """
         <section class=\"section section-light\" id=\"system-comparison\">
           <div class=\"container\">
             <div class=\"section-header\">
@@ -599,10 +638,9 @@ def _gutter_guard_sections(city_name: str) -> list[str]:
           </div>
         </section>
         """
-    ).strip()
-
-    roi = dedent(
-        f"""
+    ),
+    Template(
+        """
         <section class=\"feature-band\" id=\"roi\">
           <div class=\"container\">
             <h2>ROI for gutter guard installation</h2>
@@ -614,20 +652,22 @@ def _gutter_guard_sections(city_name: str) -> list[str]:
             </ul>
             <div class=\"hero-ctas\">
               <a class=\"btn btn-primary\" href=\"#quote\" data-track=\"gutter-guard-installation_cta_quote\">Start guard estimate</a>
-              <a class=\"btn btn-outline\" href=\"/blog/gutter-filter-comparison.html\" data-track=\"gutter-guard-installation_cta_learn\">Review guard comparisons</a>
+              <a class=\"btn btn-outline\" href=\"/blog/gutter-filter-comparison\" data-track=\"gutter-guard-installation_cta_learn\">Review guard comparisons</a>
             </div>
           </div>
         </section>
         """
-    ).strip()
+    ),
+]
 
-    return [pros_cons, comparison, roi]
 
+def _gutter_guard_sections(city_name: str) -> list[str]:
+    return _render_sections(GUTTER_GUARD_SECTIONS, city_html=html.escape(city_name))
 
-def _roof_cleaning_sections(city_name: str) -> list[str]:
-    city_html = html.escape(city_name)
-    moss = dedent(
-        f"""
+
+ROOF_CLEANING_SECTIONS = [
+    Template(
+        """
         <section class=\"section\" id=\"moss-removal\">
           <div class=\"container\">
             <div class=\"section-header\">
@@ -652,9 +692,8 @@ def _roof_cleaning_sections(city_name: str) -> list[str]:
           </div>
         </section>
         """
-    ).strip()
-
-    pressure_safety = dedent(
+    ),
+    Template(
         """
         <section class=\"section section-light\" id=\"pressure-safety\">
           <div class=\"container\">
@@ -680,10 +719,9 @@ def _roof_cleaning_sections(city_name: str) -> list[str]:
           </div>
         </section>
         """
-    ).strip()
-
-    gallery = dedent(
-        f"""
+    ),
+    Template(
+        """
         <section class=\"section\" id=\"roof-gallery\">
           <div class=\"container\">
             <div class=\"section-header\">
@@ -708,9 +746,12 @@ def _roof_cleaning_sections(city_name: str) -> list[str]:
           </div>
         </section>
         """
-    ).strip()
+    ),
+]
 
-    return [moss, pressure_safety, gallery]
+
+def _roof_cleaning_sections(city_name: str) -> list[str]:
+    return _render_sections(ROOF_CLEANING_SECTIONS, city_html=html.escape(city_name))
 
 
 SERVICE_CONFIGS = {
@@ -772,15 +813,36 @@ SERVICE_CONFIGS = {
 }
 
 
-def extract_city_name(index_path: Path) -> str | None:
-    text = index_path.read_text(encoding="utf-8")
-    match = re.search(r"<h1>Gutter Cleaning (.*?)</h1>", text)
+@profiled("read")
+def extract_city_name(index_path: Path, limit: int = FALLBACK_READ_BYTES) -> str | None:
+    with index_path.open("rb") as handle:
+        text = handle.read(limit).decode("utf-8", errors="ignore")
+    match = CITY_HEADING_PATTERN.search(text)
     if not match:
         return None
     return html.unescape(match.group(1)).strip()
 
 
-def generate_city_service_page(city_slug: str, city_name: str, service_slug: str, config: dict) -> None:
+def page_input_hash(city_slug: str, city_name: str, service_slug: str, config: dict) -> str:
+    return hash_inputs(
+        GENERATOR_VERSION,
+        city_slug,
+        city_name,
+        service_slug,
+        config["service_name"],
+        config["description"](city_name),
+        config["intro"](city_name),
+        config["highlights"],
+        config["sections"].__name__,
+        HEADER_HTML,
+        FOOTER_HTML,
+        FONTS,
+    )
+
+
+@profiled("render")
+def render_city_service_page(city_slug: str, city_name: str, service_slug: str) -> str:
+    config = SERVICE_CONFIGS[service_slug]
     service_name: str = config["service_name"]
     description = config["description"](city_name)
     intro = config["intro"](city_name)
@@ -807,25 +869,137 @@ def generate_city_service_page(city_slug: str, city_name: str, service_slug: str
     sections = sections_fn(city_name)
     body_bottom = _base_body_bottom(service_slug, service_name, city_name)
 
-    html_output = _wrap_page(head, body_top, sections, body_bottom)
+    return _wrap_page(head, body_top, sections, body_bottom)
 
-    target_dir = PAGES_DIR / city_slug / service_slug
-    target_dir.mkdir(parents=True, exist_ok=True)
-    (target_dir / "index.html").write_text(html_output, encoding="utf-8")
 
+def _render_task(task: tuple[str, str, str]) -> str:
+    return render_city_service_page(*task)
 
-def main() -> None:
+
+def page_path(city_slug: str, service_slug: str) -> Path:
+    return PAGES_DIR / city_slug / service_slug / "index.html"
+
+
+@profiled("discovery")
+def discover_cities() -> tuple[list[tuple[str, str]], list[str]]:
+    """Return (city_slug, city_name) pairs plus the slugs that had to be dropped.
+
+    Names come from the location registry; only directories missing from
+    locations.json fall back to a bounded read of their index page.
+    """
+    cities = []
+    dropped = []
     for city_dir in sorted(PAGES_DIR.iterdir()):
         if not city_dir.is_dir():
             continue
-        index_path = city_dir / "index.html"
-        if not index_path.exists():
-            continue
-        city_name = extract_city_name(index_path)
-        if not city_name:
+        location = LOCATIONS.get(city_dir.name)
+        if location:
+            cities.append((city_dir.name, location.city))
             continue
+        index_path = city_dir / "index.html"
+        city_name = extract_city_name(index_path) if index_path.exists() else None
+        if city_name:
+            cities.append((city_dir.name, city_name))
+        else:
+            dropped.append(city_dir.name)
+    return cities, dropped
+
+
+@profiled("hash")
+def plan_pages(
+    cities: list[tuple[str, str]],
+    manifest: BuildManifest,
+) -> tuple[list[tuple[str, str, str]], list[str]]:
+    """Return the (city_slug, city_name, service_slug) tasks whose inputs changed, with their hashes."""
+    tasks: list[tuple[str, str, str]] = []
+    task_hashes: list[str] = []
+    for city_slug, city_name in cities:
         for service_slug, config in SERVICE_CONFIGS.items():
-            generate_city_service_page(city_dir.name, city_name, service_slug, config)
+            input_hash = page_input_hash(city_slug, city_name, service_slug, config)
+            key = f"{city_slug}/{service_slug}"
+            if manifest.is_fresh(key, input_hash, page_path(city_slug, service_slug)):
+                continue
+            tasks.append((city_slug, city_name, service_slug))
+            task_hashes.append(input_hash)
+    return tasks, task_hashes
+
+
+@profiled("render")
+def render_pages(tasks: list[tuple[str, str, str]], jobs: int) -> list[str]:
+    if jobs <= 1 or len(tasks) <= 1:
+        return [_render_task(task) for task in tasks]
+    # map() yields results in submission order, so output stays deterministic.
+    chunksize = max(1, len(tasks) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_render_task, tasks, chunksize=chunksize))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate city x service landing pages.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the build manifest and re-render every page.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Render pages across N worker processes (0 = one per CPU).",
+    )
+    add_profile_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with profiling(args, "generate_city_service_pages"):
+        jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+        manifest = BuildManifest(MANIFEST_PATH) if args.force else BuildManifest.load(MANIFEST_PATH)
+        stats = OutputStats()
+        timings: dict[str, float] = {}
+
+        try:
+            LOCATIONS.load()
+        except LocationDataError as exc:
+            raise SystemExit(str(exc)) from exc
+
+        started = time.perf_counter()
+        cities, dropped = discover_cities()
+        tasks, task_hashes = plan_pages(cities, manifest)
+        timings["discover"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        rendered = render_pages(tasks, jobs)
+        timings["render"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with LastmodStore.open() as lastmod:
+            for (city_slug, _city_name, service_slug), input_hash, html_output in zip(tasks, task_hashes, rendered):
+                target_path = page_path(city_slug, service_slug)
+                data = html_output.encode("utf-8")
+                status = write_bytes_if_changed(target_path, data, stats)
+                lastmod.observe(target_path, data, status)
+                if status != FAILED:
+                    manifest.record(f"{city_slug}/{service_slug}", input_hash, target_path)
+        manifest.save()
+        timings["write"] = time.perf_counter() - started
+
+        print(
+            json.dumps(
+                {
+                    "pages_generated": manifest.built,
+                    "pages_skipped": manifest.skipped,
+                    **stats.summary(),
+                    "cities": len(cities),
+                    "cities_dropped": dropped,
+                    "locations_skipped": LOCATIONS.skipped,
+                    "jobs": jobs,
+                    "timings": {phase: round(seconds, 4) for phase, seconds in timings.items()},
+                }
+            )
+        )
 
 
 if __name__ == "__main__":
@@ -1,16 +1,53 @@
 #!/usr/bin/env python3
 """
 Generate the /problems/gutters/ Problem-Intent Cluster.
-Pillar + 25 intent-driven pages. No edits to legacy pages.
+Pillar + one intent-driven page per catalog entry. No edits to legacy pages.
+
+Pages come from problems/gutters/catalog.json (or any .json, .jsonl or .csv
+catalog passed with --catalog; CSV list cells separate items with "|").
+Intent pages are rendered and written one at a time as the catalog is read,
+and only each page's slug and title are kept to build the pillar's cluster
+lists, so JSON Lines and CSV catalogs of any size run in constant memory.
+
+With --matrix, every problem that is not already tied to a city (catalog
+field "city") is also rendered for each location in pages/locations.json at
+/problems/gutters/<problem>/<city>/. The FAQ schema, FAQ list, causes list
+and proof images are rendered once per problem and shared by all of its city
+pages. Matrix pages whose inputs are unchanged are skipped via a build
+manifest, and --max-pages caps how many are rendered per run so a large
+matrix fills in over several builds.
+
+build_site.py renders the default catalog's pages as its problem-cluster
+stage, so they get their favicon links and critical CSS before they are
+written; run this script directly for --matrix or another --catalog.
 """
-import os
+import argparse
+import csv
 import json
+import time
+from collections import defaultdict
 from pathlib import Path
+from typing import NamedTuple
+
+import third_party_tags
+import url_policy
+from build_manifest import BUILD_DIR, BuildManifest, hash_inputs, source_version
+from build_profile import add_profile_arguments, profiled, profiling
+from lastmod_store import LastmodStore
+from location_registry import LOCATIONS, LocationDataError
+from site_output import FAILED, WRITTEN, OutputStats, write_bytes_if_changed
 
 BASE = Path(__file__).resolve().parent.parent
 PROBLEMS_DIR = BASE / "problems" / "gutters"
 # Root-relative for canonical URLs; relative for local paths
 ASSETS_ROOT = "https://ospreyexterior.com/assets"
+PILLAR_URL = url_policy.canonical_url("/problems/gutters")
+# Third-party tags per page type; when each one loads is set in third_party_tags.POLICY.
+INTENT_TAGS = ("gtag", "hubspot")
+PILLAR_TAGS = ("gtag", "meta-pixel", "contentsquare")
+TAG_INDENT = "  "
+INTENT_TAG_MARKUP = third_party_tags.render_tags(INTENT_TAGS, indent=TAG_INDENT)
+PILLAR_TAG_MARKUP = third_party_tags.render_tags(PILLAR_TAGS, indent=TAG_INDENT)
 
 # Landing-page head for intent pages (same form setup as gutter-cleaning.html)
 HEAD_LANDING = '''<!DOCTYPE html>
@@ -20,10 +57,10 @@ HEAD_LANDING = '''<!DOCTYPE html>
   <meta http-equiv="x-ua-compatible" content="ie=edge">
   <meta name="viewport" content="width=device-width, initial-scale=1">
   <meta name="geo.region" content="US-WA" />
-  <meta name="geo.placename" content="Bellevue" />
+  <meta name="geo.placename" content="{placename}" />
   <title>{title} | Osprey Exterior</title>
   <meta name="description" content="{description}">
-  <link rel="canonical" href="https://ospreyexterior.com{canonical}">
+  <link rel="canonical" href="{canonical}">
   <link rel="preconnect" href="https://fonts.googleapis.com">
   <link href="https://fonts.googleapis.com/css2?family=DM+Sans:wght@400;500;600;700&family=Plus+Jakarta+Sans:wght@700;800&display=swap" rel="stylesheet">
   <link rel="stylesheet" href="/assets/css/landing.css">
@@ -32,165 +69,111 @@ HEAD_LANDING = '''<!DOCTYPE html>
   <meta property="og:site_name" content="Osprey Exterior">
   <meta property="og:title" content="{title} | Osprey Exterior">
   <meta property="og:description" content="{description}">
-  <meta property="og:url" content="https://ospreyexterior.com{canonical}">
+  <meta property="og:url" content="{canonical}">
   <meta property="og:image" content="https://ospreyexterior.com{og_image_path}">
   <meta property="og:image:alt" content="{og_image_alt}">
   <meta name="twitter:card" content="summary_large_image">
   <meta name="twitter:title" content="{title} | Osprey Exterior">
   <meta name="twitter:description" content="{description}">
   <meta name="twitter:image" content="https://ospreyexterior.com{og_image_path}">
-  <script async src="https://www.googletagmanager.com/gtag/js?id=G-P1VX9FY873"></script>
+  {tags}
   <script>
-    window.dataLayer = window.dataLayer || [];
-    function gtag(){{dataLayer.push(arguments);}}
-    gtag('js', new Date());
-    gtag('config', 'AW-11395982028');
-    gtag('config', 'G-P1VX9FY873');
     function gtag_report_conversion(url) {{
       var callback = function() {{ if (typeof url !== 'undefined') {{ window.location = url; }} }};
       gtag('event', 'conversion', {{ 'send_to': 'AW-11395982028/rBIyCJrlvbQaEMzFg7oq', 'value': 1.0, 'currency': 'USD', 'event_callback': callback }});
       return false;
     }}
   </script>
-  <script type="text/javascript" id="hs-script-loader" async defer src="https://js-na2.hs-scripts.com/244291121.js"></script>
   <script type="application/ld+json">{faq_schema}</script>
 </head>
 <body>'''
 
-# 25 intent pages: slug, title, description, cluster, hero, proof images, causes, faqs
-PAGES = [
-    # OVERFLOW / DRAINAGE
-    {"slug": "why-are-my-gutters-overflowing-redmond-wa", "title": "Why Are My Gutters Overflowing in Redmond WA", "cluster": "overflow",
-     "description": "Redmond gutters overflow from clogs, pitch issues, and undersized systems. Learn causes, diagnosis, and professional fixes from Osprey Exterior.",
-     "hero": "gutter-filled-with-water-downspout-filter-clogged.webp", "proof": ["gutter-full-of-leaves-before.webp", "gutter-full-of-leaves-after.webp", "gutter-cleaning-and-hanger-replacement-before.webp", "gutter-cleaning-and-hanger-replacement-after.webp"],
-     "causes": ["Clogged troughs from fir needles and maple seeds", "Improper pitch creating low spots", "Undersized 5K gutters on large roof planes", "Fascia rot loosening hangers", "Underground drain backup at downspout", "Ice expansion damage from freeze-thaw cycles"],
-     "local": "Redmond's tree density—especially Education Hill and Overlake—means fir needles and maple seeds fill gutters faster than most Eastside neighborhoods. Twice-yearly cleaning keeps overflow at bay."},
-    {"slug": "why-are-my-gutters-overflowing-in-heavy-rain", "title": "Why Are My Gutters Overflowing in Heavy Rain", "cluster": "overflow",
-     "description": "Heavy rain overwhelms gutters when clogs, pitch, or capacity fail. Diagnose and fix overflow before foundation and siding damage.",
-     "hero": "gutter-filled-with-water-downspout-filter-clogged.webp", "proof": ["gutter-full-of-leaves-before.webp", "gutter-full-of-leaves-after.webp", "close-up-of-downspout-elbow.webp"],
-     "causes": ["Debris blocking flow at downspout openings", "Improper pitch creating standing water", "Undersized system for roof square footage", "Fascia rot causing sag", "Underground drain backup", "Ice dams restricting flow"],
-     "local": "Puget Sound atmospheric rivers dump 2+ inches in hours. Seattle's freeze-thaw cycle and Kirkland's lake humidity add stress. Systems sized for October storms perform year-round."},
-    {"slug": "why-are-my-gutters-not-draining", "title": "Why Are My Gutters Not Draining", "cluster": "overflow",
-     "description": "Gutters that won't drain point to clogs, pitch problems, or downspout blockages. Step-by-step diagnosis and professional fixes.",
-     "hero": "close-up-of-downspout-elbow.webp", "proof": ["close-up-of-downspout-strap.webp", "gutter-full-of-leaves-before.webp", "gutter-full-of-leaves-after.webp"],
-     "causes": ["Clog at downspout opening or elbow", "Incorrect pitch toward low spots", "Undersized downspouts", "Fascia rot affecting slope", "Underground drain collapse", "Debris cap at gutter guard"],
-     "local": "Bellevue and Issaquah homes with heavy tree canopy see downspout elbows clog first. A ladder test and downspout flow check reveal the restriction point."},
-    {"slug": "why-are-my-gutters-dripping-from-underneath", "title": "Why Are My Gutters Dripping From Underneath", "cluster": "overflow",
-     "description": "Water dripping from under gutters usually means seam or corner joint failure. Learn diagnosis and resealing solutions.",
-     "hero": "gutter-resealing-seattle-after.webp", "proof": ["gutter-resealing-seattle-before.webp", "gutter-resealing-seattle-after.webp", "gutter-inside-corner-before.webp", "gutter-inside-corner-after.webp", "cleaned-and-sealed-half-round-gutters.webp"],
-     "causes": ["Seam failure at miter joints", "Corner joint separation", "Loose or missing sealant", "Fascia rot behind gutter", "Ice expansion cracking seams", "Age and UV degradation"],
-     "local": "Seattle's wet winters and summer dry spells stress gutter seams. Half-round copper and aluminum both need periodic resealing on older installs."},
-    {"slug": "why-are-my-gutters-pulling-away-from-the-house", "title": "Why Are My Gutters Pulling Away From the House", "cluster": "overflow",
-     "description": "Gutters pulling away signal failing hangers, fascia rot, or ice damage. Professional reattachment and hanger replacement restore stability.",
-     "hero": "gutter-falling-off-before.webp", "proof": ["gutter-falling-off-before.webp", "gutter-falling-off-after.webp", "gutter-cleaning-and-hanger-replacement-before.webp", "gutter-cleaning-and-hanger-replacement-after.webp"],
-     "causes": ["Rusted or failed hangers", "Fascia rot behind attachment points", "Ice weight pulling brackets", "Undersized hanger spacing", "Screw corrosion", "Wind load on oversized runs"],
-     "local": "Kirkland and Redmond lake-effect moisture accelerates hanger rust. Structural hangers and fascia repair often go together."},
-    {"slug": "why-are-my-gutters-sagging", "title": "Why Are My Gutters Sagging", "cluster": "overflow",
-     "description": "Sagging gutters come from poor pitch, failed hangers, or debris weight. Fix slope and hardware before overflow damages fascia.",
-     "hero": "gutter-falling-off-before.webp", "proof": ["gutter-falling-off-before.webp", "gutter-falling-off-after.webp", "readjusting-gutter-height-osprey-exterior.webp"],
-     "causes": ["Improper pitch creating low spots", "Failed or spaced hangers", "Debris weight bending trough", "Fascia rot", "Ice accumulation", "Oversized run without mid-span support"],
-     "local": "Eastside homes with long rooflines need hangers every 24–36 inches. Pitch adjustments keep channels flowing during back-to-back storms."},
-    {"slug": "why-are-my-gutters-spilling-over-the-edges", "title": "Why Are My Gutters Spilling Over the Edges", "cluster": "overflow",
-     "description": "Gutters spilling over edges mean clogs, undersizing, or pitch failure. Diagnose and fix before staining and foundation damage.",
-     "hero": "extremely-dirty-gutter-exterior-causes-permanent-staining.webp", "proof": ["gutter-full-of-leaves-before.webp", "gutter-full-of-leaves-after.webp", "dirty-gutter-everett-before.webp", "dirty-gutter-everett-after.webp"],
-     "causes": ["Clogged troughs", "Improper pitch", "Undersized 5K on large roofs", "Fascia rot affecting slope", "Downspout backup", "Gutter guard acting as dam"],
-     "local": "Everett and North King County see heavy needle drop. Clearing and mesh guards reduce spillover and permanent siding stains."},
-    # LEAKING / SEAM FAILURE
-    {"slug": "why-are-my-gutters-leaking", "title": "Why Are My Gutters Leaking", "cluster": "leaking",
-     "description": "Gutter leaks stem from seams, corners, rust, or joints. Identify the source and get professional sealing or replacement.",
-     "hero": "gutter-resealing-seattle-after.webp", "proof": ["gutter-resealing-seattle-before.webp", "gutter-resealing-seattle-after.webp", "cleaned-and-sealed-half-round-gutters.webp"],
-     "causes": ["Seam failure at miters", "Corner joint separation", "Rust-through on steel", "Loose sealant at joints", "Fascia rot behind gutter", "Ice expansion damage"],
-     "local": "Seattle and Bellevue half-round systems need periodic resealing. Copper holds up longer; aluminum benefits from touch-ups every 5–7 years."},
-    {"slug": "why-are-my-gutters-leaking-at-the-seams", "title": "Why Are My Gutters Leaking at the Seams", "cluster": "leaking",
-     "description": "Seam leaks mean miter failure, sealant breakdown, or expansion damage. Professional resealing or section replacement fixes it.",
-     "hero": "gutter-resealing-seattle-after.webp", "proof": ["gutter-resealing-seattle-before.webp", "gutter-resealing-seattle-after.webp", "extremely-dirty-gutter-exterior-causes-permanent-staining.webp"],
-     "causes": ["Miter joint separation", "UV and age degrading sealant", "Ice expansion cracking seams", "Thermal cycling", "Improper original install", "Debris trapping moisture"],
-     "local": "Pacific Northwest freeze-thaw cycles stress seams. Resealing with quality sealant extends life; section replacement may be needed on older runs."},
-    {"slug": "why-are-my-gutters-leaking-at-the-corners", "title": "Why Are My Gutters Leaking at the Corners", "cluster": "leaking",
-     "description": "Corner leaks come from open joints, failed sealant, or poor miter fit. Seal or replace corners before siding and fascia damage.",
-     "hero": "gutter-inside-corner-after.webp", "proof": ["gutter-inside-corner-before.webp", "gutter-inside-corner-after.webp", "close-up-of-downspout-elbow.webp"],
-     "causes": ["Open corner miter joint", "Sealant failure", "Valley water overwhelming corner", "Poor original miter fit", "Ice damage", "Movement from hanger failure"],
-     "local": "Roof valleys concentrate flow at inside corners. New miters, sealant, and diverters redirect heavy runoff back into conveyance."},
-    {"slug": "why-are-my-gutters-rusting-through", "title": "Why Are My Gutters Rusting Through", "cluster": "leaking",
-     "description": "Rust-through on steel gutters leads to leaks and failure. Replace with stainless hardware or upgrade to aluminum or copper.",
-     "hero": "rusted-screw-replacement-after.webp", "proof": ["rusted-screw-replacement-before.webp", "rusted-screw-replacement-after.webp", "extremely-dirty-gutter-exterior-causes-permanent-staining.webp"],
-     "causes": ["Galvanized steel age", "Scratched coating exposing metal", "Debris holding moisture", "Screw and fastener corrosion", "Acidic runoff from cedar", "Lack of maintenance"],
-     "local": "Kirkland's lake humidity and Redmond's tree canopy accelerate rust. Stainless hardware and touch-up sealant extend life; full replacement may be cost-effective."},
-    {"slug": "why-are-my-gutters-dripping-at-the-joints", "title": "Why Are My Gutters Dripping at the Joints", "cluster": "leaking",
-     "description": "Joint dripping indicates sealant failure or miter separation. Reseal or replace sections before structural damage.",
-     "hero": "gutter-inside-corner-after.webp", "proof": ["gutter-inside-corner-before.webp", "gutter-inside-corner-after.webp", "gutter-resealing-seattle-before.webp", "gutter-resealing-seattle-after.webp", "cleaned-and-sealed-half-round-gutters.webp"],
-     "causes": ["Sealant breakdown at joints", "Miter separation", "Thermal expansion", "Ice damage", "Debris trapping water", "Original install gaps"],
-     "local": "Seattle's wet-dry cycles stress joint sealant. Clean, dry, and reseal with gutter-specific sealant for lasting results."},
-    # ICE / FREEZE
-    {"slug": "why-are-my-gutters-full-of-ice", "title": "Why Are My Gutters Full of Ice", "cluster": "ice",
-     "description": "Ice-filled gutters block drainage and cause ice dams. Learn prevention, gutter guards, and when to call a professional.",
-     "hero": "complex-gutter-guard-installation-example.webp", "proof": ["downspout-extension-with-gutter-guard.webp"],
-     "causes": ["Clogged gutters holding meltwater", "Poor attic ventilation", "Insufficient insulation", "Gutter guard trapping ice", "Downspout freeze", "North-facing slopes"],
-     "local": "Seattle and Eastside freeze-thaw cycles fill gutters with ice. Clean channels and gutter guards reduce ice buildup; roof-level fixes address dams."},
-    {"slug": "why-are-my-gutters-frozen-solid", "title": "Why Are My Gutters Frozen Solid", "cluster": "ice",
-     "description": "Frozen gutters block all drainage. Prevent with cleaning, guards, and downspout extensions. Know when to wait vs. intervene.",
-     "hero": "downspout-extension-with-gutter-guard.webp", "proof": ["close-up-of-downspout-strap.webp"],
-     "causes": ["Standing water from clogs", "Downspout freeze", "Poor pitch holding water", "Gutter guard trapping melt", "Extended cold snap", "North-facing exposure"],
-     "local": "Kirkland and Redmond see extended freezes. Fall cleaning and downspout extensions reduce standing water that freezes solid."},
-    {"slug": "why-are-my-gutters-icing-up", "title": "Why Are My Gutters Icing Up", "cluster": "ice",
-     "description": "Gutters icing up signal drainage blockage or attic heat loss. Fix both for winter-ready performance.",
-     "hero": "complex-gutter-guard-installation-example.webp", "proof": ["new-downspout-installation.webp"],
-     "causes": ["Clogged troughs holding water", "Poor pitch", "Attic heat melting snow into gutters", "Downspout freeze", "Gutter guard design", "Insufficient roof ventilation"],
-     "local": "Bellevue and Issaquah hills see varied microclimates. Clean channels and proper ventilation reduce icing."},
-    {"slug": "why-are-my-gutters-causing-ice-dams", "title": "Why Are My Gutters Causing Ice Dams", "cluster": "ice",
-     "description": "Ice dams form when roof melt refreezes in gutters. Address attic insulation, ventilation, and gutter flow together.",
-     "hero": "roof-cleaning-technician-on-roof-redmond-wa-1200w.webp", "proof": ["roof-and-gutter-cleaning-service-redmond-wa-1200w.webp"],
-     "causes": ["Attic heat melting snow", "Poor ventilation", "Clogged gutters holding water", "Insufficient insulation", "Complex roof geometry", "North-facing eaves"],
-     "local": "Eastside winter storms create ideal ice dam conditions. Roof and gutter cleaning plus attic upgrades address the full picture."},
-    {"slug": "how-to-fix-frozen-gutters-in-seattle", "title": "How to Fix Frozen Gutters in Seattle", "cluster": "ice",
-     "description": "Frozen gutters in Seattle need safe thawing and prevention. Fall cleaning, guards, and pitch corrections reduce freeze risk.",
-     "hero": "readjusting-gutter-height-osprey-exterior.webp", "proof": ["gutter-falling-off-before.webp", "gutter-falling-off-after.webp", "gutter-cleaning-and-hanger-replacement-before.webp", "gutter-cleaning-and-hanger-replacement-after.webp"],
-     "causes": ["Clogs holding standing water", "Poor pitch", "Downspout blockage", "Missing extensions", "Hanger failure", "Gutter guard trapping water"],
-     "local": "Seattle's freeze-thaw cycle demands fall prep. Clean channels, extend downspouts, and correct pitch before first frost."},
-    # BLOCKAGE / DEBRIS
-    {"slug": "why-are-my-gutters-clogging-so-fast", "title": "Why Are My Gutters Clogging So Fast", "cluster": "blockage",
-     "description": "Fast-clogging gutters point to tree coverage, guard failure, or pitch. Solutions include cleaning frequency and guard upgrades.",
-     "hero": "pulling-a-weed-from-gutter-downspout.webp", "proof": ["gutter-full-of-leaves-before.webp", "gutter-full-of-leaves-after.webp"],
-     "causes": ["Heavy tree canopy overhead", "Gutter guard acting as dam", "Improper pitch holding debris", "Undersized downspouts", "Maple seeds and fir needles", "Moss and organic growth"],
-     "local": "Redmond and Issaquah fir and maple coverage means twice-yearly cleaning. Micro-mesh guards outperform basic screens."},
-    {"slug": "why-are-my-gutters-full-of-pine-needles", "title": "Why Are My Gutters Full of Pine Needles", "cluster": "blockage",
-     "description": "Pine and fir needles overwhelm basic gutter guards. WA regional solutions: cleaning schedule and premium micro-mesh.",
-     "hero": "gutter-full-of-leaves-before.webp", "proof": ["complex-gutter-guard-installation-example.webp"],
-     "causes": ["Douglas fir and cedar overhead", "Basic screens letting needles through", "Pitch holding debris", "Lack of cleaning", "Guard mesh too coarse", "Valley concentration"],
-     "local": "Pacific Northwest fir needles are a regional SEO advantage. Fine stainless micro-mesh and seasonal cleaning keep channels clear."},
-    {"slug": "why-are-my-downspouts-not-draining", "title": "Why Are My Downspouts Not Draining", "cluster": "blockage",
-     "description": "Downspouts that won't drain have clogs at the opening, elbow, or underground. Diagnose and clear for free flow.",
-     "hero": "close-up-of-downspout-elbow.webp", "proof": ["new-downspout-installation.webp"],
-     "causes": ["Clog at gutter outlet", "Elbow blockage", "Underground drain collapse", "Debris cap", "Ice in pipe", "Crushed or disconnected extension"],
-     "local": "Bellevue and Kirkland homes with mature trees see elbow clogs first. Flush test and snake reveal the blockage."},
-    {"slug": "why-do-my-gutters-smell", "title": "Why Do My Gutters Smell", "cluster": "blockage",
-     "description": "Smelly gutters mean organic buildup, stagnant water, or decay. Cleaning and biocide treatment restore fresh flow.",
-     "hero": "pulling-a-weed-from-gutter-downspout.webp", "proof": ["gunk-growing-in-gutter-before.webp", "gunk-growing-in-gutter-after.webp"],
-     "causes": ["Organic debris decomposition", "Stagnant water in low spots", "Moss and algae growth", "Dead pests or nesting", "Sewer gas backup (rare)", "Lack of flow"],
-     "local": "Puget Sound humidity grows moss and algae fast. Flush, treat with biocide, and ensure pitch keeps water moving."},
-    # NOISE / WATER BEHAVIOR
-    {"slug": "why-are-my-gutters-making-noise", "title": "Why Are My Gutters Making Noise", "cluster": "noise",
-     "description": "Gutter noise comes from loose hardware, thermal expansion, or water flow. Tighten and reinforce for quiet performance.",
-     "hero": "close-up-of-downspout-strap.webp", "proof": ["gutter-hardware-replacement-lynnwood-before.webp", "gutter-hardware-replacement-lynnwood-after.webp"],
-     "causes": ["Loose hangers or straps", "Thermal expansion creaking", "Water hitting metal", "Debris rolling in trough", "Wind movement", "Screw corrosion"],
-     "local": "Lynnwood and North King County wind loads stress hardware. Reinforced hangers and stainless straps reduce noise."},
-    {"slug": "why-are-my-gutters-banging-in-the-wind", "title": "Why Are My Gutters Banging in the Wind", "cluster": "noise",
-     "description": "Banging gutters mean loose hardware or failed hangers. Reattachment and reinforcement stop the noise and prevent detachment.",
-     "hero": "gutter-hardware-replacement-lynnwood-before.webp", "proof": ["gutter-hardware-replacement-lynnwood-after.webp", "gutter-falling-off-before.webp", "gutter-falling-off-after.webp"],
-     "causes": ["Loose or missing hangers", "Wind load on long runs", "Rusted screws", "Fascia rot", "Insufficient hanger spacing", "Oversized unsupported sections"],
-     "local": "Eastside wind tunnels and lake breezes test gutter attachment. Structural hangers every 24–36 inches hold firm."},
-    {"slug": "why-do-my-gutters-gurgle-when-it-rains", "title": "Why Do My Gutters Gurgle When It Rains", "cluster": "noise",
-     "description": "Gurgling gutters mean water backup from clogs or restriction. Clear blockages for quiet, free flow.",
-     "hero": "gutter-filled-with-water-downspout-filter-clogged.webp", "proof": ["close-up-of-downspout-elbow.webp"],
-     "causes": ["Clog at downspout opening", "Restricted elbow", "Undersized downspout", "Air trapped in flow", "Gutter guard restriction", "Standing water in low spot"],
-     "local": "Heavy rain amplifies gurgling. A downspout flow test and ladder inspection find the restriction."},
-    {"slug": "why-is-water-running-behind-my-gutters", "title": "Why Is Water Running Behind My Gutters", "cluster": "noise",
-     "description": "Water behind gutters means pitch failure, missing drip edge, fascia issues, or ice dam backup. Fix pitch, drip edge, and attachment for proper drainage.",
-     "hero": "readjusting-gutter-height-osprey-exterior.webp", "proof": ["gutter-falling-off-before.webp", "gutter-falling-off-after.webp", "gutter-cleaning-and-hanger-replacement-before.webp", "gutter-cleaning-and-hanger-replacement-after.webp"],
-     "causes": ["Improper pitch toward fascia", "Gutter sitting too high", "No drip edge flashing", "Fascia rot behind gutter", "Ice dam backup", "Seam leak behind trough", "Hanger failure allowing tilt"],
-     "local": "This converts very well—homeowners see stains and panic. Pitch correction and reattachment route water into the trough."},
-]
-
+CATALOG_PATH = PROBLEMS_DIR / "catalog.json"
+# Pillar-page sections in display order; every catalog entry must name one of these.
+CLUSTERS = {
+    "overflow": "Overflow &amp; drainage",
+    "leaking": "Leaking &amp; seams",
+    "ice": "Ice &amp; freeze",
+    "blockage": "Blockage &amp; debris",
+    "noise": "Noise &amp; water behavior",
+}
+REQUIRED_FIELDS = ("slug", "title", "cluster", "description", "hero", "causes", "local")
+LIST_FIELDS = ("proof", "causes")
+# Separates list items inside a CSV cell.
+CSV_LIST_SEPARATOR = "|"
+DEFAULT_PLACENAME = "Bellevue"
+MATRIX_MANIFEST_PATH = BUILD_DIR / "problem-matrix-manifest.json"
+# Intent pages and the pillar, as build_site renders them.
+MANIFEST_PATH = BUILD_DIR / "problem-manifest.json"
+PILLAR_PATH = PROBLEMS_DIR / "index.html"
+ASSETS_INTENT = "../../../"
+# Any edit to this file (templates, FAQ copy), the tag loading policy or the URL
+# policy invalidates every generated page.
+GENERATOR_VERSION = hash_inputs(
+    source_version(__file__),
+    source_version(third_party_tags.__file__),
+    source_version(url_policy.__file__),
+    url_policy.URL_FORM,
+)
+MATRIX_LOCAL = "Osprey Exterior crews diagnose and fix this for homeowners across {city}, {state}. {local}"
+
+
+class CatalogError(ValueError):
+    pass
+
+
+def _catalog_rows(path):
+    """Yield (label, entry) pairs; JSON Lines and CSV catalogs are read one row at a time."""
+    suffix = path.suffix.lower()
+    with path.open(encoding="utf-8", newline="") as f:
+        if suffix == ".json":
+            try:
+                entries = json.load(f)
+            except ValueError as exc:
+                raise CatalogError(f"{path.name}: {exc}") from exc
+            if not isinstance(entries, list):
+                raise CatalogError(f"{path.name} must contain a list of pages")
+            for position, entry in enumerate(entries):
+                yield f"{path.name} entry {position}", entry
+        elif suffix == ".jsonl":
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError as exc:
+                    raise CatalogError(f"{path.name} line {line_number}: {exc}") from exc
+                yield f"{path.name} line {line_number}", entry
+        elif suffix == ".csv":
+            reader = csv.DictReader(f)
+            for entry in reader:
+                for field in LIST_FIELDS:
+                    cell = entry.get(field) or ""
+                    entry[field] = [item.strip() for item in cell.split(CSV_LIST_SEPARATOR) if item.strip()]
+                yield f"{path.name} line {reader.line_num}", entry
+        else:
+            raise CatalogError(f"{path.name}: unsupported catalog format (use .json, .jsonl or .csv)")
+
+
+@profiled("read")
+def iter_catalog(path=CATALOG_PATH):
+    """Yield validated intent pages from the catalog in file order."""
+    seen = set()
+    for label, entry in _catalog_rows(path):
+        if not isinstance(entry, dict):
+            raise CatalogError(f"{label}: expected an object")
+        missing = [field for field in REQUIRED_FIELDS if not entry.get(field)]
+        if missing:
+            raise CatalogError(f"{label}: missing {', '.join(missing)}")
+        if entry["cluster"] not in CLUSTERS:
+            raise CatalogError(f"{label}: unknown cluster {entry['cluster']!r} (expected one of {', '.join(CLUSTERS)})")
+        if entry["slug"] in seen:
+            raise CatalogError(f"{label}: duplicate slug {entry['slug']!r}")
+        seen.add(entry["slug"])
+        yield entry
+
+
+@profiled("json")
 def faq_schema(faqs):
     main_entity = [{"@type": "Question", "name": q, "acceptedAnswer": {"@type": "Answer", "text": a}} for q, a in faqs]
     return json.dumps({
@@ -214,19 +197,20 @@ def default_faqs(page):
     ]
     return base[:5]
 
-def render_intent_page(page, assets):
-    canonical = f"/problems/gutters/{page['slug']}/"
-    faqs = default_faqs(page)
-    schema = faq_schema(faqs)
-    hero_path = f"/assets/images/{page['hero']}"
-    og_image_path = f"/assets/images/{page['hero']}"
-    page_name = f"{page['title']} | Osprey Exterior"
+class ProblemFragments(NamedTuple):
+    """Parts of an intent page that depend only on the problem, not the city."""
+    faq_schema: str
+    faq_html: str
+    causes_html: str
+    proof_html: str
+
 
-    proof_html = ""
-    if page.get("proof"):
-        imgs = page["proof"][:4]
-        if len(imgs) >= 2:
-            proof_html = f'''<div class="before-after-grid">
+def proof_block(proof):
+    if not proof:
+        return ""
+    imgs = proof[:4]
+    if len(imgs) >= 2:
+        proof_html = f'''<div class="before-after-grid">
             <figure class="before-after-item">
               <div class="before-after-pair">
                 <div><img src="/assets/images/{imgs[0]}" alt="Before repair" loading="lazy"><div class="label label-before">Before</div></div>
@@ -234,8 +218,8 @@ def render_intent_page(page, assets):
               </div>
               <figcaption>Gutter repair result</figcaption>
             </figure>'''
-            if len(imgs) >= 4:
-                proof_html += f'''
+        if len(imgs) >= 4:
+            proof_html += f'''
             <figure class="before-after-item">
               <div class="before-after-pair">
                 <div><img src="/assets/images/{imgs[2]}" alt="Before" loading="lazy"><div class="label label-before">Before</div></div>
@@ -243,15 +227,37 @@ def render_intent_page(page, assets):
               </div>
               <figcaption>Professional fix</figcaption>
             </figure>'''
-            proof_html += "</div>"
-        else:
-            proof_html = '<div class="photo-grid">'
-            for img in imgs:
-                proof_html += f'<img src="/assets/images/{img}" alt="Gutter repair" loading="lazy">'
-            proof_html += "</div>"
+        proof_html += "</div>"
+    else:
+        proof_html = '<div class="photo-grid">'
+        for img in imgs:
+            proof_html += f'<img src="/assets/images/{img}" alt="Gutter repair" loading="lazy">'
+        proof_html += "</div>"
+    return proof_html
 
-    causes_html = "".join(f"<li>{c}</li>" for c in page["causes"])
-    faq_html = "".join(f'<dt>{q}</dt><dd>{a}</dd>' for q, a in faqs)
+
+def problem_fragments(page):
+    faqs = default_faqs(page)
+    return ProblemFragments(
+        faq_schema=faq_schema(faqs),
+        faq_html="".join(f'<dt>{q}</dt><dd>{a}</dd>' for q, a in faqs),
+        causes_html="".join(f"<li>{c}</li>" for c in page["causes"]),
+        proof_html=proof_block(page.get("proof")),
+    )
+
+
+@profiled("render")
+def render_intent_page(page, assets, fragments=None, path=None, placename=DEFAULT_PLACENAME):
+    """Render one intent page; path is its URL path under /problems/gutters/ (the slug by default)."""
+    canonical = url_policy.canonical_url(f"/problems/gutters/{path or page['slug']}")
+    fragments = fragments or problem_fragments(page)
+    schema = fragments.faq_schema
+    hero_path = f"/assets/images/{page['hero']}"
+    og_image_path = f"/assets/images/{page['hero']}"
+    page_name = f"{page['title']} | Osprey Exterior"
+    proof_html = fragments.proof_html
+    causes_html = fragments.causes_html
+    faq_html = fragments.faq_html
 
     content = f'''
   <div class="topbar">
@@ -414,7 +420,7 @@ def render_intent_page(page, assets):
   </section>
 
   <footer class="landing-footer">
-    <p>&copy; 2025 Osprey Exterior LLC &nbsp;·&nbsp; WA License #OSPREE763QD &nbsp;·&nbsp; <a href="/gutter-cleaning">Gutter Cleaning</a> &nbsp;·&nbsp; <a href="/gutters.html">Gutter Services</a> &nbsp;·&nbsp; <a href="/problems/gutters/">Gutter Problems</a> &nbsp;·&nbsp; <a href="/contact.html">Contact</a> &nbsp;·&nbsp; <a href="tel:4255501727">(425) 550-1727</a></p>
+    <p>&copy; 2025 Osprey Exterior LLC &nbsp;·&nbsp; WA License #OSPREE763QD &nbsp;·&nbsp; <a href="/gutter-cleaning">Gutter Cleaning</a> &nbsp;·&nbsp; <a href="/gutters">Gutter Services</a> &nbsp;·&nbsp; <a href="/problems/gutters">Gutter Problems</a> &nbsp;·&nbsp; <a href="/contact">Contact</a> &nbsp;·&nbsp; <a href="tel:4255501727">(425) 550-1727</a></p>
   </footer>
 
   <div class="sticky-cta">
@@ -504,16 +510,104 @@ def render_intent_page(page, assets):
         og_image_path=og_image_path,
         og_image_alt=f"Gutter problem: {page['title']}",
         faq_schema=schema,
+        placename=placename,
+        tags=INTENT_TAG_MARKUP,
     )
     return head + content
 
-def main():
-    PROBLEMS_DIR.mkdir(parents=True, exist_ok=True)
-    assets_pillar = "../../"
-    assets_intent = "../../../"
+def matrix_locations(page):
+    """Locations a problem is localized to in matrix mode; city-specific problems get none."""
+    if page.get("city"):
+        return []
+    return list(LOCATIONS)
+
+
+def intent_page_path(page):
+    return PROBLEMS_DIR / page["slug"] / "index.html"
+
+
+def intent_input_hash(page):
+    return hash_inputs(GENERATOR_VERSION, page)
+
+
+def pillar_input_hash(links, total):
+    return hash_inputs(GENERATOR_VERSION, links, total)
+
+
+def matrix_page_path(page, location):
+    return PROBLEMS_DIR / page["slug"] / location.slug / "index.html"
+
+
+def localize(page, location):
+    return {
+        **page,
+        "title": f"{page['title']} in {location.city} {location.state}",
+        "description": f"{location.city}, {location.state}: {page['description']}",
+        "local": MATRIX_LOCAL.format(city=location.city, state=location.state, local=page["local"]),
+    }
+
+
+class MatrixRun:
+    """Renders problem x city pages, skipping unchanged ones and stopping at the page budget."""
+
+    def __init__(self, manifest, max_pages=None):
+        self.manifest = manifest
+        self.max_pages = max_pages
+        self.rendered = 0
+        self.deferred = 0
+
+    def write(self, page, fragments, assets, stats, lastmod):
+        for location in matrix_locations(page):
+            path = matrix_page_path(page, location)
+            key = f"{page['slug']}/{location.slug}"
+            input_hash = hash_inputs(GENERATOR_VERSION, page, location.as_row())
+            if self.manifest.is_fresh(key, input_hash, path):
+                continue
+            if self.max_pages is not None and self.rendered >= self.max_pages:
+                self.deferred += 1
+                continue
+            html = render_intent_page(
+                localize(page, location), assets, fragments, path=key, placename=location.city
+            )
+            if write_page(path, html, stats, lastmod) != FAILED:
+                self.manifest.record(key, input_hash, path)
+            self.rendered += 1
+
+    def summary(self):
+        return {
+            "matrix_rendered": self.rendered,
+            "matrix_skipped": self.manifest.skipped,
+            "matrix_deferred": self.deferred,
+        }
+
+
+def write_page(path, html, stats, lastmod):
+    data = html.encode("utf-8")
+    status = write_bytes_if_changed(path, data, stats)
+    lastmod.observe(path, data, status)
+    if status == WRITTEN:
+        print(f"Wrote {path}")
+    return status
+
+def pillar_cards(links):
+    """One card per cluster listing its pages; links maps cluster to (slug, title) pairs."""
+    cards = []
+    for cluster, heading in CLUSTERS.items():
+        items = "\n".join(
+            f'              <li><a href="{url_policy.site_path("/problems/gutters/" + slug)}">{title.replace(" | Osprey Exterior","")}</a></li>'
+            for slug, title in links.get(cluster, ())
+        )
+        cards.append(f'''          <article class="card">
+            <h3>{heading}</h3>
+            <ul class="link-list">
+{items}
+            </ul>
+          </article>''')
+    return "\n".join(cards)
 
-    # 1. Pillar page
-    pillar_html = '''<!DOCTYPE html>
+@profiled("render")
+def render_pillar(links, total):
+    return '''<!DOCTYPE html>
 <html lang="en">
 <head>
   <meta charset="utf-8">
@@ -521,37 +615,32 @@ def main():
   <meta name="viewport" content="width=device-width, initial-scale=1">
   <meta name="geo.region" content="US-WA" />
   <title>Gutter Problems | Overflow, Leaks, Ice &amp; Noise | Osprey Exterior</title>
-  <meta name="description" content="Diagnose and fix gutter overflow, leaking seams, ice dams, clogs, and noise. 25 intent-driven guides for Seattle, Bellevue, Redmond, Kirkland, and Issaquah.">
+  <meta name="description" content="Diagnose and fix gutter overflow, leaking seams, ice dams, clogs, and noise. ''' + str(total) + ''' intent-driven guides for Seattle, Bellevue, Redmond, Kirkland, and Issaquah.">
   <link rel="preconnect" href="https://fonts.googleapis.com">
   <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
   <link href="https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600&family=Poppins:wght@600;700&display=swap" rel="stylesheet">
   <link rel="stylesheet" href="../../assets/css/styles.css">
-  <link rel="canonical" href="https://ospreyexterior.com/problems/gutters/">
+  <link rel="canonical" href="''' + PILLAR_URL + '''">
   <link rel="manifest" href="/manifest.json">
   <meta property="og:locale" content="en_US">
   <meta property="og:type" content="website">
   <meta property="og:site_name" content="Osprey Exterior">
   <meta property="og:title" content="Gutter Problems | Overflow, Leaks, Ice &amp; Noise | Osprey Exterior">
-  <meta property="og:description" content="Diagnose and fix gutter overflow, leaking seams, ice dams, clogs, and noise. 25 intent-driven guides for Seattle and the Eastside.">
-  <meta property="og:url" content="https://ospreyexterior.com/problems/gutters/">
+  <meta property="og:description" content="Diagnose and fix gutter overflow, leaking seams, ice dams, clogs, and noise. ''' + str(total) + ''' intent-driven guides for Seattle and the Eastside.">
+  <meta property="og:url" content="''' + PILLAR_URL + '''">
   <meta property="og:image" content="https://ospreyexterior.com/assets/images/readjusting-gutter-height-osprey-exterior.webp">
   <meta name="twitter:card" content="summary_large_image">
-  <script async src="https://www.googletagmanager.com/gtag/js?id=G-P1VX9FY873"></script>
-  <script>window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments);}gtag('js',new Date());gtag('config','AW-11395982028');gtag('config','G-P1VX9FY873');</script>
-  <script>
-  !function(f,b,e,v,n,t,s){if(f.fbq)return;n=f.fbq=function(){n.callMethod?n.callMethod.apply(n,arguments):n.queue.push(arguments)};if(!f._fbq)f._fbq=n;n.push=n;n.loaded=!0;n.version='2.0';n.queue=[];t=b.createElement(e);t.async=!0;t.src=v;s=b.getElementsByTagName(e)[0];s.parentNode.insertBefore(t,s)}(window,document,'script','https://connect.facebook.net/en_US/fbevents.js');fbq('init','841512635074584');fbq('track','PageView');
-  </script>
+  ''' + PILLAR_TAG_MARKUP + '''
   <script type="application/ld+json">
   {
     "@context": "https://schema.org",
     "@type": "CollectionPage",
     "name": "Gutter Problems Hub",
     "description": "Intent-driven guides for gutter overflow, leaking, ice dams, clogs, and noise across Seattle and the Eastside.",
-    "url": "https://ospreyexterior.com/problems/gutters/",
+    "url": "''' + PILLAR_URL + '''",
     "publisher": {"@type": "Organization", "name": "Osprey Exterior", "url": "https://ospreyexterior.com/"}
   }
   </script>
-  <script src="https://t.contentsquare.net/uxa/a349e14090bcc.js"></script>
 </head>
 <body>
   <header class="site-header">
@@ -563,18 +652,18 @@ def main():
       <nav class="primary-nav">
         <a href="/">Home</a>
         <a href="/real-estate">For Agents</a>
-        <a href="/rainwise.html">RainWise &amp; Drainage</a>
+        <a href="/rainwise">RainWise &amp; Drainage</a>
         <div class="nav-dropdown">
           <button class="nav-link" type="button" aria-haspopup="true" aria-expanded="false">Exterior Services</button>
           <div class="nav-dropdown-menu">
-            <a href="/services.html">Roofing</a>
-            <a href="/gutters.html">Gutters</a>
-            <a href="/services.html">Washing</a>
-            <a href="/holiday-lighting.html">Lighting</a>
+            <a href="/services">Roofing</a>
+            <a href="/gutters">Gutters</a>
+            <a href="/services">Washing</a>
+            <a href="/holiday-lighting">Lighting</a>
           </div>
         </div>
-        <a href="/portfolio.html">Portfolio</a>
-        <a href="/contact.html" class="btn btn-primary" data-track="nav_cta" data-label="Get a Bid">Get a Bid</a>
+        <a href="/portfolio">Portfolio</a>
+        <a href="/contact" class="btn btn-primary" data-track="nav_cta" data-label="Get a Bid">Get a Bid</a>
       </nav>
     </div>
   </header>
@@ -584,10 +673,10 @@ def main():
         <div class="hero-copy">
           <span class="highlight">Problem-intent cluster</span>
           <h1>Gutter problems: diagnose and fix</h1>
-          <p>Overflow, leaking seams, ice dams, clogs, noise—each has causes, diagnosis steps, and professional fixes. Browse 25 intent-driven guides built for Seattle, Bellevue, Redmond, Kirkland, and Issaquah.</p>
+          <p>Overflow, leaking seams, ice dams, clogs, noise—each has causes, diagnosis steps, and professional fixes. Browse ''' + str(total) + ''' intent-driven guides built for Seattle, Bellevue, Redmond, Kirkland, and Issaquah.</p>
           <div class="hero-ctas">
-            <a class="btn btn-primary" href="/contact.html" data-track="problems_cta">Get inspection</a>
-            <a class="btn btn-outline" href="/gutters.html">Gutter services</a>
+            <a class="btn btn-primary" href="/contact" data-track="problems_cta">Get inspection</a>
+            <a class="btn btn-outline" href="/gutters">Gutter services</a>
           </div>
         </div>
       </div>
@@ -635,40 +724,11 @@ def main():
       <div class="container">
         <div class="section-header">
           <span>Browse by problem</span>
-          <h2>25 intent-driven guides</h2>
+          <h2>''' + str(total) + ''' intent-driven guides</h2>
           <p>Click through to causes, diagnosis, and professional fixes. Each page links to our gutter services and contact.</p>
         </div>
         <div class="card-grid" style="grid-template-columns:repeat(auto-fit,minmax(280px,1fr));">
-          <article class="card">
-            <h3>Overflow &amp; drainage</h3>
-            <ul class="link-list">
-''' + "\n".join(f'              <li><a href="/problems/gutters/{p["slug"]}/">{p["title"].replace(" | Osprey Exterior","")}</a></li>' for p in PAGES if p["cluster"] == "overflow") + '''
-            </ul>
-          </article>
-          <article class="card">
-            <h3>Leaking &amp; seams</h3>
-            <ul class="link-list">
-''' + "\n".join(f'              <li><a href="/problems/gutters/{p["slug"]}/">{p["title"].replace(" | Osprey Exterior","")}</a></li>' for p in PAGES if p["cluster"] == "leaking") + '''
-            </ul>
-          </article>
-          <article class="card">
-            <h3>Ice &amp; freeze</h3>
-            <ul class="link-list">
-''' + "\n".join(f'              <li><a href="/problems/gutters/{p["slug"]}/">{p["title"].replace(" | Osprey Exterior","")}</a></li>' for p in PAGES if p["cluster"] == "ice") + '''
-            </ul>
-          </article>
-          <article class="card">
-            <h3>Blockage &amp; debris</h3>
-            <ul class="link-list">
-''' + "\n".join(f'              <li><a href="/problems/gutters/{p["slug"]}/">{p["title"].replace(" | Osprey Exterior","")}</a></li>' for p in PAGES if p["cluster"] == "blockage") + '''
-            </ul>
-          </article>
-          <article class="card">
-            <h3>Noise &amp; water behavior</h3>
-            <ul class="link-list">
-''' + "\n".join(f'              <li><a href="/problems/gutters/{p["slug"]}/">{p["title"].replace(" | Osprey Exterior","")}</a></li>' for p in PAGES if p["cluster"] == "noise") + '''
-            </ul>
-          </article>
+''' + pillar_cards(links) + '''
         </div>
       </div>
     </section>
@@ -680,8 +740,8 @@ def main():
           <p>Schedule an inspection, seasonal cleaning, or repair estimate. Fast bids and escrow billing available.</p>
         </div>
         <div class="hero-ctas">
-          <a class="btn btn-primary" href="/contact.html">Request inspection</a>
-          <a class="btn btn-outline" href="/gutters.html">Gutter services</a>
+          <a class="btn btn-primary" href="/contact">Request inspection</a>
+          <a class="btn btn-outline" href="/gutters">Gutter services</a>
         </div>
       </div>
     </section>
@@ -698,11 +758,11 @@ def main():
         </div>
         <p>Exterior contractor delivering gutters, cisterns, drainage, and compliance installs across Puget Sound.</p>
         <ul class="service-area-list">
-          <li><a href="/service-areas/seattle.html">Seattle</a></li>
-          <li><a href="/service-areas/bellevue.html">Bellevue</a></li>
-          <li><a href="/service-areas/kirkland.html">Kirkland</a></li>
-          <li><a href="/service-areas/redmond.html">Redmond</a></li>
-          <li><a href="/service-areas/issaquah.html">Issaquah</a></li>
+          <li><a href="/service-areas/seattle">Seattle</a></li>
+          <li><a href="/service-areas/bellevue">Bellevue</a></li>
+          <li><a href="/service-areas/kirkland">Kirkland</a></li>
+          <li><a href="/service-areas/redmond">Redmond</a></li>
+          <li><a href="/service-areas/issaquah">Issaquah</a></li>
         </ul>
       </div>
       <div>
@@ -713,14 +773,14 @@ def main():
       </div>
       <div>
         <h4 style="font-family:var(--font-heading);">Resources</h4>
-        <p><a href="/gutters.html">Gutter services</a></p>
-        <p><a href="/contact.html">Get a bid</a></p>
+        <p><a href="/gutters">Gutter services</a></p>
+        <p><a href="/contact">Get a bid</a></p>
       </div>
     </div>
     <div class="footer-bottom">
       <div>&copy; <span data-year></span> Osprey Exterior. All rights reserved.</div>
       <div class="footer-links">
-        <a href="/privacy.html">Privacy Policy</a>
+        <a href="/privacy">Privacy Policy</a>
         <a href="/sitemap.xml">Sitemap</a>
       </div>
     </div>
@@ -730,19 +790,76 @@ def main():
 </body>
 </html>'''
 
-    (PROBLEMS_DIR / "index.html").write_text(pillar_html, encoding="utf-8")
-    print(f"Wrote {PROBLEMS_DIR / 'index.html'}")
-
-    # 2. Intent pages
-    for page in PAGES:
-        slug = page["slug"]
-        out_dir = PROBLEMS_DIR / slug
-        out_dir.mkdir(parents=True, exist_ok=True)
-        html = render_intent_page(page, assets_intent)
-        (out_dir / "index.html").write_text(html, encoding="utf-8")
-        print(f"Wrote {out_dir / 'index.html'}")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate the /problems/gutters/ pillar and intent pages.")
+    parser.add_argument(
+        "--catalog",
+        type=Path,
+        default=CATALOG_PATH,
+        help="Page catalog (.json, .jsonl or .csv); defaults to problems/gutters/catalog.json.",
+    )
+    parser.add_argument(
+        "--matrix",
+        action="store_true",
+        help="Also render every problem for each location in pages/locations.json.",
+    )
+    parser.add_argument(
+        "--max-pages",
+        type=int,
+        metavar="N",
+        help="Render at most N matrix pages this run; the rest are left for later runs.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore the matrix build manifest and re-render every matrix page.",
+    )
+    add_profile_arguments(parser)
+    return parser.parse_args()
 
-    print(f"\nDone. {len(PAGES) + 1} pages generated.")
+def main():
+    args = parse_args()
+    with profiling(args, "generate_problem_cluster"):
+        PROBLEMS_DIR.mkdir(parents=True, exist_ok=True)
+        stats = OutputStats()
+        assets_intent = ASSETS_INTENT
+        # Only (slug, title) per page is kept, grouped by cluster as pages stream past.
+        links = defaultdict(list)
+        total = 0
+        matrix = None
+        if args.matrix:
+            try:
+                LOCATIONS.load()
+            except LocationDataError as exc:
+                raise SystemExit(str(exc)) from exc
+            manifest = BuildManifest(MATRIX_MANIFEST_PATH) if args.force else BuildManifest.load(MATRIX_MANIFEST_PATH)
+            matrix = MatrixRun(manifest, args.max_pages)
+        started = time.perf_counter()
+
+        with LastmodStore.open() as lastmod:
+            # 1. Intent pages, rendered and written one at a time
+            try:
+                for page in iter_catalog(args.catalog):
+                    # Matrix city pages share their problem's fragments.
+                    fragments = problem_fragments(page)
+                    html = render_intent_page(page, assets_intent, fragments)
+                    write_page(intent_page_path(page), html, stats, lastmod)
+                    links[page["cluster"]].append((page["slug"], page["title"]))
+                    total += 1
+                    if matrix is not None:
+                        matrix.write(page, fragments, assets_intent, stats, lastmod)
+            except (OSError, CatalogError) as exc:
+                raise SystemExit(f"Problem catalog error: {exc}") from exc
+
+            # 2. Pillar page
+            write_page(PILLAR_PATH, render_pillar(links, total), stats, lastmod)
+
+        print(f"\nDone. {total + 1} pages generated ({stats.written} written, {stats.unchanged} unchanged, {stats.failed} failed).")
+        summary = {"seconds": round(time.perf_counter() - started, 2)}
+        if matrix is not None:
+            matrix.manifest.save()
+            summary.update(matrix.summary())
+        print(json.dumps(summary))
 
 if __name__ == "__main__":
     main()
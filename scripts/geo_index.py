@@ -0,0 +1,102 @@
+"""
+Nearest-neighbor lookups over city coordinates.
+
+A small k-d tree built once from latitude/longitude pairs. Points are projected
+onto a local equirectangular plane in kilometres, which is accurate to well
+under 1% across a metro area like the Eastside.
+"""
+import heapq
+import math
+from typing import Mapping, NamedTuple
+
+KM_PER_DEGREE = 111.195
+
+
+class _Node(NamedTuple):
+    key: str
+    x: float
+    y: float
+    axis: int
+    left: "_Node | None"
+    right: "_Node | None"
+
+
+class GeoIndex:
+    def __init__(self, points: Mapping[str, tuple[float, float]]) -> None:
+        self.points = dict(points)
+        if self.points:
+            mean_lat = sum(lat for lat, _ in self.points.values()) / len(self.points)
+        else:
+            mean_lat = 0.0
+        self._lon_scale = KM_PER_DEGREE * math.cos(math.radians(mean_lat))
+        projected = [(key, *self._project(lat, lon)) for key, (lat, lon) in self.points.items()]
+        # Sort by key first so ties on an axis split the same way on every run.
+        projected.sort()
+        self._root = self._build(projected, 0)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.points
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _project(self, lat: float, lon: float) -> tuple[float, float]:
+        return lon * self._lon_scale, lat * KM_PER_DEGREE
+
+    def _build(self, items: list[tuple[str, float, float]], depth: int) -> _Node | None:
+        if not items:
+            return None
+        axis = depth % 2
+        items = sorted(items, key=lambda item: item[1 + axis])
+        median = len(items) // 2
+        key, x, y = items[median]
+        return _Node(
+            key,
+            x,
+            y,
+            axis,
+            self._build(items[:median], depth + 1),
+            self._build(items[median + 1:], depth + 1),
+        )
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int,
+        max_km: float | None = None,
+        exclude: str | None = None,
+    ) -> list[tuple[float, str]]:
+        """Return up to k (distance_km, key) pairs, closest first."""
+        if k <= 0:
+            return []
+        qx, qy = self._project(lat, lon)
+        limit_sq = max_km * max_km if max_km is not None else math.inf
+        # Max-heap of the best k so far, stored as (-distance_sq, key).
+        best: list[tuple[float, str]] = []
+
+        def visit(node: _Node | None) -> None:
+            if node is None:
+                return
+            dx = qx - node.x
+            dy = qy - node.y
+            dist_sq = dx * dx + dy * dy
+            if node.key != exclude and dist_sq <= limit_sq:
+                entry = (-dist_sq, node.key)
+                if len(best) < k:
+                    heapq.heappush(best, entry)
+                elif entry > best[0]:
+                    heapq.heapreplace(best, entry)
+            diff = dx if node.axis == 0 else dy
+            near, far = (node.left, node.right) if diff < 0 else (node.right, node.left)
+            visit(near)
+            bound = -best[0][0] if len(best) == k else limit_sq
+            if diff * diff <= bound:
+                visit(far)
+
+        visit(self._root)
+        return sorted((math.sqrt(-neg_sq), key) for neg_sq, key in best)
+
+    def nearest_to(self, key: str, k: int, max_km: float | None = None) -> list[tuple[float, str]]:
+        lat, lon = self.points[key]
+        return self.nearest(lat, lon, k, max_km=max_km, exclude=key)
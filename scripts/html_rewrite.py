@@ -0,0 +1,277 @@
+"""
+Single-pass HTML rewriting.
+
+Edits are collected as splices against the original document and applied in
+one join at the end, instead of rebuilding the whole string after every
+individual change.
+"""
+import json
+import re
+from typing import Callable, Iterable, Iterator, NamedTuple
+
+from build_profile import profiled
+
+# Tokens the SEO pass cares about, located with one scan over the document.
+# Every alternative starts at "<" so the regex engine can skip ahead with a
+# literal search; leading whitespace is folded in afterwards.
+TOKEN_PATTERN = re.compile(
+    r"<(?:"
+    r"(?P<geo>meta name=\"(?:geo\.region|geo\.placename|geo\.position|ICBM)\"[^>]*>)"
+    r"|(?P<canonical>link\s+rel=['\"]canonical['\"][^>]*>)"
+    r"|(?P<nearby>section id=\"nearby-links\">.*?</section>)"
+    r"|(?P<ld_json>script\b[^>]*?type\s*=\s*[\"']?application/ld\+json[^>]*>(?P<ld_json_body>.*?)</script\s*>)"
+    r"|(?P<head_close>/head>)"
+    r"|(?P<body_close>/body>)"
+    r")",
+    re.IGNORECASE | re.DOTALL,
+)
+# Removable blocks own the whitespace before them, so removing one leaves no
+# gap and whatever followed keeps its own line and indentation.
+WHITESPACE_OWNERS = {"geo", "nearby", "ld_json"}
+
+SCRIPT_OPEN_PATTERN = re.compile(r"<script\b([^>]*)>", re.IGNORECASE)
+SCRIPT_CLOSE_PATTERN = re.compile(r"</script\s*>", re.IGNORECASE)
+LD_JSON_TYPE_PATTERN = re.compile(r"type\s*=\s*[\"']?application/ld\+json", re.IGNORECASE)
+
+
+class Token(NamedTuple):
+    kind: str
+    start: int
+    end: int
+    body: str = ""
+
+
+class ScriptBlock(NamedTuple):
+    start: int
+    end: int
+    attrs: str
+    body: str
+
+
+class Splice(NamedTuple):
+    start: int
+    end: int
+    text: str
+    seq: int
+
+
+def leading_whitespace_start(content: str, start: int, floor: int = 0) -> int:
+    while start > floor and content[start - 1].isspace():
+        start -= 1
+    return start
+
+
+def scan_tokens(content: str) -> Iterator[Token]:
+    previous_end = 0
+    for match in TOKEN_PATTERN.finditer(content):
+        kind = match.lastgroup
+        start, end = match.span()
+        if kind in WHITESPACE_OWNERS:
+            start = leading_whitespace_start(content, start, previous_end)
+        previous_end = end
+        yield Token(kind, start, end, match.group("ld_json_body") or "")
+
+
+def indent_lines(text: str, indentation: str) -> str:
+    if not indentation:
+        return text
+    return "".join(indentation + line if line.strip() else line for line in text.splitlines(keepends=True))
+
+
+def iter_script_blocks(content: str) -> Iterator[ScriptBlock]:
+    """Yield every <script> element, scanning each byte of the document once."""
+    position = 0
+    while True:
+        open_match = SCRIPT_OPEN_PATTERN.search(content, position)
+        if not open_match:
+            return
+        close_match = SCRIPT_CLOSE_PATTERN.search(content, open_match.end())
+        if not close_match:
+            return
+        yield ScriptBlock(
+            open_match.start(),
+            close_match.end(),
+            open_match.group(1),
+            content[open_match.end():close_match.start()],
+        )
+        position = close_match.end()
+
+
+def _node_types(node: object) -> set[str]:
+    if not isinstance(node, dict):
+        return set()
+    value = node.get("@type")
+    if isinstance(value, str):
+        return {value}
+    if isinstance(value, list):
+        return {item for item in value if isinstance(item, str)}
+    return set()
+
+
+def ld_json_nodes(payload: object) -> list:
+    if isinstance(payload, list):
+        return payload
+    if isinstance(payload, dict) and isinstance(payload.get("@graph"), list):
+        return payload["@graph"]
+    return [payload]
+
+
+def iter_ld_json(content: str) -> Iterator[tuple[ScriptBlock, object]]:
+    """Yield each ld+json script that parses, with its payload."""
+    for block in iter_script_blocks(content):
+        if not LD_JSON_TYPE_PATTERN.search(block.attrs):
+            continue
+        try:
+            yield block, json.loads(block.body)
+        except ValueError:
+            continue
+
+
+def is_linked_graph(payload: object) -> bool:
+    """True for an @graph whose nodes carry @id, as the page generators emit."""
+    return (
+        isinstance(payload, dict)
+        and isinstance(payload.get("@graph"), list)
+        and any(isinstance(node, dict) and "@id" in node for node in payload["@graph"])
+    )
+
+
+def is_owned_block(payload: object, owned: set[str], where: Callable[[list], bool] | None = None) -> bool:
+    if is_linked_graph(payload):
+        return False
+    nodes = ld_json_nodes(payload)
+    if not nodes or not all(_node_types(node) & owned for node in nodes):
+        return False
+    return where is None or where(nodes)
+
+
+@profiled("regex")
+def has_linked_graph(content: str) -> bool:
+    return any(is_linked_graph(payload) for _block, payload in iter_ld_json(content))
+
+
+@profiled("regex")
+def find_ld_json_blocks(
+    content: str,
+    owned_types: Iterable[str],
+    where: Callable[[list], bool] | None = None,
+) -> list[tuple[int, int]]:
+    """Return (start, end) spans of ld+json scripts made up only of owned types.
+
+    Blocks that fail to parse, that mix owned and foreign nodes, or that are a
+    generator's linked @graph are left alone; where, if given, further filters
+    on the block's nodes. Spans include the whitespace before the block, so
+    removal leaves no gap and whatever followed stays on its own line.
+    """
+    owned = set(owned_types)
+    spans: list[tuple[int, int]] = []
+    previous_end = 0
+    for block, payload in iter_ld_json(content):
+        if not is_owned_block(payload, owned, where):
+            continue
+        start = leading_whitespace_start(content, block.start, previous_end)
+        spans.append((start, block.end))
+        previous_end = block.end
+    return spans
+
+
+def remove_spans(content: str, spans: list[tuple[int, int]]) -> str:
+    if not spans:
+        return content
+    parts: list[str] = []
+    cursor = 0
+    for start, end in spans:
+        parts.append(content[cursor:start])
+        cursor = end
+    parts.append(content[cursor:])
+    return "".join(parts)
+
+
+class HtmlRewriter:
+    @profiled("regex")
+    def __init__(self, content: str) -> None:
+        self.content = content
+        self.tokens: dict[str, list[Token]] = {}
+        self.ld_json: list[tuple[Token, object]] = []
+        for token in scan_tokens(content):
+            self.tokens.setdefault(token.kind, []).append(token)
+            if token.kind == "ld_json":
+                try:
+                    self.ld_json.append((token, json.loads(token.body)))
+                except ValueError:
+                    continue
+        self._splices: list[Splice] = []
+
+    def first(self, kind: str) -> Token | None:
+        found = self.tokens.get(kind)
+        return found[0] if found else None
+
+    def all(self, kind: str) -> list[Token]:
+        return self.tokens.get(kind, [])
+
+    def text(self, token: Token) -> str:
+        return self.content[token.start:token.end]
+
+    def has_linked_graph(self) -> bool:
+        return any(is_linked_graph(payload) for _token, payload in self.ld_json)
+
+    def ld_json_blocks(
+        self, owned_types: Iterable[str], where: Callable[[list], bool] | None = None
+    ) -> list[tuple[Token, object]]:
+        """The scanned ld+json blocks find_ld_json_blocks would return, with their payloads."""
+        owned = set(owned_types)
+        return [(token, payload) for token, payload in self.ld_json if is_owned_block(payload, owned, where)]
+
+    def close_position(self, tag: str) -> int:
+        token = self.first(f"{tag}_close")
+        return token.start if token else len(self.content)
+
+    def indentation(self, tag: str) -> str | None:
+        """Whitespace before </tag> on its line, or None if markup precedes it there."""
+        position = self.close_position(tag)
+        line_start = self.content.rfind("\n", 0, position) + 1
+        indentation = self.content[line_start:position]
+        return None if indentation.strip() else indentation
+
+    def replace(self, start: int, end: int, text: str) -> None:
+        if self.content[start:end] == text:
+            return
+        self._splices.append(Splice(start, end, text, len(self._splices)))
+
+    def remove(self, start: int, end: int) -> None:
+        self.replace(start, end, "")
+
+    def insert(self, position: int, text: str) -> None:
+        self.replace(position, position, text)
+
+    def insert_before_close(self, tag: str, text: str) -> None:
+        """Insert lines before </tag>, indented like the line </tag> sits on."""
+        indentation = self.indentation(tag)
+        if indentation is None:
+            self.insert(self.close_position(tag), text)
+            return
+        self.insert(self.close_position(tag) - len(indentation), indent_lines(text.lstrip("\n"), indentation))
+
+    def replace_block(self, token: Token, tag: str, text: str) -> None:
+        """Replace a whitespace-owning token, laid out as insert_before_close would."""
+        indentation = self.indentation(tag) or ""
+        self.replace(token.start, token.end, "\n" + indent_lines(text.strip("\n"), indentation))
+
+    @property
+    def changed(self) -> bool:
+        return bool(self._splices)
+
+    def render(self) -> str:
+        if not self._splices:
+            return self.content
+        parts: list[str] = []
+        cursor = 0
+        for splice in sorted(self._splices, key=lambda s: (s.start, s.seq)):
+            start = max(splice.start, cursor)
+            if start > cursor:
+                parts.append(self.content[cursor:start])
+            parts.append(splice.text)
+            # Overlapping removals collapse into one; never move the cursor backwards.
+            cursor = max(cursor, splice.end)
+        parts.append(self.content[cursor:])
+        return "".join(parts)
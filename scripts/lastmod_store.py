@@ -0,0 +1,192 @@
+"""
+Persistent record of when each output file's content last really changed.
+
+Every path (relative to the repo root) maps to the sha256 of its bytes and the
+UTC time that hash last changed. Rewriting a file with identical bytes, or
+touching its mtime, does not move the time, so consumers (sitemaps, feeds)
+can publish honest freshness dates.
+
+The store is a single SQLite table in .build/lastmod.sqlite3. Generators call
+observe() with the bytes they just wrote; readers call refresh() with a batch
+of paths, which trusts the stored hash while a file's (mtime, size) is
+unchanged and only hashes files that were touched. Lookups go to SQLite in
+chunks, so thousands of paths cost a handful of queries.
+
+A path first seen without a known change time (an unchanged file observed
+for the first time) keeps changed_at empty until a reader dates it, usually
+from the date that file already carries in a published sitemap.
+"""
+import hashlib
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Mapping, NamedTuple
+
+from build_manifest import BUILD_DIR
+from build_profile import profiled
+from site_output import FAILED, WRITTEN
+
+ROOT = Path(__file__).resolve().parents[1]
+LASTMOD_DB_PATH = BUILD_DIR / "lastmod.sqlite3"
+STORE_FORMAT = 1
+# Stays well under SQLite's bound-parameter limit.
+LOOKUP_CHUNK = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS content (
+    path TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    mtime_ns INTEGER,
+    size INTEGER,
+    changed_at TEXT
+) WITHOUT ROWID
+"""
+
+
+class ContentRecord(NamedTuple):
+    hash: str
+    mtime_ns: int | None
+    size: int | None
+    # ISO 8601 UTC timestamp (or a bare date taken from a seed), None if not known yet.
+    changed_at: str | None
+
+    @property
+    def date(self) -> str | None:
+        return self.changed_at[:10] if self.changed_at else None
+
+
+@profiled("hash")
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+
+class LastmodStore:
+    def __init__(self, connection: sqlite3.Connection, base: Path = ROOT, now: str | None = None) -> None:
+        self.connection = connection
+        self.base = base
+        # One timestamp per run, so every page changed by a build shares it.
+        self.now = now or utc_now()
+        self.hashed = 0
+        self.changed = 0
+
+    @classmethod
+    def open(cls, path: Path = LASTMOD_DB_PATH, base: Path = ROOT, now: str | None = None) -> "LastmodStore":
+        path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(path)
+        if connection.execute("PRAGMA user_version").fetchone()[0] != STORE_FORMAT:
+            connection.execute("DROP TABLE IF EXISTS content")
+            connection.execute(f"PRAGMA user_version = {STORE_FORMAT}")
+        connection.execute(SCHEMA)
+        return cls(connection, base, now)
+
+    def key(self, path: Path) -> str:
+        return path.relative_to(self.base).as_posix()
+
+    @profiled("read")
+    def lookup(self, keys: Iterable[str]) -> dict[str, ContentRecord]:
+        """Bulk-fetch records for root-relative keys; unknown keys are absent from the result."""
+        keys = list(dict.fromkeys(keys))
+        records: dict[str, ContentRecord] = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT path, hash, mtime_ns, size, changed_at FROM content WHERE path IN ({placeholders})",
+                chunk,
+            )
+            for path, *fields in rows:
+                records[path] = ContentRecord(*fields)
+        return records
+
+    def _put(self, key: str, record: ContentRecord) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO content (path, hash, mtime_ns, size, changed_at) VALUES (?, ?, ?, ?, ?)",
+            (key, *record),
+        )
+
+    def _update(
+        self,
+        key: str,
+        previous: ContentRecord | None,
+        digest: str,
+        signature: tuple[int, int] | None,
+        changed_at: str | None,
+    ) -> ContentRecord:
+        mtime_ns, size = signature or (None, None)
+        if previous is not None and previous.hash == digest:
+            record = ContentRecord(digest, mtime_ns, size, previous.changed_at or changed_at)
+        elif previous is not None:
+            record = ContentRecord(digest, mtime_ns, size, self.now)
+            self.changed += 1
+        else:
+            record = ContentRecord(digest, mtime_ns, size, changed_at)
+        if record != previous:
+            self._put(key, record)
+        return record
+
+    @staticmethod
+    def _signature(path: Path) -> tuple[int, int] | None:
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def observe(self, path: Path, data: bytes, status: str = WRITTEN) -> ContentRecord | None:
+        """Record bytes a generator just wrote to path (status as returned by site_output)."""
+        if status == FAILED:
+            return None
+        key = self.key(path)
+        previous = self.lookup([key]).get(key)
+        # A first-seen file that was actually rewritten is new content now; otherwise its age is unknown.
+        first_seen = self.now if status == WRITTEN else None
+        self.hashed += 1
+        return self._update(key, previous, content_hash(data), self._signature(path), first_seen)
+
+    @profiled("hash")
+    def refresh(self, paths: Iterable[Path], seeds: Mapping[str, str] | None = None) -> dict[Path, ContentRecord]:
+        """Bring records for paths on disk up to date and return them; missing files are left out.
+
+        seeds maps keys to the change time to assume for files the store has
+        not dated yet; files with neither are dated now.
+        """
+        seeds = seeds or {}
+        paths = list(paths)
+        keys = [self.key(path) for path in paths]
+        records = self.lookup(keys)
+        result: dict[Path, ContentRecord] = {}
+        for path, key in zip(paths, keys):
+            signature = self._signature(path)
+            if signature is None:
+                continue
+            previous = records.get(key)
+            if (
+                previous is not None
+                and previous.changed_at
+                and (previous.mtime_ns, previous.size) == signature
+            ):
+                result[path] = previous
+                continue
+            try:
+                data = path.read_bytes()
+            except OSError:
+                continue
+            self.hashed += 1
+            result[path] = self._update(key, previous, content_hash(data), signature, seeds.get(key) or self.now)
+        return result
+
+    def close(self) -> None:
+        self.connection.commit()
+        self.connection.close()
+
+    def __enter__(self) -> "LastmodStore":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.connection.commit()
+        self.connection.close()
@@ -0,0 +1,187 @@
+"""
+Single source of truth for city data in pages/locations.json.
+
+Nothing is read at import time. The JSON is parsed and validated on first
+access, then cached in a compact marshal file keyed by the JSON file's mtime
+and size, so later runs skip parsing and validation entirely. Whether each
+location has a pages/<slug>/ directory is checked on every load, outside the
+cache; locations without one are left out and listed in `skipped`.
+"""
+import json
+import marshal
+from pathlib import Path
+from typing import Iterator
+
+from build_manifest import BUILD_DIR
+from build_profile import profiled
+from site_output import write_bytes_if_changed
+from url_policy import canonical_url, normalize_url
+
+ROOT = Path(__file__).resolve().parents[1]
+PAGES_DIR = ROOT / "pages"
+LOCATIONS_PATH = PAGES_DIR / "locations.json"
+CACHE_PATH = BUILD_DIR / "locations.marshal"
+CACHE_FORMAT = 2
+
+REQUIRED_FIELDS = ("slug", "city", "state", "latitude", "longitude")
+
+
+class LocationDataError(ValueError):
+    pass
+
+
+class Location:
+    __slots__ = ("slug", "city", "state", "latitude", "longitude", "canonical_url")
+
+    def __init__(
+        self,
+        slug: str,
+        city: str,
+        state: str,
+        latitude: float,
+        longitude: float,
+        canonical_url: str,
+    ) -> None:
+        self.slug = slug
+        self.city = city
+        self.state = state
+        self.latitude = latitude
+        self.longitude = longitude
+        self.canonical_url = canonical_url
+
+    def as_row(self) -> tuple:
+        return (self.slug, self.city, self.state, self.latitude, self.longitude, self.canonical_url)
+
+    def __repr__(self) -> str:
+        return f"Location({self.slug!r}, {self.city!r})"
+
+
+def _validate(entries: object) -> list[Location]:
+    if not isinstance(entries, list):
+        raise LocationDataError("locations.json must contain a list of locations")
+    errors: list[str] = []
+    locations: list[Location] = []
+    seen: set[str] = set()
+    for position, entry in enumerate(entries):
+        label = f"entry {position}"
+        if not isinstance(entry, dict):
+            errors.append(f"{label}: expected an object")
+            continue
+        missing = [field for field in REQUIRED_FIELDS if entry.get(field) in (None, "")]
+        if missing:
+            errors.append(f"{label}: missing {', '.join(missing)}")
+            continue
+        slug = str(entry["slug"])
+        label = f"{slug!r}"
+        if slug in seen:
+            errors.append(f"{label}: duplicate slug")
+            continue
+        seen.add(slug)
+        try:
+            latitude = float(entry["latitude"])
+            longitude = float(entry["longitude"])
+        except (TypeError, ValueError):
+            errors.append(f"{label}: latitude/longitude must be numbers")
+            continue
+        if not -90.0 <= latitude <= 90.0 or not -180.0 <= longitude <= 180.0:
+            errors.append(f"{label}: coordinates out of range ({latitude}, {longitude})")
+            continue
+        locations.append(
+            Location(
+                slug,
+                str(entry["city"]),
+                str(entry["state"]),
+                latitude,
+                longitude,
+                normalize_url(str(entry.get("canonical_url") or canonical_url(f"/pages/{slug}"))),
+            )
+        )
+    if errors:
+        raise LocationDataError("Invalid locations.json:\n  " + "\n  ".join(errors))
+    return locations
+
+
+class LocationRegistry:
+    def __init__(
+        self,
+        path: Path = LOCATIONS_PATH,
+        pages_dir: Path = PAGES_DIR,
+        cache_path: Path | None = CACHE_PATH,
+    ) -> None:
+        self.path = path
+        self.pages_dir = pages_dir
+        self.cache_path = cache_path
+        self._by_slug: dict[str, Location] | None = None
+        self.from_cache = False
+        # Slugs in locations.json with no pages/<slug>/ directory.
+        self.skipped: list[str] = []
+
+    def _cache_key(self) -> tuple[int, int]:
+        stat = self.path.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def _read_cache(self, key: tuple[int, int]) -> list[Location] | None:
+        if self.cache_path is None:
+            return None
+        try:
+            payload = marshal.loads(self.cache_path.read_bytes())
+        except (OSError, EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(payload, tuple) or payload[:2] != (CACHE_FORMAT, key):
+            return None
+        return [Location(*row) for row in payload[2]]
+
+    def _write_cache(self, key: tuple[int, int], locations: list[Location]) -> None:
+        if self.cache_path is None:
+            return
+        rows = tuple(location.as_row() for location in locations)
+        write_bytes_if_changed(self.cache_path, marshal.dumps((CACHE_FORMAT, key, rows)))
+
+    def _load(self) -> dict[str, Location]:
+        if self._by_slug is not None:
+            return self._by_slug
+        if not self.path.exists():
+            raise LocationDataError("locations.json not found in pages directory")
+        key = self._cache_key()
+        locations = self._read_cache(key)
+        self.from_cache = locations is not None
+        if locations is None:
+            try:
+                entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except ValueError as exc:
+                raise LocationDataError(f"locations.json is not valid JSON: {exc}") from exc
+            locations = _validate(entries)
+            self._write_cache(key, locations)
+        # Directories come and go without touching locations.json, so this is never cached.
+        self.skipped = [location.slug for location in locations if not (self.pages_dir / location.slug).is_dir()]
+        skipped = set(self.skipped)
+        self._by_slug = {location.slug: location for location in locations if location.slug not in skipped}
+        return self._by_slug
+
+    @profiled("read")
+    def load(self) -> "LocationRegistry":
+        """Load and validate now instead of on first lookup."""
+        self._load()
+        return self
+
+    def get(self, slug: str) -> Location | None:
+        return self._load().get(slug)
+
+    def __getitem__(self, slug: str) -> Location:
+        return self._load()[slug]
+
+    def __contains__(self, slug: object) -> bool:
+        return slug in self._load()
+
+    def __iter__(self) -> Iterator[Location]:
+        return iter(self._load().values())
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def slugs(self) -> list[str]:
+        return list(self._load())
+
+
+# Shared, lazily loaded registry for all scripts.
+LOCATIONS = LocationRegistry()
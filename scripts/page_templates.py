@@ -0,0 +1,102 @@
+"""
+Precompiled HTML templates.
+
+A Template is written like the triple-quoted f-strings it replaces, with
+``{name}`` slots, but is dedented and stripped once when it is compiled.
+Rendering a page only joins the static fragments with the slot values; no
+string is re-scanned line by line per page.
+"""
+from string import Formatter
+from textwrap import dedent
+from typing import Iterable, Mapping
+
+# Private-use sentinels cannot appear in the HTML sources.
+_SLOT_OPEN = "\ue000"
+_SLOT_CLOSE = "\ue001"
+_SLOT = _SLOT_OPEN + "{}" + _SLOT_CLOSE
+# Stand-in for the flush-left continuation lines of a block slot.
+_FLUSH_LINE = "\n\ue002"
+
+
+class TemplateError(ValueError):
+    pass
+
+
+class Template:
+    """A template compiled into alternating literal fragments and slots.
+
+    ``constants`` are inlined at compile time. ``blocks`` names slots whose
+    values span several lines starting at column 0 (an already-dedented
+    fragment); dedent treats those lines as part of the template, so the
+    compiler does too. Every other slot must render on a single line.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        constants: Mapping[str, str] | None = None,
+        blocks: Iterable[str] = (),
+        strip: bool = True,
+        suffix: str = "",
+    ) -> None:
+        self.source = source
+        self.constants = dict(constants or {})
+        self.blocks = frozenset(blocks)
+        self.strip = strip
+        self.suffix = suffix
+        self.slots: list[str] = []
+        self.fragments = self._compile()
+        # Positions in self.fragments that receive slot values, in slot order.
+        self._positions = list(range(1, len(self.fragments), 2))
+
+    def _compile(self) -> list[str]:
+        pieces: list[str] = []
+        for literal, field, spec, conversion in Formatter().parse(self.source):
+            pieces.append(literal)
+            if field is None:
+                continue
+            if spec or conversion:
+                raise TemplateError(f"slot {{{field}}} may not use format specs or conversions")
+            if field in self.constants:
+                pieces.append(self.constants[field])
+                continue
+            pieces.append(_SLOT.format(len(self.slots)))
+            if field in self.blocks:
+                pieces.append(_FLUSH_LINE)
+            self.slots.append(field)
+
+        text = dedent("".join(pieces)).replace(_FLUSH_LINE, "")
+        if self.strip:
+            text = text.strip()
+        text += self.suffix
+
+        fragments: list[str] = []
+        for index, chunk in enumerate(text.split(_SLOT_OPEN)):
+            if index == 0:
+                fragments.append(chunk)
+                continue
+            number, _, literal = chunk.partition(_SLOT_CLOSE)
+            if int(number) != len(fragments) // 2:
+                raise TemplateError("slot order changed while compiling")
+            fragments.extend(("", literal))
+        return fragments
+
+    def render(self, **values: str) -> str:
+        parts = self.fragments.copy()
+        try:
+            for position, name in zip(self._positions, self.slots):
+                parts[position] = values[name]
+        except KeyError as exc:
+            raise TemplateError(f"missing value for slot {exc}") from None
+        return "".join(parts)
+
+    def interpret(self, **values: str) -> str:
+        """Render the way the original f-strings did: interpolate, then dedent.
+
+        Slower by design; kept so the compiled output can be checked and
+        benchmarked against it.
+        """
+        text = dedent(self.source.format(**self.constants, **values))
+        if self.strip:
+            text = text.strip()
+        return text + self.suffix
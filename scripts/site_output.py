@@ -0,0 +1,139 @@
+"""
+Shared output layer for the site scripts.
+
+Pages are only written when their bytes actually change, and every write goes
+through a temp file plus rename so the static host never serves a half-written
+page.
+"""
+import filecmp
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from build_profile import PROFILER, profiled
+
+WRITTEN = "written"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+
+class OutputStats:
+    def __init__(self) -> None:
+        self.written = 0
+        self.unchanged = 0
+        self.failed = 0
+
+    def add(self, status: str) -> None:
+        setattr(self, status, getattr(self, status) + 1)
+
+    def summary(self) -> dict:
+        return {"written": self.written, "unchanged": self.unchanged, "failed": self.failed}
+
+
+def atomic_write_bytes(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(tmp_name, mode)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+@profiled("write")
+def write_bytes_if_changed(path: Path, data: bytes, stats: OutputStats | None = None) -> str:
+    try:
+        try:
+            current = path.read_bytes()
+        except FileNotFoundError:
+            current = None
+        if current == data:
+            status = UNCHANGED
+        else:
+            atomic_write_bytes(path, data)
+            PROFILER.count("bytes_written", len(data))
+            status = WRITTEN
+    except OSError as exc:
+        print(f"Failed to write {path}: {exc}", file=sys.stderr)
+        status = FAILED
+    if stats is not None:
+        stats.add(status)
+    return status
+
+
+def write_text_if_changed(
+    path: Path, content: str, stats: OutputStats | None = None, encoding: str = "utf-8"
+) -> str:
+    return write_bytes_if_changed(path, content.encode(encoding), stats)
+
+
+class AtomicStream:
+    """Binary file written incrementally to a temp file and swapped in on commit.
+
+    For outputs too large to build in memory. commit() keeps the existing file
+    (and its mtime) when the streamed bytes are identical.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        self._handle = os.fdopen(fd, "wb")
+        self.bytes_written = 0
+
+    def write(self, data: bytes) -> None:
+        self._handle.write(data)
+        self.bytes_written += len(data)
+
+    def abort(self) -> None:
+        if not self._handle.closed:
+            self._handle.close()
+        try:
+            os.unlink(self._tmp_name)
+        except FileNotFoundError:
+            pass
+
+    @profiled("write")
+    def commit(self, stats: OutputStats | None = None) -> str:
+        try:
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+            self._handle.close()
+            if self.path.exists() and filecmp.cmp(self._tmp_name, self.path, shallow=False):
+                self.abort()
+                status = UNCHANGED
+            else:
+                try:
+                    mode = self.path.stat().st_mode & 0o777
+                except FileNotFoundError:
+                    mode = 0o644
+                os.chmod(self._tmp_name, mode)
+                os.replace(self._tmp_name, self.path)
+                status = WRITTEN
+        except OSError as exc:
+            print(f"Failed to write {self.path}: {exc}", file=sys.stderr)
+            self.abort()
+            status = FAILED
+        if stats is not None:
+            stats.add(status)
+        return status
+
+    def __enter__(self) -> "AtomicStream":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # Discards the temp file unless commit() already moved it into place.
+        self.abort()
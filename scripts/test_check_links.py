@@ -0,0 +1,53 @@
+from check_links import SiteIndex, check_page
+from url_policy import serving_rules
+
+FILES = ["/about.html", "/pages/bellevue/index.html", "/pages/gutters.html", "/assets/site.css"]
+
+
+def index(**config):
+    return SiteIndex(FILES, serving_rules({"cleanUrls": True, "trailingSlash": False, **config}))
+
+
+def test_clean_urls_serve_pages_without_extension():
+    site = index()
+    assert site.resolve("/about") == ("/about", 0, False)
+    assert site.resolve("/pages/bellevue") == ("/pages/bellevue", 0, False)
+    assert site.resolve("/assets/site.css") == ("/assets/site.css", 0, False)
+    assert site.resolve("/missing").served is None
+
+
+def test_extension_index_and_trailing_slash_redirect_once():
+    site = index()
+    assert site.resolve("/about.html") == ("/about", 1, False)
+    assert site.resolve("/pages/bellevue/index.html") == ("/pages/bellevue", 1, False)
+    assert site.resolve("/pages/bellevue/") == ("/pages/bellevue", 1, False)
+
+
+def test_without_clean_urls_only_files_are_served():
+    site = SiteIndex(FILES, serving_rules({}))
+    assert site.resolve("/about.html") == ("/about.html", 0, False)
+    assert site.resolve("/about").served is None
+    assert site.resolve("/pages/bellevue/").served == "/pages/bellevue/"
+
+
+def test_redirect_table_applies_after_the_builtin_rules():
+    site = index(
+        redirects=[
+            {"source": "/old/:slug", "destination": "/pages/:slug"},
+            {"source": "/a", "destination": "/b"},
+            {"source": "/b", "destination": "/a"},
+        ]
+    )
+    assert site.resolve("/old/gutters.html") == ("/pages/gutters", 2, False)
+    assert site.resolve("/a").loop
+
+
+def test_relative_links_resolve_against_the_served_url(tmp_path):
+    page = tmp_path / "pages" / "bellevue" / "index.html"
+    page.parent.mkdir(parents=True)
+    page.write_text('<a href="gutters">ok</a> <a href="bellevue/roofing">broken</a> <a href="../about.html">old</a>')
+    result = check_page(page, index(), root=tmp_path)
+    # Served at /pages/bellevue, so "gutters" is /pages/gutters, not /pages/bellevue/gutters.
+    assert result.checked == 3
+    assert [link.target for link in result.broken] == ["/pages/bellevue/roofing"]
+    assert [(link.target, link.served) for link in result.redirecting] == [("/about.html", "/about")]
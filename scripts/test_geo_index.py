@@ -0,0 +1,49 @@
+import math
+import random
+
+from geo_index import GeoIndex
+
+
+def brute_force(index, lat, lon, k, max_km=None, exclude=None):
+    qx, qy = index._project(lat, lon)
+    found = []
+    for key, (point_lat, point_lon) in index.points.items():
+        x, y = index._project(point_lat, point_lon)
+        distance = math.hypot(qx - x, qy - y)
+        if key != exclude and (max_km is None or distance <= max_km):
+            found.append((distance, key))
+    return sorted(found)[:k]
+
+
+def random_points(count, seed):
+    rng = random.Random(seed)
+    return {f"city-{n}": (47.4 + rng.random() * 0.5, -122.4 + rng.random() * 0.5) for n in range(count)}
+
+
+def assert_same(found, expected):
+    assert [key for _, key in found] == [key for _, key in expected]
+    assert all(math.isclose(a, b) for (a, _), (b, _) in zip(found, expected))
+
+
+def test_nearest_matches_brute_force():
+    index = GeoIndex(random_points(300, seed=1))
+    rng = random.Random(2)
+    for _ in range(50):
+        lat, lon = 47.3 + rng.random() * 0.7, -122.5 + rng.random() * 0.7
+        for k in (1, 5, 20):
+            assert_same(index.nearest(lat, lon, k), brute_force(index, lat, lon, k))
+
+
+def test_max_km_and_exclude_match_brute_force():
+    index = GeoIndex(random_points(120, seed=3))
+    for key in list(index.points)[:30]:
+        lat, lon = index.points[key]
+        assert_same(index.nearest_to(key, 5, max_km=8.0), brute_force(index, lat, lon, 5, 8.0, exclude=key))
+
+
+def test_edge_cases():
+    assert GeoIndex({}).nearest(47.6, -122.2, 3) == []
+    index = GeoIndex(random_points(4, seed=4))
+    assert index.nearest(47.6, -122.2, 0) == []
+    assert len(index.nearest(47.6, -122.2, 10)) == 4
+    assert len(index) == 4 and "city-0" in index
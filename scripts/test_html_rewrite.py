@@ -0,0 +1,83 @@
+from html_rewrite import HtmlRewriter, find_ld_json_blocks, iter_script_blocks, remove_spans
+
+PAGE = """<html>
+  <head>
+    <title>Page</title>
+    <meta name="geo.region" content="US-WA">
+    <script type="application/ld+json">{"@type": "FAQPage", "mainEntity": []}</script>
+    <script type="application/ld+json">{"@graph": [{"@type": "Service", "@id": "#service"}]}</script>
+  </head>
+  <body>
+    <p>Hi</p>
+  </body>
+</html>
+"""
+
+
+def test_splices_apply_against_the_original():
+    rewriter = HtmlRewriter("<p>one two three</p>")
+    rewriter.replace(7, 10, "2")
+    rewriter.insert(3, "zero ")
+    rewriter.remove(10, 16)
+    assert rewriter.changed
+    assert rewriter.render() == "<p>zero one 2</p>"
+
+
+def test_replacing_with_the_same_text_is_not_a_change():
+    rewriter = HtmlRewriter(PAGE)
+    rewriter.replace(0, 6, "<html>")
+    assert not rewriter.changed
+    assert rewriter.render() == PAGE
+
+
+def test_removed_tokens_take_their_leading_whitespace():
+    rewriter = HtmlRewriter(PAGE)
+    for token in rewriter.all("geo"):
+        rewriter.remove(token.start, token.end)
+    assert rewriter.render() == PAGE.replace('\n    <meta name="geo.region" content="US-WA">', "")
+
+
+def test_insert_before_close_keeps_the_closing_tag_indentation():
+    rewriter = HtmlRewriter(PAGE)
+    rewriter.insert_before_close("head", '  <link rel="canonical" href="/x">\n')
+    assert '    <link rel="canonical" href="/x">\n  </head>' in rewriter.render()
+
+
+def test_insert_before_close_without_the_tag_appends():
+    rewriter = HtmlRewriter("<p>fragment</p>")
+    rewriter.insert_before_close("body", "<footer></footer>")
+    assert rewriter.render() == "<p>fragment</p><footer></footer>"
+
+
+def test_scan_parses_ld_json_and_spots_linked_graphs():
+    rewriter = HtmlRewriter(PAGE)
+    assert [payload for _token, payload in rewriter.ld_json] == [
+        {"@type": "FAQPage", "mainEntity": []},
+        {"@graph": [{"@type": "Service", "@id": "#service"}]},
+    ]
+    assert rewriter.has_linked_graph()
+    owned = rewriter.ld_json_blocks(("FAQPage", "Service"))
+    assert [payload["@type"] for _token, payload in owned] == ["FAQPage"]
+
+
+def test_script_blocks_end_at_their_own_close_tag():
+    content = '<script>a()</script><p>x</p><script type="module">b()</SCRIPT >'
+    blocks = list(iter_script_blocks(content))
+    assert [(block.attrs, block.body) for block in blocks] == [("", "a()"), (' type="module"', "b()")]
+    assert blocks[1].end == len(content)
+
+
+def test_find_ld_json_blocks_skips_foreign_and_linked_blocks():
+    content = (
+        "<head>\n"
+        '  <script type="application/ld+json">{"@type": "LocalBusiness"}</script>\n'
+        '  <script type="application/ld+json">[{"@type": "Service"}, {"@type": "Person"}]</script>\n'
+        '  <script type="application/ld+json">{"@graph": [{"@type": "Service", "@id": "#s"}]}</script>\n'
+        '  <script type="application/ld+json">{not json}</script>\n'
+        "</head>"
+    )
+    spans = find_ld_json_blocks(content, ("LocalBusiness", "Service"))
+    assert len(spans) == 1
+    remaining = remove_spans(content, spans)
+    assert "LocalBusiness" not in remaining
+    assert remaining.startswith('<head>\n  <script type="application/ld+json">[')
@@ -0,0 +1,59 @@
+import os
+
+from lastmod_store import LastmodStore
+from site_output import UNCHANGED
+
+DAY_1 = "2024-01-01T00:00:00+00:00"
+DAY_2 = "2024-02-01T00:00:00+00:00"
+DAY_3 = "2024-03-01T00:00:00+00:00"
+
+
+def store(tmp_path, now):
+    return LastmodStore.open(tmp_path / "lastmod.sqlite3", base=tmp_path, now=now)
+
+
+def test_unchanged_content_keeps_its_date(tmp_path):
+    page = tmp_path / "index.html"
+    page.write_bytes(b"<p>one</p>")
+    with store(tmp_path, DAY_1) as lastmod:
+        assert lastmod.observe(page, b"<p>one</p>").date == "2024-01-01"
+
+    # Rewritten with the same bytes, then touched: neither moves the date.
+    page.write_bytes(b"<p>one</p>")
+    with store(tmp_path, DAY_2) as lastmod:
+        assert lastmod.observe(page, b"<p>one</p>").changed_at == DAY_1
+    stat = page.stat()
+    os.utime(page, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    with store(tmp_path, DAY_2) as lastmod:
+        assert lastmod.refresh([page])[page].changed_at == DAY_1
+        assert lastmod.hashed == 1
+        assert lastmod.changed == 0
+
+
+def test_changed_content_takes_the_run_time(tmp_path):
+    page = tmp_path / "index.html"
+    page.write_bytes(b"<p>one</p>")
+    with store(tmp_path, DAY_1) as lastmod:
+        lastmod.observe(page, b"<p>one</p>")
+    page.write_bytes(b"<p>two</p>")
+    with store(tmp_path, DAY_3) as lastmod:
+        assert lastmod.refresh([page])[page].changed_at == DAY_3
+        assert lastmod.changed == 1
+
+
+def test_untouched_files_are_not_rehashed(tmp_path):
+    page = tmp_path / "index.html"
+    page.write_bytes(b"<p>one</p>")
+    with store(tmp_path, DAY_1) as lastmod:
+        lastmod.refresh([page])
+    with store(tmp_path, DAY_2) as lastmod:
+        assert lastmod.refresh([page])[page].changed_at == DAY_1
+        assert lastmod.hashed == 0
+
+
+def test_first_seen_unchanged_file_takes_the_seed(tmp_path):
+    page = tmp_path / "index.html"
+    page.write_bytes(b"<p>one</p>")
+    with store(tmp_path, DAY_2) as lastmod:
+        assert lastmod.observe(page, b"<p>one</p>", UNCHANGED).changed_at is None
+        assert lastmod.refresh([page], seeds={"index.html": "2023-12-24"})[page].date == "2023-12-24"
@@ -0,0 +1,64 @@
+import json
+import os
+
+from location_registry import LocationRegistry
+
+
+def write_locations(path, *cities):
+    entries = [
+        {"slug": city.lower(), "city": city, "state": "WA", "latitude": 47.6, "longitude": -122.2} for city in cities
+    ]
+    path.write_text(json.dumps(entries), encoding="utf-8")
+
+
+def registry(tmp_path):
+    return LocationRegistry(tmp_path / "locations.json", tmp_path, tmp_path / "locations.marshal").load()
+
+
+def test_second_load_reads_the_cache(tmp_path):
+    write_locations(tmp_path / "locations.json", "Bellevue")
+    (tmp_path / "bellevue").mkdir()
+    assert not registry(tmp_path).from_cache
+    cached = registry(tmp_path)
+    assert cached.from_cache
+    assert cached["bellevue"].city == "Bellevue"
+
+
+def test_new_mtime_invalidates_the_cache(tmp_path):
+    path = tmp_path / "locations.json"
+    write_locations(path, "Bellevue")
+    (tmp_path / "bellevue").mkdir()
+    registry(tmp_path)
+    stat = path.stat()
+    # Same size, different content and mtime.
+    path.write_text(path.read_text(encoding="utf-8").replace("Bellevue", "BELLEVUE"), encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    reloaded = registry(tmp_path)
+    assert not reloaded.from_cache
+    assert reloaded["bellevue"].city == "BELLEVUE"
+
+
+def test_new_size_invalidates_the_cache(tmp_path):
+    path = tmp_path / "locations.json"
+    write_locations(path, "Bellevue")
+    (tmp_path / "bellevue").mkdir()
+    (tmp_path / "redmond").mkdir()
+    registry(tmp_path)
+    stat = path.stat()
+    # Different size, mtime put back to what the cache recorded.
+    write_locations(path, "Bellevue", "Redmond")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    reloaded = registry(tmp_path)
+    assert not reloaded.from_cache
+    assert reloaded.slugs() == ["bellevue", "redmond"]
+
+
+def test_missing_directories_are_checked_on_every_load(tmp_path):
+    write_locations(tmp_path / "locations.json", "Bellevue", "Redmond")
+    (tmp_path / "bellevue").mkdir()
+    assert registry(tmp_path).skipped == ["redmond"]
+    (tmp_path / "redmond").mkdir()
+    cached = registry(tmp_path)
+    assert cached.from_cache
+    assert cached.skipped == []
+    assert "redmond" in cached
@@ -0,0 +1,22 @@
+from url_policy import compile_source, serving_rules, substitute
+
+
+def test_star_parameter_matches_bare_prefix():
+    pattern = compile_source("/2023/:path*")
+    assert pattern.match("/2023")
+    assert pattern.match("/2023/")
+    assert pattern.match("/2023/a/b")
+    assert not pattern.match("/20234")
+
+
+def test_named_parameters_fill_destination():
+    match = compile_source("/old/:slug/:rest*").match("/old/gutters/a/b")
+    assert substitute("/new/:slug/:rest*", match) == "/new/gutters/a/b"
+    match = compile_source("/old/:slug/:rest*").match("/old/gutters")
+    assert substitute("/new/:slug/:rest*", match) == "/new/gutters"
+
+
+def test_redirect_table_uses_named_parameters():
+    rules = serving_rules({"redirects": [{"source": "/2023/:path*", "destination": "/blog/:path*"}]})
+    assert rules.redirect("/2023") == "/blog"
+    assert rules.redirect("/2023/spring/post") == "/blog/spring/post"
@@ -0,0 +1,295 @@
+"""
+How generated pages load third-party tags (analytics, pixels, chat, session replay).
+
+Each vendor is split into a tiny inline stub, which defines its command queue
+(dataLayer/gtag, fbq, _uxa) so that calls made before the script arrives are
+replayed, and the vendor's own script. POLICY decides when that script is
+fetched:
+
+- "eager": a script tag in <head>, as the vendor's snippet has it;
+- "idle": once the page has loaded and the browser is idle (or the visitor
+  interacts first);
+- "interaction": on the first pointerdown, keydown, touchstart or scroll.
+
+With CONSOLIDATE, every deferred vendor on a page is loaded by one inline
+loader with one set of listeners; otherwise each gets its own loader. The
+generators put render_tags() in each page's <head>, so changing the policy
+here rebuilds every page that uses it.
+
+write_report() compares each generated page's render-blocking <head> cost
+with and without the policy (the same page with every vendor eager):
+blocking bytes are inline script and style plus local stylesheets and
+synchronous scripts, blocking requests are synchronous scripts and
+stylesheets, and early requests are the async scripts and preloads fetched
+during page load.
+"""
+import functools
+import json
+import re
+from pathlib import Path
+from typing import Iterable, NamedTuple
+from urllib.parse import urlsplit
+
+from build_manifest import BUILD_DIR
+from build_profile import profiled
+from site_output import write_text_if_changed
+from url_policy import ROOT, SITE_HOST
+
+EAGER = "eager"
+IDLE = "idle"
+INTERACTION = "interaction"
+STRATEGIES = (EAGER, IDLE, INTERACTION)
+REPORT_PATH = BUILD_DIR / "tag-report.json"
+# requestIdleCallback timeout, so idle tags still load on a page that never goes idle.
+IDLE_TIMEOUT_MS = 4000
+
+
+class VendorTag(NamedTuple):
+    src: str
+    # Inline setup run in <head> before the script loads; defines the vendor's queue.
+    stub: str = ""
+    # Attributes of the eager <script> tag, as in the vendor's own snippet.
+    eager_attrs: str = " async"
+    # Element id some loaders look for to avoid loading twice.
+    element_id: str = ""
+    noscript: str = ""
+
+
+VENDORS = {
+    "gtag": VendorTag(
+        "https://www.googletagmanager.com/gtag/js?id=G-P1VX9FY873",
+        stub=(
+            "window.dataLayer=window.dataLayer||[];function gtag(){dataLayer.push(arguments);}"
+            "gtag('js',new Date());gtag('config','AW-11395982028');gtag('config','G-P1VX9FY873');"
+        ),
+    ),
+    "meta-pixel": VendorTag(
+        "https://connect.facebook.net/en_US/fbevents.js",
+        # Meta's snippet without the part that inserts fbevents.js; the script drains fbq.queue on load.
+        stub=(
+            "!function(f){if(f.fbq)return;var n=f.fbq=function(){n.callMethod?"
+            "n.callMethod.apply(n,arguments):n.queue.push(arguments)};if(!f._fbq)f._fbq=n;"
+            "n.push=n;n.loaded=!0;n.version='2.0';n.queue=[]}(window);"
+            "fbq('init','841512635074584');fbq('track','PageView');"
+        ),
+        noscript=(
+            '<noscript><img height="1" width="1" style="display:none" '
+            'src="https://www.facebook.com/tr?id=841512635074584&ev=PageView&noscript=1" /></noscript>'
+        ),
+    ),
+    "hubspot": VendorTag(
+        "https://js-na2.hs-scripts.com/244291121.js",
+        eager_attrs=' type="text/javascript" async defer',
+        element_id="hs-script-loader",
+    ),
+    "contentsquare": VendorTag(
+        "https://t.contentsquare.net/uxa/a349e14090bcc.js",
+        stub="window._uxa=window._uxa||[];",
+        eager_attrs="",
+    ),
+}
+
+# When each vendor's script is fetched. Analytics and the pixel wait for idle
+# so bounced visits are still counted; the chat widget waits for the visitor.
+POLICY = {
+    "gtag": IDLE,
+    "meta-pixel": IDLE,
+    "hubspot": INTERACTION,
+    "contentsquare": IDLE,
+}
+CONSOLIDATE = True
+
+# Loads the queued scripts: "idle" ones once the page is idle, all of them on
+# the first interaction. Filled in with the tag list and IDLE_TIMEOUT_MS.
+LOADER_JS = (
+    "(function(w,d){var tags=%s,events=['pointerdown','keydown','touchstart','scroll'];"
+    "function load(idle){tags.forEach(function(t){if(t.done||(idle&&t.on!=='idle'))return;t.done=1;"
+    "var s=d.createElement('script');s.async=true;s.src=t.src;if(t.id)s.id=t.id;d.head.appendChild(s);});}"
+    "function interact(){events.forEach(function(e){w.removeEventListener(e,interact,true);});load(false);}"
+    "events.forEach(function(e){w.addEventListener(e,interact,{capture:true,passive:true});});"
+    "w.addEventListener('load',function(){(w.requestIdleCallback||function(f){return setTimeout(f,1);})"
+    "(function(){load(true);},{timeout:%d});});})(window,document);"
+)
+
+HEAD_END_PATTERN = re.compile(r"</head\s*>", re.IGNORECASE)
+COMMENT_PATTERN = re.compile(r"<!--.*?-->", re.DOTALL)
+SCRIPT_PATTERN = re.compile(r"<script\b([^>]*)>(.*?)</script\s*>", re.IGNORECASE | re.DOTALL)
+STYLE_PATTERN = re.compile(r"<style\b[^>]*>(.*?)</style\s*>", re.IGNORECASE | re.DOTALL)
+NOSCRIPT_PATTERN = re.compile(r"<noscript\b.*?</noscript\s*>", re.IGNORECASE | re.DOTALL)
+LINK_PATTERN = re.compile(r"<link\b([^>]*)>", re.IGNORECASE)
+ATTR_PATTERN = re.compile(r"""([a-zA-Z:-]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+)))?""")
+JAVASCRIPT_TYPES = ("", "text/javascript", "application/javascript", "module")
+
+
+class HeadCost(NamedTuple):
+    blocking_bytes: int
+    blocking_requests: tuple[str, ...]
+    early_requests: tuple[str, ...]
+
+    def as_dict(self) -> dict:
+        return {
+            "blocking_bytes": self.blocking_bytes,
+            "blocking_requests": list(self.blocking_requests),
+            "early_requests": list(self.early_requests),
+        }
+
+
+def _script(attrs: str, body: str = "") -> str:
+    return f"<script{attrs}>{body}</script>"
+
+
+@functools.lru_cache(maxsize=None)
+def _render(names: tuple[str, ...], strategies: tuple[str, ...], consolidate: bool, indent: str) -> str:
+    vendors = [VENDORS[name] for name in names]
+    lines = []
+    stubs = "".join(vendor.stub for vendor in vendors)
+    if stubs:
+        lines.append(_script("", stubs))
+    deferred = []
+    for vendor, strategy in zip(vendors, strategies):
+        if strategy == EAGER:
+            element_id = f' id="{vendor.element_id}"' if vendor.element_id else ""
+            lines.append(_script(f'{vendor.eager_attrs}{element_id} src="{vendor.src}"'))
+            continue
+        tag = {"src": vendor.src, "on": strategy}
+        if vendor.element_id:
+            tag["id"] = vendor.element_id
+        deferred.append(tag)
+    groups = [deferred] if consolidate else [[tag] for tag in deferred]
+    for group in groups:
+        if group:
+            lines.append(_script("", LOADER_JS % (json.dumps(group, separators=(",", ":")), IDLE_TIMEOUT_MS)))
+    lines.extend(vendor.noscript for vendor in vendors if vendor.noscript)
+    return ("\n" + indent).join(lines)
+
+
+def render_tags(
+    names: Iterable[str],
+    policy: dict[str, str] | None = None,
+    consolidate: bool | None = None,
+    indent: str = "",
+) -> str:
+    """<head> markup that loads the named vendors under policy (default POLICY).
+
+    Continuation lines are prefixed with indent; the first line is not.
+    """
+    names = tuple(names)
+    policy = POLICY if policy is None else policy
+    strategies = tuple(policy.get(name, EAGER) for name in names)
+    for name, strategy in zip(names, strategies):
+        if name not in VENDORS or strategy not in STRATEGIES:
+            raise ValueError(f"unknown tag {name!r} or strategy {strategy!r}")
+    return _render(names, strategies, CONSOLIDATE if consolidate is None else consolidate, indent)
+
+
+def _attrs(text: str) -> dict[str, str]:
+    attrs = {}
+    for match in ATTR_PATTERN.finditer(text):
+        value = next((group for group in match.groups()[1:] if group is not None), "")
+        attrs[match.group(1).lower()] = value
+    return attrs
+
+
+@functools.lru_cache(maxsize=None)
+def _local_size(path: Path) -> int:
+    try:
+        return path.stat().st_size
+    except OSError:
+        return 0
+
+
+def _local_path(url: str, page: Path) -> Path | None:
+    """The file a same-site URL refers to, or None for other hosts."""
+    parts = urlsplit(url)
+    if parts.scheme and parts.scheme not in ("http", "https"):
+        return None
+    if parts.netloc:
+        return ROOT / parts.path.lstrip("/") if parts.netloc.lower() == SITE_HOST else None
+    if parts.path.startswith("/"):
+        return ROOT / parts.path.lstrip("/")
+    return page.parent / parts.path
+
+
+@profiled("regex")
+def measure_head(content: str, page: Path) -> HeadCost:
+    """The render-blocking cost of a page's <head>."""
+    end = HEAD_END_PATTERN.search(content)
+    head = COMMENT_PATTERN.sub("", content[: end.start()] if end else content)
+    # With scripting on, <noscript> fallbacks are never fetched.
+    head = NOSCRIPT_PATTERN.sub("", head)
+    blocking_bytes = sum(len(match.group(1).encode("utf-8")) for match in STYLE_PATTERN.finditer(head))
+    blocking: list[str] = []
+    early: list[str] = []
+    for match in SCRIPT_PATTERN.finditer(head):
+        attrs = _attrs(match.group(1))
+        if attrs.get("type", "").lower() not in JAVASCRIPT_TYPES:
+            continue
+        src = attrs.get("src")
+        if src is None:
+            blocking_bytes += len(match.group(2).encode("utf-8"))
+        elif "async" in attrs or "defer" in attrs or attrs.get("type") == "module":
+            early.append(src)
+        else:
+            blocking.append(src)
+            local = _local_path(src, page)
+            blocking_bytes += _local_size(local) if local else 0
+    for match in LINK_PATTERN.finditer(head):
+        attrs = _attrs(match.group(1))
+        rel = attrs.get("rel", "").lower().split()
+        href = attrs.get("href")
+        if href is None:
+            continue
+        if "stylesheet" in rel and attrs.get("media", "all") != "print" and "disabled" not in attrs:
+            blocking.append(href)
+            local = _local_path(href, page)
+            blocking_bytes += _local_size(local) if local else 0
+        elif "preload" in rel or "modulepreload" in rel:
+            early.append(href)
+    return HeadCost(blocking_bytes, tuple(blocking), tuple(early))
+
+
+def page_costs(path: Path, names: tuple[str, ...], indent: str = "") -> tuple[HeadCost, HeadCost] | None:
+    """(before, after) head cost of a generated page; before has every vendor eager."""
+    try:
+        content = path.read_text(encoding="utf-8")
+    except OSError:
+        return None
+    # A page not yet rebuilt under the policy has nothing to swap: before and after match.
+    before = content.replace(
+        render_tags(names, indent=indent), render_tags(names, {name: EAGER for name in names}, indent=indent), 1
+    )
+    return measure_head(before, path), measure_head(content, path)
+
+
+def _third_party(urls: Iterable[str]) -> int:
+    return sum(1 for url in urls if urlsplit(url).netloc.lower() not in ("", SITE_HOST))
+
+
+def write_report(families: Iterable[tuple[Iterable[Path], tuple[str, ...], str]], path: Path = REPORT_PATH) -> dict:
+    """Write per-page before/after head costs; families are (pages, vendor names, indent)."""
+    pages: dict[str, dict] = {}
+    totals = {
+        "blocking_bytes": [0, 0],
+        "blocking_requests": [0, 0],
+        "early_third_party_requests": [0, 0],
+    }
+    for page_paths, names, indent in families:
+        for page in page_paths:
+            costs = page_costs(page, names, indent)
+            if costs is None:
+                continue
+            for column, cost in enumerate(costs):
+                totals["blocking_bytes"][column] += cost.blocking_bytes
+                totals["blocking_requests"][column] += len(cost.blocking_requests)
+                totals["early_third_party_requests"][column] += _third_party(cost.early_requests)
+            pages["/" + page.relative_to(ROOT).as_posix()] = {
+                "before": costs[0].as_dict(),
+                "after": costs[1].as_dict(),
+            }
+    summary = {
+        "pages": len(pages),
+        **{name: {"before": before, "after": after} for name, (before, after) in totals.items()},
+    }
+    report = {"policy": POLICY, "consolidate": CONSOLIDATE, "summary": summary, "pages": pages}
+    write_text_if_changed(path, json.dumps(report, indent=2) + "\n")
+    return summary
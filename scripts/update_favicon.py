@@ -1,9 +1,17 @@
-import os
+import argparse
 import re
+from pathlib import Path
+
+from build_profile import add_profile_arguments, profiled, profiling
+from document_store import Document
+from file_index import ROOT, FileIndex, iter_files
+from lastmod_store import LastmodStore
+from site_output import FAILED, write_bytes_if_changed
 
 # --- Configuration ---
-# The script will start searching from the directory where it is executed (your repo root).
-ROOT_DIR = "." 
+# The script searches the whole repository, skipping the heavy directories
+# listed in file_index.PRUNED_DIRS (images, photo drops, node_modules).
+ROOT_DIR = ROOT
 FAVICON_BASE_PATH = "/assets/images"
 
 # HTML content to insert for dynamic favicons
@@ -28,78 +36,112 @@ HEAD_CLOSING_TAG_PATTERN = re.compile(r'(\s*)</head>', re.IGNORECASE)
 
 # --- Script Logic ---
 
-def update_html_file(filepath):
-    """Reads, cleans, updates, and writes the HTML file."""
+@profiled("regex")
+def rewrite_favicons(content):
+    """Returns content with the dynamic favicon links, or None if nothing changes."""
+    # Check if the dynamic favicon links are already present to prevent re-running
+    if 'media="(prefers-color-scheme: dark)"' in content and 'media="(prefers-color-scheme: light)"' in content:
+        return None
+
+    # 1. Find and remove any existing favicon links
+    content_after_cleanup = EXISTING_FAVICON_PATTERN.sub('', content)
+
+    # 2. Find the closing </head> tag in the cleaned content
+    match = HEAD_CLOSING_TAG_PATTERN.search(content_after_cleanup)
+    if not match:
+        return None
+
+    # Preserve the original indentation of </head> for consistency
+    indentation = match.group(1)
+
+    # Format the new links to respect the file's indentation
+    new_favicon_content = NEW_FAVICON_LINKS.replace('\n', '\n' + indentation)
+
+    # The full replacement string: [new links] + [preserved indentation] + </head>
+    return HEAD_CLOSING_TAG_PATTERN.sub(
+        new_favicon_content + '\n' + indentation + '</head>',
+        content_after_cleanup,
+        1
+    )
+
+
+def update_html_file(filepath, head_only=True, lastmod=None):
+    """Reads, cleans, updates, and writes the HTML file.
+
+    With head_only, only the <head> is decoded and inspected; links that
+    appear after </head> are left alone. Returns True if the file was
+    rewritten, False if it needed no change and None if it could not be
+    processed. Writes are recorded in lastmod when one is given.
+    """
     try:
-        # Read the file content
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # Check if the dynamic favicon links are already present to prevent re-running
-        if 'media="(prefers-color-scheme: dark)"' in content and 'media="(prefers-color-scheme: light)"' in content:
-            return False
-
-        # 1. Find and remove any existing favicon links
-        content_after_cleanup = EXISTING_FAVICON_PATTERN.sub('', content)
-        
-        # 2. Find the closing </head> tag in the cleaned content
-        match = HEAD_CLOSING_TAG_PATTERN.search(content_after_cleanup)
-
-        if match:
-            # Preserve the original indentation of </head> for consistency
-            indentation = match.group(1)
-            
-            # Format the new links to respect the file's indentation
-            new_favicon_content = NEW_FAVICON_LINKS.replace('\n', '\n' + indentation)
-            
-            # The full replacement string: [new links] + [preserved indentation] + </head>
-            new_content = HEAD_CLOSING_TAG_PATTERN.sub(
-                new_favicon_content + '\n' + indentation + '</head>', 
-                content_after_cleanup, 
-                1
-            )
-            
-            # Write the updated content back
-            with open(filepath, 'w', encoding='utf-8') as f:
-                f.write(new_content)
-            print(f"Updated: {filepath}")
-            return True
+        document = Document.open(Path(filepath))
+        if head_only:
+            # Only <head> has been read; the body bytes are spliced back untouched.
+            new_head = rewrite_favicons(document.head)
+            if new_head is None or not document.set_head(new_head):
+                return False
         else:
-            return False
+            new_content = rewrite_favicons(document.text)
+            if new_content is None or not document.set_text(new_content):
+                return False
+
+        data = document.to_bytes()
+        status = write_bytes_if_changed(document.path, data)
+        if lastmod is not None:
+            lastmod.observe(document.path, data, status)
+        if status == FAILED:
+            return None
+        print(f"Updated: {filepath}")
+        return True
 
     except Exception as e:
+        # None (rather than False) keeps the file out of the index so it is retried.
         print(f"Error processing {filepath}: {e}")
-        return False
+        return None
 
 
-def run_update_script():
-    """Traverses the directory and updates all HTML files."""
+def run_update_script(force=False, head_only=True):
+    """Updates every new or changed HTML file under ROOT_DIR."""
     updated_count = 0
     skipped_count = 0
-    
+    index = FileIndex.load("favicon")
+
     print("Starting favicon update script...")
-    
-    for dirpath, dirnames, filenames in os.walk(ROOT_DIR):
-        # Skip hidden directories and GitHub workflow directory
-        dirnames[:] = [d for d in dirnames if not d.startswith('.') and d != '.github']
-        
-        for filename in filenames:
-            if filename.endswith(('.html', '.htm')):
-                full_path = os.path.join(dirpath, filename)
-
-                # Skip files containing unusual characters that are likely temporary backups
-                if '：' in full_path:
-                    continue
-
-                if update_html_file(full_path):
-                    updated_count += 1
-                else:
-                    skipped_count += 1
-                    
+
+    with LastmodStore.open() as lastmod:
+        for full_path in iter_files([ROOT_DIR]):
+            # Skip files containing unusual characters that are likely temporary backups
+            if '：' in str(full_path):
+                continue
+
+            if not force and index.is_current(full_path):
+                continue
+
+            result = update_html_file(full_path, head_only=head_only, lastmod=lastmod)
+            if result:
+                updated_count += 1
+            else:
+                skipped_count += 1
+            if result is not None:
+                index.record(full_path)
+
+    index.save()
+
     print("\n--- Summary ---")
     print(f"Files updated: {updated_count}")
     print(f"Files skipped (already done or no </head>): {skipped_count}")
+    print(f"Files unchanged since last run (not opened): {index.current}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Insert light/dark favicon links into every HTML page.")
+    parser.add_argument("--force", action="store_true", help="Open every HTML file, ignoring the cached file index.")
+    parser.add_argument("--full-read", action="store_true", help="Decode and scan whole files instead of only <head>.")
+    add_profile_arguments(parser)
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    run_update_script()
+    args = parse_args()
+    with profiling(args, "update_favicon"):
+        run_update_script(force=args.force, head_only=not args.full_read)
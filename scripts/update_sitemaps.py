@@ -0,0 +1,270 @@
+"""
+Generate the sitemaps for generated pages and rebuild the sitemap index.
+
+URL entries are produced lazily from the same sources the generators use (the
+city list and service configs, the problem cluster) and streamed straight into
+sitemap files, so the full URL set is never held in memory as XML. Each set is
+split into shards of at most 50,000 URLs: sitemap-<set>.xml, then
+sitemap-<set>-2.xml and so on. The sitemap index lists the hand-maintained
+sitemaps followed by every generated shard. Every <loc> is written in the
+served form from url_policy, so crawlers never hit a redirect.
+
+<lastmod> is the date a page's content last changed, from the shared
+LastmodStore. Pages the store has not dated yet keep the date they already
+had in the current sitemaps.
+
+    python scripts/update_sitemaps.py
+"""
+import argparse
+import json
+import re
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple
+from xml.sax.saxutils import escape
+
+import generate_city_service_pages as city_pages
+import generate_problem_cluster as problem_cluster
+from build_profile import add_profile_arguments, profiled, profiling
+from lastmod_store import LastmodStore
+from location_registry import LOCATIONS, LocationDataError
+from site_output import FAILED, AtomicStream, OutputStats, write_text_if_changed
+from url_policy import SITE_URL, canonical_url, normalize_url
+
+ROOT = Path(__file__).resolve().parents[1]
+SITEMAP_INDEX_PATH = ROOT / "sitemap.xml"
+# Maintained by hand; listed in the index ahead of the generated shards.
+STATIC_SITEMAPS = ("sitemap-main.xml", "sitemap-blog.xml")
+# Entries dated per LastmodStore.refresh() call.
+LASTMOD_BATCH = 1000
+# Protocol limits: 50,000 URLs and 50 MB uncompressed per sitemap file.
+MAX_URLS_PER_SHARD = 50_000
+MAX_BYTES_PER_SHARD = 50 * 1024 * 1024
+
+URLSET_OPEN = (
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+)
+URLSET_CLOSE = b"</urlset>\n"
+URL_ENTRY_PATTERN = re.compile(r"<loc>([^<]*)</loc>\s*<lastmod>([^<]*)</lastmod>")
+
+
+class SitemapEntry(NamedTuple):
+    loc: str
+    path: Path
+
+
+def _html_entries(directory: Path) -> Iterator[SitemapEntry]:
+    for path in sorted(directory.glob("*.html")):
+        yield SitemapEntry(canonical_url(f"/{path.relative_to(ROOT).as_posix()}"), path)
+
+
+@profiled("discovery")
+def location_entries() -> Iterator[SitemapEntry]:
+    yield from _html_entries(ROOT / "holiday-lighting")
+    cities, _dropped = city_pages.discover_cities()
+    # Order by URL so "issaquah-..." sorts before "issaquah/", as the sitemap always has.
+    for city_slug, _city_name in sorted(cities, key=lambda city: city[0] + "/"):
+        yield SitemapEntry(canonical_url(f"/pages/{city_slug}"), city_pages.PAGES_DIR / city_slug / "index.html")
+        for service_slug in sorted(city_pages.SERVICE_CONFIGS):
+            yield SitemapEntry(
+                canonical_url(f"/pages/{city_slug}/{service_slug}"),
+                city_pages.page_path(city_slug, service_slug),
+            )
+    yield from _html_entries(ROOT / "service-areas")
+
+
+@profiled("discovery")
+def problem_entries() -> Iterator[SitemapEntry]:
+    yield SitemapEntry(problem_cluster.PILLAR_URL, problem_cluster.PROBLEMS_DIR / "index.html")
+    for page in problem_cluster.iter_catalog():
+        yield SitemapEntry(
+            canonical_url(f"/problems/gutters/{page['slug']}"),
+            problem_cluster.PROBLEMS_DIR / page["slug"] / "index.html",
+        )
+        # Matrix pages are listed once generated; --max-pages may leave some for a later run.
+        for location in problem_cluster.matrix_locations(page):
+            path = problem_cluster.matrix_page_path(page, location)
+            if path.exists():
+                yield SitemapEntry(canonical_url(f"/problems/gutters/{page['slug']}/{location.slug}"), path)
+
+
+SITEMAP_SETS: dict[str, Callable[[], Iterator[SitemapEntry]]] = {
+    "locations": location_entries,
+    "problems": problem_entries,
+}
+
+
+def today() -> str:
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+@profiled("read")
+def read_sitemap_dates(paths: Iterable[Path]) -> dict[str, str]:
+    """Map each <loc> (in served form, so older trailing-slash URLs still match) to its <lastmod>."""
+    dates: dict[str, str] = {}
+    for path in paths:
+        try:
+            text = path.read_text(encoding="utf-8")
+        except OSError:
+            continue
+        for loc, lastmod in URL_ENTRY_PATTERN.findall(text):
+            dates[normalize_url(loc)] = lastmod
+    return dates
+
+
+class ShardedSitemapWriter:
+    """Streams <url> entries into sitemap-<name>.xml, opening a new shard at the size limits."""
+
+    def __init__(self, name: str, stats: OutputStats) -> None:
+        self.name = name
+        self.stats = stats
+        self.shards: list[tuple[str, str]] = []
+        self._number = 0
+        self._stream: AtomicStream | None = None
+        self._urls = 0
+        self._latest = ""
+
+    def _shard_name(self, number: int) -> str:
+        return f"sitemap-{self.name}.xml" if number == 1 else f"sitemap-{self.name}-{number}.xml"
+
+    def _open(self) -> None:
+        self._number += 1
+        self._stream = AtomicStream(ROOT / self._shard_name(self._number))
+        self._stream.write(URLSET_OPEN)
+        self._urls = 0
+        self._latest = ""
+
+    def _close(self) -> None:
+        if self._stream is None:
+            return
+        self._stream.write(URLSET_CLOSE)
+        filename = self._stream.path.name
+        if self._stream.commit(self.stats) != FAILED:
+            self.shards.append((filename, self._latest))
+        self._stream = None
+
+    def add(self, loc: str, lastmod: str) -> None:
+        entry = (
+            f"  <url>\n    <loc>{escape(loc)}</loc>\n    <lastmod>{lastmod}</lastmod>\n  </url>\n"
+        ).encode("utf-8")
+        if self._stream is not None and (
+            self._urls >= MAX_URLS_PER_SHARD
+            or self._stream.bytes_written + len(entry) + len(URLSET_CLOSE) > MAX_BYTES_PER_SHARD
+        ):
+            self._close()
+        if self._stream is None:
+            self._open()
+        self._stream.write(entry)
+        self._urls += 1
+        self._latest = max(self._latest, lastmod)
+
+    def close(self) -> list[tuple[str, str]]:
+        self._close()
+        self._remove_stale_shards()
+        return self.shards
+
+    def abort(self) -> None:
+        if self._stream is not None:
+            self._stream.abort()
+            self._stream = None
+
+    def _remove_stale_shards(self) -> None:
+        current = {filename for filename, _ in self.shards}
+        for path in ROOT.glob(f"sitemap-{self.name}-*.xml"):
+            if path.name not in current and re.fullmatch(rf"sitemap-{re.escape(self.name)}-\d+\.xml", path.name):
+                path.unlink()
+
+
+@profiled("write")
+def write_sitemap_set(
+    name: str,
+    entries: Iterable[SitemapEntry],
+    store: LastmodStore,
+    seeds: dict[str, str],
+    stats: OutputStats,
+) -> tuple[list[tuple[str, str]], int]:
+    writer = ShardedSitemapWriter(name, stats)
+    count = 0
+    fallback = today()
+    entries = iter(entries)
+    try:
+        while batch := list(islice(entries, LASTMOD_BATCH)):
+            batch_seeds = {store.key(entry.path): seeds[entry.loc] for entry in batch if entry.loc in seeds}
+            records = store.refresh([entry.path for entry in batch], batch_seeds)
+            for entry in batch:
+                record = records.get(entry.path)
+                # A page missing on disk keeps whatever date it was already published with.
+                lastmod = record.date if record is not None else None
+                writer.add(entry.loc, lastmod or seeds.get(entry.loc, fallback))
+                count += 1
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close(), count
+
+
+def write_sitemap_index(shards: list[tuple[str, str]], stats: OutputStats) -> str:
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for filename, lastmod in shards:
+        lines.append("  <sitemap>")
+        lines.append(f"    <loc>{SITE_URL}/{filename}</loc>")
+        if lastmod:
+            lines.append(f"    <lastmod>{lastmod}</lastmod>")
+        lines.append("  </sitemap>")
+    lines.append("</sitemapindex>")
+    return write_text_if_changed(SITEMAP_INDEX_PATH, "\n".join(lines) + "\n", stats)
+
+
+def build_sitemaps(store: LastmodStore, stats: OutputStats | None = None) -> dict:
+    """Write every generated sitemap set and the index, dating pages from store."""
+    stats = stats or OutputStats()
+    generated = [ROOT / f"sitemap-{name}.xml" for name in SITEMAP_SETS]
+    seeds = read_sitemap_dates([*(ROOT / name for name in STATIC_SITEMAPS), *generated])
+    changed_before = store.changed
+
+    index_entries = [
+        (name, max(read_sitemap_dates([ROOT / name]).values(), default=""))
+        for name in STATIC_SITEMAPS
+        if (ROOT / name).exists()
+    ]
+    urls: dict[str, int] = {}
+    for name, entries in SITEMAP_SETS.items():
+        shards, urls[name] = write_sitemap_set(name, entries(), store, seeds, stats)
+        index_entries.extend(shards)
+    write_sitemap_index(index_entries, stats)
+    return {
+        "urls": urls,
+        "sitemaps": [filename for filename, _ in index_entries],
+        "lastmod_changed": store.changed - changed_before,
+        **stats.summary(),
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Write the generated sitemaps and the sitemap index.")
+    add_profile_arguments(parser)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    with profiling(args, "update_sitemaps"):
+        try:
+            LOCATIONS.load()
+        except LocationDataError as exc:
+            raise SystemExit(str(exc)) from exc
+        with LastmodStore.open() as store:
+            try:
+                summary = build_sitemaps(store)
+            except problem_cluster.CatalogError as exc:
+                raise SystemExit(f"Problem catalog error: {exc}") from exc
+            print(json.dumps({**summary, "pages_hashed": store.hashed}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+How site URLs are written.
+
+vercel.json serves pages with cleanUrls and trailingSlash: false, so a
+request for /about.html, /pages/bellevue/ or /pages/bellevue/index.html is
+answered with a 308 to /about or /pages/bellevue. Generators build every
+canonical, og:url, sitemap <loc> and internal link with site_path() or
+canonical_url(), so each URL is already in its served form and costs no
+redirect hop. check_links.py flags any URL in the built site that would
+still redirect.
+
+The rules are read from vercel.json once, at import.
+"""
+import json
+import re
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urlsplit, urlunsplit
+
+ROOT = Path(__file__).resolve().parents[1]
+SITE_URL = "https://ospreyexterior.com"
+SITE_HOST = urlsplit(SITE_URL).netloc
+VERCEL_CONFIG_PATH = ROOT / "vercel.json"
+# ":name", ":name*", ":name(regex)" parameters and "(regex)" groups in a vercel.json source.
+PATTERN_SOURCE = re.compile(r":(\w+)(?:\(((?:[^()]|\([^()]*\))*)\))?([*+?])?|\(((?:[^()]|\([^()]*\))*)\)")
+# Parameter references in a destination, with the "/" that goes away when an optional one is empty.
+DESTINATION_PARAMETER = re.compile(r"(/?):(\w+)([*+?])?")
+DESTINATION_GROUP = re.compile(r"\$(\d+)")
+# One path segment, as path-to-regexp matches it.
+SEGMENT = r"[^/#?]+?"
+QUERY_OR_FRAGMENT = re.compile(r"[?#]")
+
+
+class Redirect(NamedTuple):
+    pattern: re.Pattern
+    destination: str
+    # Index of the rule in vercel.json; the first matching rule wins.
+    position: int
+
+
+class ServingRules(NamedTuple):
+    clean_urls: bool
+    trailing_slash: bool | None
+    # Literal sources are looked up directly as (position, destination); only
+    # pattern sources are matched one by one.
+    exact_redirects: dict[str, tuple[int, str]]
+    redirects: tuple[Redirect, ...]
+
+    def redirect(self, path: str) -> str | None:
+        """Where the redirect table sends path, or None if no rule matches."""
+        exact = self.exact_redirects.get(path)
+        for redirect in self.redirects:
+            if exact is not None and redirect.position > exact[0]:
+                break
+            match = redirect.pattern.match(path)
+            if match:
+                return substitute(redirect.destination, match)
+        return exact[1] if exact is not None else None
+
+    def next_hop(self, path: str) -> str | None:
+        """Where the host redirects path, or None if it answers it directly.
+
+        As on Vercel, the cleanUrls and trailingSlash redirects come before the
+        redirect table, so a rule for "/about/" or "/about.html" never fires.
+        """
+        served = site_path(path, self)
+        if served != path:
+            return served
+        return self.redirect(path)
+
+
+def compile_source(source: str) -> re.Pattern:
+    """Turn a vercel.json source into a regex, with path-to-regexp's semantics.
+
+    A parameter directly after "/" takes that "/" with it: "/2023/:path*"
+    matches "/2023" as well as "/2023/a/b", and ":name?" may be left out
+    entirely. ":name" and ":name?" match one segment, ":name*" and ":name+"
+    any number of segments. Parameters become named groups; "(regex)" groups
+    are numbered, and $1, $2... count every group in order.
+    """
+    parts = []
+    position = 0
+    for match in PATTERN_SOURCE.finditer(source):
+        literal = source[position:match.start()]
+        name, custom, modifier, group = match.groups()
+        if name is None:
+            parts.append(re.escape(literal) + f"({group})")
+            position = match.end()
+            continue
+        prefix = ""
+        if literal.endswith(("/", ".")):
+            literal, prefix = literal[:-1], re.escape(literal[-1])
+        parts.append(re.escape(literal))
+        segment = f"(?:{custom})" if custom is not None else SEGMENT
+        if modifier in ("*", "+"):
+            body = f"{prefix}(?P<{name}>{segment}(?:{prefix}{segment})*)"
+        else:
+            body = f"{prefix}(?P<{name}>{segment})"
+        parts.append(f"(?:{body})?" if modifier in ("*", "?") else body)
+        position = match.end()
+    parts.append(re.escape(source[position:]))
+    # path-to-regexp's default (non-strict) mode also accepts a trailing "/".
+    return re.compile("".join(parts) + r"/?\Z")
+
+
+def substitute(destination: str, match: re.Match) -> str:
+    """Fill a destination's ":name" and "$N" references from a matched source."""
+    values = match.groupdict()
+
+    def parameter(reference: re.Match) -> str:
+        prefix, name, modifier = reference.groups()
+        if name not in values:
+            return reference.group(0)
+        value = values[name]
+        if value:
+            return prefix + value
+        return "" if modifier in ("*", "?") else prefix
+
+    def group(reference: re.Match) -> str:
+        number = int(reference.group(1))
+        if not 0 < number <= len(match.groups()):
+            return reference.group(0)
+        return match.group(number) or ""
+
+    return DESTINATION_GROUP.sub(group, DESTINATION_PARAMETER.sub(parameter, destination))
+
+
+def serving_rules(config: dict) -> ServingRules:
+    """The serving rules of a parsed vercel.json; conditional (has/missing) redirects are left out."""
+    exact: dict[str, tuple[int, str]] = {}
+    patterns: list[Redirect] = []
+    for position, rule in enumerate(config.get("redirects", [])):
+        if rule.get("has") or rule.get("missing"):
+            continue
+        if PATTERN_SOURCE.search(rule["source"]):
+            patterns.append(Redirect(compile_source(rule["source"]), rule["destination"], position))
+        else:
+            exact.setdefault(rule["source"], (position, rule["destination"]))
+    return ServingRules(bool(config.get("cleanUrls")), config.get("trailingSlash"), exact, tuple(patterns))
+
+
+def load_serving_rules(path: Path = VERCEL_CONFIG_PATH) -> ServingRules:
+    try:
+        config = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        config = {}
+    return serving_rules(config)
+
+
+RULES = load_serving_rules()
+# The settings that decide how URLs are written; generators version their output on these.
+URL_FORM = (RULES.clean_urls, RULES.trailing_slash)
+
+
+def site_path(path: str, rules: ServingRules = RULES) -> str:
+    """The served form of a root-relative path or file path; any query or fragment is kept.
+
+    Under cleanUrls, "/blog/post.html" becomes "/blog/post" and
+    "/pages/bellevue/index.html" becomes "/pages/bellevue"; with trailingSlash
+    false, "/pages/bellevue/" becomes "/pages/bellevue". The root stays "/".
+    These are the redirects Vercel itself applies, ahead of the redirect table.
+    """
+    match = QUERY_OR_FRAGMENT.search(path)
+    path, rest = (path[:match.start()], path[match.start():]) if match else (path, "")
+    if rules.clean_urls:
+        if path.endswith(("/index.html", "/index")):
+            path = path[: path.rindex("/") + 1]
+        elif path.endswith(".html"):
+            path = path[: -len(".html")]
+    if rules.trailing_slash is False:
+        path = path.rstrip("/") or "/"
+    elif rules.trailing_slash and not path.endswith("/") and "." not in path.rsplit("/", 1)[-1]:
+        path += "/"
+    return path + rest
+
+
+def canonical_url(path: str, rules: ServingRules = RULES) -> str:
+    """Absolute URL for a root-relative path, in its served form."""
+    return SITE_URL + site_path(path, rules)
+
+
+def normalize_url(url: str, rules: ServingRules = RULES) -> str:
+    """Put a root-relative or absolute URL on this site into its served form; other URLs pass through."""
+    parts = urlsplit(url)
+    if parts.netloc:
+        if parts.netloc.lower() != SITE_HOST:
+            return url
+    elif not url.startswith("/"):
+        return url
+    return urlunsplit(parts._replace(path=site_path(parts.path or "/", rules)))